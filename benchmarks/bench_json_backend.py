@@ -0,0 +1,37 @@
+"""Compare stdlib json with the orjson backend on bewegungsdaten responses built by the tests/it fixtures.
+
+Run from the repository root: python benchmarks/bench_json_backend.py
+"""
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "tests"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "custom_components"))
+
+from it import bewegungsdaten_response  # noqa: E402
+from wnsm.api import json_backend  # noqa: E402
+
+# a month, a year and three years of quarter-hour values
+SIZES = (31 * 96, 365 * 96, 3 * 365 * 96)
+
+
+def main(number: int = 5) -> None:
+    print(f"JSON backend: {json_backend.BACKEND}")
+    for count in SIZES:
+        response = bewegungsdaten_response("123456789", "AT000000001234567890", values_count=count)
+        body = json.dumps(response).encode()
+        assert json_backend.loads(body) == json.loads(body)
+        for label, stdlib, backend in (
+            ("decode", lambda: json.loads(body), lambda: json_backend.loads(body)),
+            ("log", lambda: json.dumps(response, indent=2), lambda: json_backend.dumps(response, indent=True)),
+        ):
+            stdlib_time = timeit.timeit(stdlib, number=number) / number
+            backend_time = timeit.timeit(backend, number=number) / number
+            print(f"{count:6} values {len(body) / 1e6:5.1f} MB {label:6} json {stdlib_time * 1e3:7.1f} ms  "
+                  f"{json_backend.BACKEND} {backend_time * 1e3:7.1f} ms  speedup {stdlib_time / backend_time:4.1f}x")
+
+
+if __name__ == "__main__":
+    main()
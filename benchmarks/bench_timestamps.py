@@ -0,0 +1,48 @@
+"""Compare dt_util.parse_datetime with the API timestamp parser on a 100k value bewegungsdaten payload.
+
+Run from the repository root: python benchmarks/bench_timestamps.py
+"""
+import math
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta, timezone
+
+from homeassistant.util import dt as dt_util
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "custom_components"))
+
+from wnsm.timestamps import parse_datetime, parse_epoch  # noqa: E402
+
+START = datetime(2021, 1, 1, tzinfo=timezone.utc)
+FORMATS = {
+    "zeitpunktVon (Z)": "%Y-%m-%dT%H:%M:%SZ",
+    "zeitpunktVon (.000Z)": "%Y-%m-%dT%H:%M:%S.000Z",
+    "zeitVon (+00:00)": "%Y-%m-%dT%H:%M:%S+00:00",
+}
+
+
+def payload(fmt: str, count: int = 100_000) -> list[str]:
+    return [(START + timedelta(minutes=15 * i)).strftime(fmt) for i in range(count)]
+
+
+def current_epoch(timestamp: str) -> int:
+    return math.floor(dt_util.parse_datetime(timestamp).timestamp())
+
+
+def main(number: int = 3) -> None:
+    for name, fmt in FORMATS.items():
+        timestamps = payload(fmt)
+        assert [dt_util.parse_datetime(ts) for ts in timestamps[:1000]] == [parse_datetime(ts) for ts in timestamps[:1000]]
+        for label, current, fast in (
+            ("datetime", dt_util.parse_datetime, parse_datetime),
+            ("epoch", current_epoch, parse_epoch),
+        ):
+            current_time = timeit.timeit(lambda: [current(ts) for ts in timestamps], number=number) / number
+            fast_time = timeit.timeit(lambda: [fast(ts) for ts in timestamps], number=number) / number
+            print(f"{name:22} {label:8} dt_util {current_time * 1e3:7.1f} ms  api parser {fast_time * 1e3:7.1f} ms  "
+                  f"speedup {current_time / fast_time:4.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Compare the per-call path walking of the former translate_dict with compiled AttributeMappers.
+
+Run from the repository root: python benchmarks/bench_translate_dict.py
+"""
+import os
+import sys
+import timeit
+from functools import reduce
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "custom_components"))
+
+from wnsm.const import (  # noqa: E402
+    ATTRS_BEWEGUNGSDATEN,
+    ATTRS_METERREADINGS_CALL,
+    ATTRS_ZAEHLPUNKTE_CALL,
+    BEWEGUNGSDATEN_MAPPER,
+    METERREADINGS_CALL_MAPPER,
+    ZAEHLPUNKTE_CALL_MAPPER,
+)
+from wnsm.utils import strint  # noqa: E402
+
+
+def is_valid_access(data, accessor):
+    if isinstance(accessor, int) and isinstance(data, list):
+        return accessor < len(data)
+    if isinstance(accessor, str) and isinstance(data, dict):
+        return accessor in data
+    return False
+
+
+def legacy_translate_dict(dictionary, attrs_list):
+    """translate_dict before the paths were compiled."""
+    result = {}
+    for src, destination in attrs_list:
+        value = reduce(
+            lambda acc, i: acc[i] if is_valid_access(acc, i) else None,
+            [strint(s) for s in src.split(".")],
+            dictionary,
+        )
+        if value is not None:
+            result[destination] = value
+    return result
+
+
+ZAEHLPUNKT = {
+    "geschaeftspartner": "1234567",
+    "zaehlpunktnummer": "AT0010000000000000001000000000000",
+    "customLabel": "Home",
+    "equipmentNumber": "1234",
+    "geraetNumber": "ABC",
+    "verbrauchsstelle": {"strasse": "Strasse", "anlageHausnummer": "1", "postleitzahl": "1010", "ort": "Wien",
+                         "laengengrad": "16.37", "breitengrad": "48.21"},
+    "anlage": {"typ": "TAGSTROM"},
+    "isDefault": True,
+    "isActive": True,
+    "isSmartMeterMarketReady": True,
+    "idexStatus": {"granularity": {"status": "QUARTER_HOUR"}},
+}
+METERREADINGS = {"meterReadings": [{"value": 1, "date": "2024-01-01", "validated": True, "type": "X"}]}
+BEWEGUNGSDATEN = {
+    "descriptor": {"geschaeftspartnernummer": "1", "zaehlpunktnummer": "AT", "rolle": "V002", "aggregat": "NONE",
+                   "granularitaet": "QH", "einheit": "KWH"},
+    "values": [],
+}
+CASES = [
+    ("zaehlpunkte", ZAEHLPUNKT, ATTRS_ZAEHLPUNKTE_CALL, ZAEHLPUNKTE_CALL_MAPPER),
+    ("meterReadings", METERREADINGS, ATTRS_METERREADINGS_CALL, METERREADINGS_CALL_MAPPER),
+    ("bewegungsdaten", BEWEGUNGSDATEN, ATTRS_BEWEGUNGSDATEN, BEWEGUNGSDATEN_MAPPER),
+]
+
+
+def main(number: int = 20000) -> None:
+    for name, response, attrs_list, mapper in CASES:
+        assert legacy_translate_dict(response, attrs_list) == mapper(response)
+        legacy = timeit.timeit(lambda: legacy_translate_dict(response, attrs_list), number=number)
+        compiled = timeit.timeit(lambda: mapper(response), number=number)
+        print(f"{name:15} legacy {legacy / number * 1e6:6.2f} us  compiled {compiled / number * 1e6:6.2f} us  "
+              f"speedup {legacy / compiled:4.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,123 @@
 import asyncio
+import copy
 import logging
-from datetime import datetime
-from typing import Any
+import time
+from datetime import date, datetime, timedelta, tzinfo
+from typing import Any, Awaitable, Callable, TypeVar
 
 from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
 
 from .api import Smartmeter
-from .api.constants import ValueType
-from .api.errors import SmartmeterConnectionError
+from .api.constants import AggregatType, ValueType
+from .api.errors import SmartmeterConnectionError, SmartmeterQueryError
 from .const import (
-    ATTRS_BASEINFORMATION_CALL,
-    ATTRS_BEWEGUNGSDATEN,
-    ATTRS_CONSUMPTIONS_CALL,
-    ATTRS_HISTORIC_DATA,
-    ATTRS_METERREADINGS_CALL,
-    ATTRS_VERBRAUCH_CALL,
-    ATTRS_ZAEHLPUNKTE_CALL,
+    BASEINFORMATION_CALL_MAPPER,
+    BEWEGUNGSDATEN_MAPPER,
+    CONSUMPTIONS_CALL_MAPPER,
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
+    HISTORIC_DATA_MAPPER,
+    METERREADINGS_CALL_MAPPER,
+    REQUEST_RESULT_TTL_SECONDS,
+    VERBRAUCH_CALL_MAPPER,
+    ZAEHLPUNKTE_CALL_MAPPER,
 )
-from .utils import translate_dict
+from .fetch_plan import FetchPlan, plan_fetch
+from .messwerte_cache import MesswerteCache, start_of_day
+from .session_store import WnsmSessionStore
+from .statistics_utils import LastStatisticsCache
+from .timeseries import ValueSeries
+from .timestamps import parse_datetime
+from .watermark_store import IngestWatermarkStore
 
 _LOGGER = logging.getLogger(__name__)
+_T = TypeVar("_T")
 
 
 class AsyncSmartmeter:
     """Async wrapper around Smartmeter API client with reauth support."""
 
-    def __init__(self, hass: HomeAssistant, smartmeter: Smartmeter | None = None):
+    # small responses that are shared by identical calls, larger ones such as bewegungsdaten are not kept
+    COALESCED_CALLS = frozenset({"contracts", "base_information", "historical_data"})
+    # messwerte the coordinator polls every update, other value types are only queried once
+    CACHED_VALUE_TYPES = frozenset({ValueType.METER_READ, ValueType.DAY})
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        smartmeter: Smartmeter | None = None,
+        session_store: WnsmSessionStore | None = None,
+        max_concurrent_requests: int = DEFAULT_MAX_CONCURRENT_REQUESTS,
+        settle_days: int | None = None,
+        stream_responses: bool = False,
+    ):
         self.hass = hass
         self.smartmeter = smartmeter
+        self.session_store = session_store
         self.login_lock = asyncio.Lock()
+        # incremented whenever the access token is renewed, see _reauthenticate
+        self._auth_generation = 0
+        self.request_semaphore = asyncio.Semaphore(max_concurrent_requests)
+        # coalescing of identical calls, keyed by (method name, args)
+        self._in_flight: dict[tuple, asyncio.Future] = {}
+        self._recent_results: dict[tuple, tuple[float, Any]] = {}
+        # messwerte of settled days are cached on disk, disabled if settle_days is None
+        self.settle_days = settle_days
+        self._messwerte_caches: dict[str, MesswerteCache] = {}
+        self._watermark_stores: dict[str, IngestWatermarkStore] = {}
+        self.last_statistics = LastStatisticsCache(hass)
+        # server-side aggregations the API did not honour, they are not requested again
+        self.unsupported_aggregats: set[AggregatType] = set()
+        self._fetch_plans: dict[str, FetchPlan] = {}
+        # parse bewegungsdaten while they are received, only the aiohttp client can stream
+        self.stream_responses = stream_responses and hasattr(smartmeter, "bewegungsdaten_stream")
 
     async def login(self):
         """Ensure authentication is valid."""
         async with self.login_lock:
-            return await self.hass.async_add_executor_job(self.smartmeter.login)
+            return await self._login()
+
+    async def _login(self, force: bool = False):
+        """Log in, must be called with login_lock held."""
+        if force:
+            self.smartmeter.expire_access_token()
+        renewed = not self.smartmeter.is_logged_in()
+        result = await self._run(self.smartmeter.login)
+        if renewed:
+            self._auth_generation += 1
+        if self.session_store is not None:
+            await self.session_store.async_save(self.smartmeter)
+        return result
+
+    async def _reauthenticate(self, generation: int, force: bool = False) -> None:
+        """Renew the token a request failed with, once for all concurrent callers.
+
+        Callers pass the generation they sent their request with. If the token has been
+        renewed since, another caller already logged in and the request only needs a retry.
+        """
+        async with self.login_lock:
+            if generation != self._auth_generation:
+                return
+            await self._login(force)
+
+    async def gather_zaehlpunkte(
+        self,
+        zaehlpunkte: list[str],
+        fetch: Callable[[str], Awaitable[_T]],
+    ) -> dict[str, _T | BaseException]:
+        """Run fetch for all Zählpunkte concurrently, at most max_concurrent_requests at a time.
+
+        Exceptions are returned in place of the result of the failed Zählpunkt.
+        """
+        async def _bounded(zaehlpunkt: str) -> _T:
+            async with self.request_semaphore:
+                return await fetch(zaehlpunkt)
+
+        results = await asyncio.gather(
+            *(_bounded(zaehlpunkt) for zaehlpunkt in zaehlpunkte),
+            return_exceptions=True,
+        )
+        return dict(zip(zaehlpunkte, results))
 
     @staticmethod
     def _response_has_exception(response: Any) -> bool:
@@ -49,17 +133,58 @@ class AsyncSmartmeter:
         exception_message = str(response.get("Exception", ""))
         return "401" in exception_message or "unauthorized" in exception_message.lower()
 
+    async def _run(self, method, *args):
+        """Await coroutine methods of the aiohttp client, run blocking ones in the executor."""
+        if asyncio.iscoroutinefunction(method):
+            return await method(*args)
+        return await self.hass.async_add_executor_job(method, *args)
+
     async def _call_with_reauth(self, method, *args):
+        """Run Smartmeter API call, sharing it with identical calls in flight or finished within the TTL.
+
+        Only calls in COALESCED_CALLS are shared, all others are sent as they are. Every caller
+        gets its own copy of a shared response, so changing it does not affect the others.
+        """
+        if method.__name__ not in self.COALESCED_CALLS:
+            return await self._call_with_reauth_uncoalesced(method, *args)
+        key = (method.__name__, args)
+        recent = self._recent_results.get(key)
+        if recent is not None and recent[0] > time.monotonic():
+            return copy.deepcopy(recent[1])
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is None:
+            in_flight = asyncio.ensure_future(self._call_with_reauth_uncoalesced(method, *args))
+            self._in_flight[key] = in_flight
+            in_flight.add_done_callback(lambda future: self._call_done(key, future))
+        # a cancelled caller must not cancel the call for the others
+        return copy.deepcopy(await asyncio.shield(in_flight))
+
+    def _call_done(self, key: tuple, future: asyncio.Future) -> None:
+        self._in_flight.pop(key, None)
+        if future.cancelled() or future.exception() is not None:
+            return
+        response = future.result()
+        if self._response_has_exception(response):
+            return
+        now = time.monotonic()
+        self._recent_results = {k: v for k, v in self._recent_results.items() if v[0] > now}
+        self._recent_results[key] = (now + REQUEST_RESULT_TTL_SECONDS, response)
+
+    async def _call_with_reauth_uncoalesced(self, method, *args):
         """Run Smartmeter API call and retry once after reauth if needed."""
+        generation = self._auth_generation
         try:
-            response = await self.hass.async_add_executor_job(method, *args)
+            response = await self._run(method, *args)
         except SmartmeterConnectionError:
-            await self.login()
-            response = await self.hass.async_add_executor_job(method, *args)
+            await self._reauthenticate(generation)
+            generation = self._auth_generation
+            response = await self._run(method, *args)
 
         if self._is_unauthorized_response(response):
-            await self.login()
-            response = await self.hass.async_add_executor_job(method, *args)
+            # the API rejected a token that is still valid locally, so it has to be renewed
+            await self._reauthenticate(generation, force=True)
+            response = await self._run(method, *args)
 
         return response
 
@@ -68,14 +193,14 @@ class AsyncSmartmeter:
         response = await self._call_with_reauth(self.smartmeter.historical_data)
         if self._response_has_exception(response):
             raise RuntimeError("Cannot access /meterReadings", response)
-        return translate_dict(response, ATTRS_METERREADINGS_CALL)
+        return METERREADINGS_CALL_MAPPER(response)
 
     async def get_base_information(self) -> dict[str, str]:
         """Asynchronously get and parse /baseInformation response."""
         response = await self._call_with_reauth(self.smartmeter.base_information)
         if self._response_has_exception(response):
             raise RuntimeError("Cannot access /baseInformation", response)
-        return translate_dict(response, ATTRS_BASEINFORMATION_CALL)
+        return BASEINFORMATION_CALL_MAPPER(response)
 
     def contracts2zaehlpunkte(self, contracts: dict, zaehlpunkt: str) -> list[dict]:
         zaehlpunkte = []
@@ -94,13 +219,13 @@ class AsyncSmartmeter:
 
     async def get_zaehlpunkt(self, zaehlpunkt: str) -> dict[str, str]:
         """Asynchronously get and parse /zaehlpunkt response."""
-        contracts = await self._call_with_reauth(self.smartmeter.zaehlpunkte)
+        contracts = await self._call_with_reauth(self.smartmeter.contracts)
         zaehlpunkte = self.contracts2zaehlpunkte(contracts, zaehlpunkt)
         zp = [z for z in zaehlpunkte if z["zaehlpunktnummer"] == zaehlpunkt]
         if len(zp) == 0:
             raise RuntimeError(f"Zaehlpunkt {zaehlpunkt} not found")
 
-        return translate_dict(zp[0], ATTRS_ZAEHLPUNKTE_CALL) if len(zp) > 0 else None
+        return ZAEHLPUNKTE_CALL_MAPPER(zp[0]) if len(zp) > 0 else None
 
     async def get_consumption(self, customer_id: str, zaehlpunkt: str, start_date: datetime):
         """Return 24h of hourly consumption starting from a date."""
@@ -113,7 +238,7 @@ class AsyncSmartmeter:
         if self._response_has_exception(response):
             raise RuntimeError(f"Cannot access daily consumption: {response}")
 
-        return translate_dict(response, ATTRS_VERBRAUCH_CALL)
+        return VERBRAUCH_CALL_MAPPER(response)
 
     async def get_consumption_raw(self, customer_id: str, zaehlpunkt: str, start_date: datetime):
         """Return daily consumptions from the given start date until today."""
@@ -126,49 +251,131 @@ class AsyncSmartmeter:
         if self._response_has_exception(response):
             raise RuntimeError(f"Cannot access daily consumption: {response}")
 
-        return translate_dict(response, ATTRS_VERBRAUCH_CALL)
+        return VERBRAUCH_CALL_MAPPER(response)
 
-    async def get_historic_data(
+    async def fetch_plan(self, zaehlpunkt: str) -> FetchPlan:
+        """Return how bewegungsdaten of a Zählpunkt are fetched, decided once from its granularity."""
+        if zaehlpunkt not in self._fetch_plans:
+            granularity = (await self.get_zaehlpunkt(zaehlpunkt)).get("granularity")
+            self._fetch_plans[zaehlpunkt] = plan_fetch(granularity)
+            _LOGGER.debug("Fetch plan of %s (granularity %s): %s", zaehlpunkt, granularity, self._fetch_plans[zaehlpunkt])
+        return self._fetch_plans[zaehlpunkt]
+
+    def watermarks(self, zaehlpunkt: str) -> IngestWatermarkStore:
+        """Return the import watermarks of a Zählpunkt, shared by all importers."""
+        if zaehlpunkt not in self._watermark_stores:
+            watermarks = IngestWatermarkStore(self.hass, zaehlpunkt, self.last_statistics)
+            # the recorder is read again after invalidation, so are the watermarks
+            self.last_statistics.async_add_invalidate_listener(watermarks.reset)
+            self._watermark_stores[zaehlpunkt] = watermarks
+        return self._watermark_stores[zaehlpunkt]
+
+    def _messwerte_cache(self, zaehlpunkt: str) -> MesswerteCache | None:
+        if self.settle_days is None:
+            return None
+        if zaehlpunkt not in self._messwerte_caches:
+            self._messwerte_caches[zaehlpunkt] = MesswerteCache(self.hass, zaehlpunkt, self.settle_days)
+        return self._messwerte_caches[zaehlpunkt]
+
+    async def _call_with_messwerte_cache(
+        self,
+        zaehlpunkt: str,
+        series: str,
+        values_key: str,
+        timestamp_key: str,
+        covered_from: datetime,
+        covered_until: datetime,
+        tz: tzinfo,
+        fetch: Callable[[datetime | None], Awaitable[Any]],
+    ):
+        """Serve cached settled days of [covered_from, covered_until) and fetch only the remaining tail.
+
+        Days are split in the time zone the API is queried in. fetch(start) performs the
+        API call, from start or the original start if None.
+        """
+        cache = self._messwerte_cache(zaehlpunkt)
+        if cache is None:
+            return await fetch(None)
+
+        first_day = covered_from.astimezone(tz).date()
+        last_day = (covered_until - timedelta(microseconds=1)).astimezone(tz).date()
+        meta, cached_days, fetch_day = await cache.async_get(series, first_day, last_day)
+        cached_values = []
+        for day, values in cached_days:
+            if day == first_day and start_of_day(day, tz) < covered_from:
+                # the request starts within its first day
+                values = [v for v in values if parse_datetime(v[timestamp_key]) >= covered_from]
+            cached_values.extend(values)
+
+        if fetch_day > last_day:
+            _LOGGER.debug("Serving %s of %s from cache", series, zaehlpunkt)
+            return {**meta, values_key: cached_values}
+
+        fetch_from = None if fetch_day == first_day else start_of_day(fetch_day, tz)
+        response = await fetch(fetch_from)
+        if self._response_has_exception(response) or not isinstance(response.get(values_key), list):
+            return response
+
+        await cache.async_update(
+            series,
+            {key: value for key, value in response.items() if key != values_key},
+            response[values_key],
+            timestamp_key,
+            covered_from if fetch_from is None else fetch_from,
+            covered_until,
+            tz,
+        )
+        if fetch_from is None:
+            return response
+        return {**response, values_key: cached_values + response[values_key]}
+
+    @staticmethod
+    def _as_date(value: date | datetime) -> date:
+        return value.date() if isinstance(value, datetime) else value
+
+    async def _get_historic_data_response(
         self,
         zaehlpunkt: str,
         date_from: datetime = None,
         date_to: datetime = None,
         granularity: ValueType = ValueType.QUARTER_HOUR,
     ):
-        """Return historic data."""
-        response = await self._call_with_reauth(
-            self.smartmeter.historical_data,
+        async def fetch(start: datetime | None):
+            return await self._call_with_reauth(
+                self.smartmeter.historical_data,
+                zaehlpunkt,
+                date_from if start is None else start,
+                date_to,
+                granularity,
+            )
+
+        if date_from is None or date_to is None or granularity not in self.CACHED_VALUE_TYPES:
+            return await fetch(None)
+        # the API is queried for whole local days
+        return await self._call_with_messwerte_cache(
             zaehlpunkt,
-            date_from,
-            date_to,
-            granularity,
+            f"historical_data:{granularity.value}",
+            "messwerte",
+            "zeitVon",
+            dt_util.start_of_local_day(self._as_date(date_from)),
+            dt_util.start_of_local_day(self._as_date(date_to) + timedelta(days=1)),
+            dt_util.DEFAULT_TIME_ZONE,
+            fetch,
         )
-        if self._response_has_exception(response):
-            raise RuntimeError(f"Cannot access historic data: {response}")
-        _LOGGER.debug("Raw historical data: %s", response)
-        return translate_dict(response, ATTRS_HISTORIC_DATA)
 
-    async def get_meter_reading_from_historic_data(
+    async def get_historic_data(
         self,
         zaehlpunkt: str,
-        start_date: datetime,
-        end_date: datetime,
-    ) -> float:
-        """Return daily meter readings from the given start date until today."""
-        response = await self._call_with_reauth(
-            self.smartmeter.historical_data,
-            zaehlpunkt,
-            start_date,
-            end_date,
-            ValueType.METER_READ,
-        )
+        date_from: datetime = None,
+        date_to: datetime = None,
+        granularity: ValueType = ValueType.QUARTER_HOUR,
+    ):
+        """Return historic data."""
+        response = await self._get_historic_data_response(zaehlpunkt, date_from, date_to, granularity)
         if self._response_has_exception(response):
             raise RuntimeError(f"Cannot access historic data: {response}")
         _LOGGER.debug("Raw historical data: %s", response)
-        meter_readings = translate_dict(response, ATTRS_HISTORIC_DATA)
-        if "values" in meter_readings and all("messwert" in messwert for messwert in meter_readings["values"]) and len(meter_readings["values"]) > 0:
-            return meter_readings["values"][0]["messwert"] / 1000
-        return None
+        return HISTORIC_DATA_MAPPER(response)
 
     @staticmethod
     def is_active(zaehlpunkt_response: dict) -> bool:
@@ -186,23 +393,68 @@ class AsyncSmartmeter:
         start: datetime = None,
         end: datetime = None,
         granularity: ValueType = ValueType.QUARTER_HOUR,
+        aggregat: AggregatType = AggregatType.NONE,
     ):
-        """Return historic bewegungsdaten."""
+        """Return historic bewegungsdaten, summed up by the API if aggregat is given."""
         response = await self._call_with_reauth(
             self.smartmeter.bewegungsdaten,
             zaehlpunkt,
             start,
             end,
             granularity,
+            aggregat,
         )
         if self._response_has_exception(response):
             raise RuntimeError(f"Cannot access bewegungsdaten: {response}")
         _LOGGER.debug("Raw bewegungsdaten: %s", response)
-        return translate_dict(response, ATTRS_BEWEGUNGSDATEN)
+        return BEWEGUNGSDATEN_MAPPER(response)
+
+    async def get_bewegungsdaten_series(
+        self,
+        zaehlpunkt: str,
+        start: datetime = None,
+        end: datetime = None,
+        granularity: ValueType = ValueType.QUARTER_HOUR,
+        aggregat: AggregatType = AggregatType.NONE,
+    ) -> tuple[dict[str, Any], ValueSeries | None]:
+        """Stream bewegungsdaten into a ValueSeries without holding the whole response.
+
+        Returns the mapped response without values and the series, None if the response
+        has no values list.
+        """
+        args = (zaehlpunkt, start, end, granularity, aggregat)
+        generation = self._auth_generation
+        try:
+            return await self._stream_bewegungsdaten(*args)
+        except SmartmeterConnectionError:
+            await self._reauthenticate(generation)
+        except SmartmeterQueryError as exception:
+            if exception.code != 401:
+                raise
+            # the API rejected a token that is still valid locally, so it has to be renewed
+            await self._reauthenticate(generation, force=True)
+        return await self._stream_bewegungsdaten(*args)
+
+    async def _stream_bewegungsdaten(self, zaehlpunkt: str, *args) -> tuple[dict[str, Any], ValueSeries | None]:
+        response: dict[str, Any] = {}
+        series = None
+        async for key, value in self.smartmeter.bewegungsdaten_stream(zaehlpunkt, *args):
+            if key != "values":
+                response[key] = value
+                continue
+            # items of the values list arrive one by one, an empty list as a whole
+            if series is None and isinstance(value, (dict, list)):
+                series = ValueSeries()
+            if isinstance(value, dict):
+                series.append_value(value, "zeitpunktVon", "wert")
+        if self._response_has_exception(response):
+            raise RuntimeError(f"Cannot access bewegungsdaten: {response}")
+        _LOGGER.debug("Streamed %s bewegungsdaten values: %s", 0 if series is None else len(series), response)
+        return BEWEGUNGSDATEN_MAPPER(response), series
 
     async def get_consumptions(self) -> dict[str, str]:
         """Asynchronously get and parse /consumptions response."""
         response = await self._call_with_reauth(self.smartmeter.consumptions)
         if self._response_has_exception(response):
             raise RuntimeError("Cannot access /consumptions", response)
-        return translate_dict(response, ATTRS_CONSUMPTIONS_CALL)
+        return CONSUMPTIONS_CALL_MAPPER(response)
@@ -1,17 +1,35 @@
 """Set up the Wiener Netze SmartMeter Integration component."""
 
 from dataclasses import dataclass
+from datetime import timedelta
 
 from homeassistant import config_entries, core
 from homeassistant.const import CONF_PASSWORD, CONF_SCAN_INTERVAL, CONF_USERNAME
+from homeassistant.helpers.aiohttp_client import async_create_clientsession
 
 from .AsyncSmartmeter import AsyncSmartmeter
-from .api import Smartmeter
+from .api import AsyncSmartmeterClient
+from .api.constants import PayloadLogMode
+from .checkpoint_store import BackfillCheckpointStore
 from .const import (
     CONF_ENABLE_DAY_STATISTICS_IMPORT,
+    CONF_MAX_CONCURRENT_REQUESTS,
+    CONF_MAX_REQUESTS_PER_SECOND,
+    CONF_SETTLE_DAYS,
+    CONF_STREAM_RESPONSES,
+    CONF_ZAEHLPUNKTE,
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
+    DEFAULT_MAX_REQUESTS_PER_SECOND,
     DEFAULT_SCAN_INTERVAL_MINUTES,
+    DEFAULT_SETTLE_DAYS,
     DOMAIN,
 )
+from .coordinator import WNSMDataUpdateCoordinator
+from .messwerte_cache import MesswerteCache
+from .publication_scheduler import PublicationScheduler
+from .session_store import WnsmSessionStore
+from .statistics_utils import statistic_ids
+from .watermark_store import IngestWatermarkStore
 
 
 @dataclass(slots=True)
@@ -19,8 +37,9 @@ class WnsmRuntimeData:
     """Runtime data cached per config entry."""
 
     config: dict
-    smartmeter: Smartmeter
+    smartmeter: AsyncSmartmeterClient
     async_smartmeter: AsyncSmartmeter
+    coordinator: WNSMDataUpdateCoordinator
 
 
 async def async_setup_entry(
@@ -31,17 +50,52 @@ async def async_setup_entry(
     config = {**entry.data, **entry.options}
     config.setdefault(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL_MINUTES)
     config.setdefault(CONF_ENABLE_DAY_STATISTICS_IMPORT, True)
+    config.setdefault(CONF_MAX_CONCURRENT_REQUESTS, DEFAULT_MAX_CONCURRENT_REQUESTS)
+    config.setdefault(CONF_MAX_REQUESTS_PER_SECOND, DEFAULT_MAX_REQUESTS_PER_SECOND)
+    config.setdefault(CONF_SETTLE_DAYS, DEFAULT_SETTLE_DAYS)
+    config.setdefault(CONF_STREAM_RESPONSES, False)
 
-    smartmeter = Smartmeter(
+    # Own cookie jar for the login state, but HA's shared connection pool.
+    smartmeter = AsyncSmartmeterClient(
         username=config[CONF_USERNAME],
         password=config[CONF_PASSWORD],
+        session=async_create_clientsession(hass),
+        payload_log_mode=PayloadLogMode.SUMMARY,
+        requests_per_second=config[CONF_MAX_REQUESTS_PER_SECOND],
     )
-    async_smartmeter = AsyncSmartmeter(hass, smartmeter)
+    session_store = WnsmSessionStore(hass, entry.entry_id)
+    await session_store.async_restore(smartmeter)
+    async_smartmeter = AsyncSmartmeter(
+        hass,
+        smartmeter,
+        session_store,
+        max_concurrent_requests=config[CONF_MAX_CONCURRENT_REQUESTS],
+        settle_days=config[CONF_SETTLE_DAYS],
+        stream_responses=config[CONF_STREAM_RESPONSES],
+    )
+    zaehlpunkte = [zp["zaehlpunktnummer"] for zp in config[CONF_ZAEHLPUNKTE]]
+    await async_smartmeter.last_statistics.async_seed(
+        [statistic_id for zaehlpunkt in zaehlpunkte for statistic_id in statistic_ids(zaehlpunkt)]
+    )
+    entry.async_on_unload(async_smartmeter.last_statistics.async_listen())
+    scan_interval = timedelta(minutes=config[CONF_SCAN_INTERVAL])
+    scheduler = PublicationScheduler(hass, entry.entry_id, scan_interval)
+    await scheduler.async_load()
+    coordinator = WNSMDataUpdateCoordinator(
+        hass,
+        async_smartmeter,
+        zaehlpunkte,
+        scan_interval,
+        scheduler,
+        config[CONF_ENABLE_DAY_STATISTICS_IMPORT],
+    )
+    await coordinator.async_config_entry_first_refresh()
 
     entry.runtime_data = WnsmRuntimeData(
         config=config,
         smartmeter=smartmeter,
         async_smartmeter=async_smartmeter,
+        coordinator=coordinator,
     )
 
     # Compatibility cache for existing platform setup code paths.
@@ -64,7 +118,7 @@ async def async_unload_entry(
         hass.data.get(DOMAIN, {}).pop(entry.entry_id, None)
         runtime_data = entry.runtime_data
         if runtime_data is not None and hasattr(runtime_data, "smartmeter"):
-            runtime_data.smartmeter.session.close()
+            await runtime_data.smartmeter.session.close()
         entry.runtime_data = None
     return unload_ok
 
@@ -75,3 +129,16 @@ async def async_reload_entry(
 ) -> None:
     """Reload config entry when options are updated from UI."""
     await hass.config_entries.async_reload(entry.entry_id)
+
+
+async def async_remove_entry(
+    hass: core.HomeAssistant,
+    entry: config_entries.ConfigEntry,
+) -> None:
+    """Remove persisted session data, learned schedule, cached messwerte, import watermarks and backfill checkpoints when a config entry is deleted."""
+    await WnsmSessionStore(hass, entry.entry_id).async_remove()
+    await PublicationScheduler(hass, entry.entry_id, timedelta()).async_remove()
+    for zaehlpunkt in entry.data.get(CONF_ZAEHLPUNKTE, []):
+        await MesswerteCache(hass, zaehlpunkt["zaehlpunktnummer"], DEFAULT_SETTLE_DAYS).async_remove()
+        await IngestWatermarkStore(hass, zaehlpunkt["zaehlpunktnummer"]).async_remove()
+        await BackfillCheckpointStore(hass, zaehlpunkt["zaehlpunktnummer"]).async_remove()
@@ -1,6 +1,7 @@
 """Unofficial Python wrapper for the Wiener Netze Smart Meter private API."""
 from importlib.metadata import version
 
+from .async_client import AsyncSmartmeterClient
 from .client import Smartmeter
 
 try:
@@ -8,4 +9,4 @@ try:
 except Exception:  # pylint: disable=broad-except
     pass
 
-__all__ = ["Smartmeter"]
+__all__ = ["AsyncSmartmeterClient", "Smartmeter"]
@@ -0,0 +1,459 @@
+"""Contains the asyncio Smartmeter API Client."""
+import asyncio
+import email.utils
+import itertools
+import logging
+from datetime import datetime, date, timezone
+from urllib import parse
+
+import aiohttp
+from urllib3.util.retry import Retry
+
+from . import constants as const
+from . import json_backend
+from .client import ACCEPT_JSON, Smartmeter, jittered_backoff
+from .errors import (
+    SmartmeterConnectionError,
+    SmartmeterLoginError,
+    SmartmeterQueryError,
+)
+from .json_stream import iter_object_members
+
+logger = logging.getLogger(__name__)
+
+
+async def _read_json(response: aiohttp.ClientResponse):
+    """Decode the body like response.json(content_type=None), None if the body is empty."""
+    body = await response.read()
+    return json_backend.loads(body) if body.strip() else None
+
+
+def _parse_retry_after(value: str | None) -> float | None:
+    """Seconds to wait by a Retry-After header in seconds or as HTTP date, None if missing or invalid."""
+    if value is None:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            retry_date = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_date.tzinfo is None:
+            retry_date = retry_date.replace(tzinfo=timezone.utc)
+        seconds = (retry_date - datetime.now(timezone.utc)).total_seconds()
+    return max(seconds, 0.0)
+
+
+def _retry_delay(method: str, attempt: int, response: aiohttp.ClientResponse = None) -> float | None:
+    """
+    Seconds to wait before retrying a request that failed attempt + 1 times, None if it is not retried.
+    Idempotent requests are retried after connection errors (response is None) and after
+    HTTP_RETRY_STATUS_CODES responses, honouring their Retry-After up to HTTP_MAX_RETRY_AFTER_SECONDS.
+    """
+    if method not in Retry.DEFAULT_ALLOWED_METHODS or attempt >= const.HTTP_RETRIES:
+        return None
+    if response is not None:
+        if response.status not in const.HTTP_RETRY_STATUS_CODES:
+            return None
+        retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+        if retry_after is not None:
+            return min(retry_after, const.HTTP_MAX_RETRY_AFTER_SECONDS)
+    return jittered_backoff(const.HTTP_RETRY_BACKOFF_FACTOR * 2 ** attempt)
+
+
+class HostRateLimiter:
+    """Spaces out the start of requests to the same host by at least 1 / requests_per_second."""
+
+    def __init__(self, requests_per_second: float):
+        self.interval = 1.0 / requests_per_second
+        self._next_slot = {}
+
+    async def acquire(self, url):
+        host = parse.urlparse(url).netloc
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        # reserve the slot before sleeping, so concurrent callers queue up behind each other
+        slot = max(now, self._next_slot.get(host, now))
+        self._next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class AsyncSmartmeterClient(Smartmeter):
+    """
+    Smartmeter client performing all requests with aiohttp.
+
+    URL building, token handling, the contracts cache and response validation are shared with
+    Smartmeter, only the I/O methods are coroutines here.
+    """
+
+    def __init__(self, username, password, session: aiohttp.ClientSession, input_code_verifier=None,
+                 payload_log_mode: const.PayloadLogMode = const.PayloadLogMode.FULL,
+                 requests_per_second: float = None):
+        """Access the Smartmeter API.
+
+        Args:
+            username (str): Username used for API Login.
+            password (str): Password used for API Login.
+            session (aiohttp.ClientSession): Session used for all requests. Its cookie jar holds
+                the login state, so it must not be shared with other clients.
+            payload_log_mode (const.PayloadLogMode, optional): How API payloads are written
+                to the debug log. Payloads are only serialized if DEBUG is enabled.
+            requests_per_second (float, optional): Limits the rate of API calls per host.
+                Unlimited if None.
+        """
+        super().__init__(username, password, input_code_verifier, payload_log_mode, session)
+        self.rate_limiter = None if requests_per_second is None else HostRateLimiter(requests_per_second)
+
+    def _clear_cookies(self):
+        self.session.cookie_jar.clear()
+
+    async def load_login_page(self):
+        """
+        loads login page and extracts encoded login url
+        """
+        login_url = self._prepare_login_url()
+        try:
+            async with self.session.get(login_url) as result:
+                content = await result.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exception:
+            raise SmartmeterConnectionError("Could not load login page") from exception
+        if result.status != 200:
+            raise SmartmeterConnectionError(
+                f"Could not load login page. Error: {content}"
+            )
+        action = self._form_action(content)
+
+        if action is None:
+            raise SmartmeterConnectionError("No form found on the login page.")
+
+        return action
+
+    async def credentials_login(self, url):
+        """
+        login with credentials provided the login url
+        """
+        try:
+            async with self.session.post(
+                url,
+                data={
+                    "username": self.username,
+                    "login": " "
+                },
+                allow_redirects=False,
+            ) as result:
+                content = await result.read()
+            action = self._form_action(content)
+            if action is None:
+                raise SmartmeterConnectionError("No form found on the credentials page.")
+
+            async with self.session.post(
+                action,
+                data={
+                    "username": self.username,
+                    "password": self.password,
+                },
+                allow_redirects=False,
+            ) as result:
+                headers = result.headers
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exception:
+            raise SmartmeterConnectionError(
+                "Could not login with credentials"
+            ) from exception
+
+        return self._code_from_location(headers)
+
+    async def _post_token(self, data, error):
+        try:
+            async with self.session.post(const.AUTH_URL + "token", data=data) as result:
+                content = await result.read()
+                if result.status != 200:
+                    raise SmartmeterConnectionError(f"{error}: {content}")
+                tokens = await _read_json(result)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exception:
+            raise SmartmeterConnectionError(error) from exception
+        return self._check_tokens(tokens)
+
+    async def load_tokens(self, code):
+        """
+        Provided the totp code loads access and refresh token
+        """
+        return await self._post_token(
+            const.build_access_token_args(code=code, code_verifier=self._code_verifier),
+            "Could not obtain access token",
+        )
+
+    async def refresh_tokens(self):
+        """
+        Uses the refresh token to obtain a new access (and refresh) token
+        """
+        return await self._post_token(
+            const.build_refresh_token_args(refresh_token=self._refresh_token),
+            "Could not refresh access token",
+        )
+
+    async def login(self):
+        """
+        login with credentials specified in ctor
+        If the access token expired, but the refresh token is still valid, the access token is refreshed instead.
+        """
+        if self.is_login_expired():
+            if self._can_refresh():
+                try:
+                    self._set_tokens(await self.refresh_tokens())
+                    return self
+                except (SmartmeterConnectionError, SmartmeterLoginError) as exception:
+                    logger.debug("Refreshing access token failed, performing full login: %s", exception)
+            self.reset()
+        if not self.is_logged_in():
+            url = await self.load_login_page()
+            code = await self.credentials_login(url)
+            self._set_tokens(await self.load_tokens(code))
+
+            self._api_gateway_token, self._api_gateway_b2b_token = await self._get_api_key(
+                self._access_token
+            )
+        return self
+
+    async def _get_api_key(self, token):
+        self._access_valid_or_raise()
+
+        headers = {"Authorization": f"Bearer {token}"}
+        try:
+            async with self.session.get(const.API_CONFIG_URL, headers=headers) as response:
+                result = await _read_json(response)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as exception:
+            raise SmartmeterConnectionError("Could not obtain API key") from exception
+
+        return self._api_keys_from_config(result)
+
+    async def _request(self, method, url, headers, data, timeout) -> aiohttp.ClientResponse:
+        """Read response of a request, retried as far as _retry_delay allows."""
+        for attempt in itertools.count():
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire(url)
+            try:
+                async with self.session.request(
+                    method, url, headers=headers, json=data, timeout=aiohttp.ClientTimeout(total=timeout)
+                ) as response:
+                    # read the body while the connection is open, so the response stays usable
+                    await response.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as exception:
+                delay = _retry_delay(method, attempt)
+                if delay is None:
+                    raise SmartmeterConnectionError(f"Could not call {url}") from exception
+            else:
+                # once retries are exhausted, the last response is returned as it is
+                delay = _retry_delay(method, attempt, response)
+                if delay is None:
+                    return response
+            logger.debug("Retrying %s %s in %.1f s", method, url, delay)
+            await asyncio.sleep(delay)
+
+    async def _call_api(
+        self,
+        endpoint,
+        base_url=None,
+        method="GET",
+        data=None,
+        query=None,
+        return_response=False,
+        timeout=60.0,
+        extra_headers=None,
+    ):
+        url, headers = self._prepare_request(endpoint, base_url, data, query, extra_headers)
+        response = await self._request(method, url, headers, data, timeout)
+
+        if return_response:
+            if logger.isEnabledFor(logging.DEBUG):
+                try:
+                    payload = await _read_json(response)
+                except ValueError:
+                    payload = await response.text()
+                self._log_api_call(url, data, payload)
+            return response
+
+        payload = await _read_json(response)
+        self._log_api_call(url, data, payload)
+        return payload
+
+    async def _stream_api(self, endpoint, array_key, base_url=None, query=None, timeout=60.0, extra_headers=None):
+        """
+        GET endpoint and yield the members of the response object while it is received,
+        the items of the array under array_key one by one, see json_stream.iter_object_members.
+        Error responses raise SmartmeterQueryError with the HTTP status as code. timeout applies
+        to each read, so large responses may take longer as a whole. Failed requests are retried
+        like in _call_api, but not once the response is being streamed.
+        """
+        url, headers = self._prepare_request(endpoint, base_url, None, query, extra_headers)
+        streaming = False
+        for attempt in itertools.count():
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire(url)
+            try:
+                async with self.session.get(
+                    url, headers=headers, timeout=aiohttp.ClientTimeout(total=None, sock_read=timeout)
+                ) as response:
+                    if response.status >= 400:
+                        body = await response.text()
+                        delay = _retry_delay("GET", attempt, response)
+                        if delay is None:
+                            self._log_api_call(url, None, body)
+                            raise SmartmeterQueryError(f"Could not call {url}", response.status, body)
+                    else:
+                        streaming = True
+                        count = 0
+                        async for key, value in iter_object_members(
+                            response.content.iter_chunked(const.STREAM_CHUNK_SIZE), array_key
+                        ):
+                            # an empty array is yielded as a whole
+                            count += key == array_key and value != []
+                            yield key, value
+                        logger.debug("Streamed %s items of %s from %s", count, array_key, url)
+                        return
+            except (aiohttp.ClientError, asyncio.TimeoutError) as exception:
+                # members already yielded cannot be taken back, only the request itself is retried
+                delay = None if streaming else _retry_delay("GET", attempt)
+                if delay is None:
+                    raise SmartmeterConnectionError(f"Could not call {url}") from exception
+            except ValueError as exception:
+                raise SmartmeterQueryError(f"Invalid JSON from {url}") from exception
+            logger.debug("Retrying GET %s in %.1f s", url, delay)
+            await asyncio.sleep(delay)
+
+    async def contracts(self):
+        """
+        Returns the zaehlpunkte (contracts) response, cached for the current login session.
+        The cache expires after const.CONTRACTS_CACHE_TTL_SECONDS.
+        """
+        contracts = self._cached_contracts()
+        if contracts is not None:
+            return contracts
+        return self._cache_contracts(await self.zaehlpunkte())
+
+    async def get_zaehlpunkt(self, zaehlpunkt: str = None) -> tuple[str, str, str]:
+        return self._resolve_zaehlpunkt(await self.contracts(), zaehlpunkt)
+
+    async def zaehlpunkte(self):
+        """Returns zaehlpunkte for currently logged in user."""
+        return await self._call_api("zaehlpunkte")
+
+    async def consumptions(self):
+        """Returns response from 'consumptions' endpoint."""
+        return await self._call_api("zaehlpunkt/consumptions")
+
+    async def base_information(self):
+        """Returns response from 'baseInformation' endpoint."""
+        return await self._call_api("zaehlpunkt/baseInformation")
+
+    async def meter_readings(self):
+        """Returns response from 'meterReadings' endpoint."""
+        return await self._call_api("zaehlpunkt/meterReadings")
+
+    async def verbrauch(
+        self,
+        customer_id: str,
+        zaehlpunkt: str,
+        date_from: datetime,
+        resolution: const.Resolution = const.Resolution.HOUR
+    ):
+        """Returns energy usage, see Smartmeter.verbrauch."""
+        if zaehlpunkt is None or customer_id is None:
+            customer_id, zaehlpunkt, anlagetype = await self.get_zaehlpunkt()
+        endpoint = f"messdaten/{customer_id}/{zaehlpunkt}/verbrauch"
+        return await self._call_api(endpoint, query=self._verbrauch_query(date_from, resolution))
+
+    async def verbrauchRaw(
+        self,
+        customer_id: str,
+        zaehlpunkt: str,
+        date_from: datetime,
+        date_to: datetime = None,
+    ):
+        """Returns daily energy usage, see Smartmeter.verbrauchRaw."""
+        if zaehlpunkt is None or customer_id is None:
+            customer_id, zaehlpunkt, anlagetype = await self.get_zaehlpunkt()
+        endpoint = f"messdaten/{customer_id}/{zaehlpunkt}/verbrauchRaw"
+        return await self._call_api(endpoint, query=self._verbrauch_raw_query(date_from, date_to))
+
+    async def ereignisse(
+        self, date_from: datetime, date_to: datetime = None, zaehlpunkt=None
+    ):
+        """Returns events between date_from and date_to, see Smartmeter.ereignisse."""
+        if date_to is None:
+            date_to = datetime.now()
+        if zaehlpunkt is None:
+            customer_id, zaehlpunkt, anlagetype = await self.get_zaehlpunkt()
+        query = {
+            "zaehlpunkt": zaehlpunkt,
+            "dateFrom": self._dt_string(date_from),
+            "dateUntil": self._dt_string(date_to),
+        }
+        return await self._call_api("user/ereignisse", const.API_URL_ALT, query=query)
+
+    async def historical_data(
+        self,
+        zaehlpunktnummer: str = None,
+        date_from: date = None,
+        date_until: date = None,
+        valuetype: const.ValueType = const.ValueType.METER_READ
+    ):
+        """Query historical data in a batch, see Smartmeter.historical_data."""
+        customer_id, zaehlpunkt, anlagetype = await self.get_zaehlpunkt(zaehlpunktnummer)
+
+        data = await self._call_api(
+            f"zaehlpunkte/{customer_id}/{zaehlpunkt}/messwerte",
+            base_url=const.API_URL_B2B,
+            query=self._historical_data_query(date_from, date_until, valuetype),
+            extra_headers=ACCEPT_JSON,
+        )
+        return self._validate_historical_data(data, zaehlpunkt)
+
+    async def bewegungsdaten(
+        self,
+        zaehlpunktnummer: str = None,
+        date_from: date = None,
+        date_until: date = None,
+        valuetype: const.ValueType = const.ValueType.QUARTER_HOUR,
+        aggregat: const.AggregatType = None,
+    ):
+        """Query bewegungsdaten in a batch, see Smartmeter.bewegungsdaten."""
+        customer_id, zaehlpunkt, anlagetype = await self.get_zaehlpunkt(zaehlpunktnummer)
+
+        data = await self._call_api(
+            "user/messwerte/bewegungsdaten",
+            base_url=const.API_URL_ALT,
+            query=self._bewegungsdaten_query(
+                customer_id, zaehlpunkt, anlagetype, date_from, date_until, valuetype, aggregat
+            ),
+            extra_headers=ACCEPT_JSON,
+        )
+        return self._validate_bewegungsdaten(data, zaehlpunkt)
+
+    async def bewegungsdaten_stream(
+        self,
+        zaehlpunktnummer: str = None,
+        date_from: date = None,
+        date_until: date = None,
+        valuetype: const.ValueType = const.ValueType.QUARTER_HOUR,
+        aggregat: const.AggregatType = None,
+    ):
+        """
+        Query bewegungsdaten like bewegungsdaten, but yield (key, value) per member of the
+        response while it is received and each item of values separately.
+        """
+        customer_id, zaehlpunkt, anlagetype = await self.get_zaehlpunkt(zaehlpunktnummer)
+
+        async for key, value in self._stream_api(
+            "user/messwerte/bewegungsdaten",
+            "values",
+            base_url=const.API_URL_ALT,
+            query=self._bewegungsdaten_query(
+                customer_id, zaehlpunkt, anlagetype, date_from, date_until, valuetype, aggregat
+            ),
+            extra_headers=ACCEPT_JSON,
+        ):
+            if key == "descriptor":
+                self._validate_bewegungsdaten({key: value}, zaehlpunkt)
+            yield key, value
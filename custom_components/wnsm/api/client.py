@@ -1,5 +1,4 @@
 """Contains the Smartmeter API Client."""
-import json
 import logging
 from datetime import datetime, timedelta, date
 from urllib import parse
@@ -13,9 +12,14 @@ import base64
 import hashlib
 import os
 import copy
+import random
 import re
 
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
 from . import constants as const
+from . import json_backend
 from .errors import (
     SmartmeterConnectionError,
     SmartmeterLoginError,
@@ -24,26 +28,108 @@ from .errors import (
 
 logger = logging.getLogger(__name__)
 
+ACCEPT_JSON = {
+    # For messwerte and bewegungsdaten calls, requesting json is important!
+    "Accept": "application/json"
+}
+
+TIMESTAMP_KEYS = ("zeitpunktVon", "zeitVon", "timestamp", "date")
+SUMMARY_MAX_VALUE_LENGTH = 80
+
+
+def _summarize_list(items: list, depth: int) -> str:
+    summary = f"[{len(items)} items"
+    if items and isinstance(items[0], dict):
+        key = next((k for k in TIMESTAMP_KEYS if k in items[0]), None)
+        if key is not None:
+            summary += f", first {key}={items[0].get(key)}, last {key}={items[-1].get(key)}"
+        elif depth > 0:
+            summary += ": " + ", ".join(_summarize_payload(item, depth - 1) for item in items)
+    return summary + "]"
+
+
+def _summarize_payload(payload: Any, depth: int = 2) -> str:
+    """Condensed representation of an API payload: scalars, item counts and first/last timestamps."""
+    if isinstance(payload, list):
+        return _summarize_list(payload, depth)
+    if isinstance(payload, dict):
+        parts = []
+        for key, value in payload.items():
+            if isinstance(value, list):
+                parts.append(f"{key}={_summarize_list(value, depth)}")
+            elif isinstance(value, dict) and depth > 0:
+                parts.append(f"{key}={_summarize_payload(value, depth - 1)}")
+            else:
+                parts.append(f"{key}={repr(value)[:SUMMARY_MAX_VALUE_LENGTH]}")
+        return "{" + ", ".join(parts) + "}"
+    return repr(payload)[:SUMMARY_MAX_VALUE_LENGTH]
+
+
+def jittered_backoff(backoff: float) -> float:
+    """Spread the retries of concurrent calls within [backoff / 2, backoff]."""
+    return backoff / 2 + random.uniform(0, backoff / 2)
+
+
+class JitteredRetry(Retry):
+    """Exponential backoff with jitter, which also honours Retry-After on all retried status codes."""
+
+    RETRY_AFTER_STATUS_CODES = frozenset(const.HTTP_RETRY_STATUS_CODES)
+
+    def get_backoff_time(self):
+        return jittered_backoff(super().get_backoff_time())
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        return None if retry_after is None else min(retry_after, const.HTTP_MAX_RETRY_AFTER_SECONDS)
+
+
+def _create_session() -> requests.Session:
+    """Session retrying transient failures, like AsyncSmartmeterClient does."""
+    retry = JitteredRetry(
+        total=const.HTTP_RETRIES,
+        backoff_factor=const.HTTP_RETRY_BACKOFF_FACTOR,
+        status_forcelist=const.HTTP_RETRY_STATUS_CODES,
+        # the last response is returned to the caller, which reports its status
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
 
 class Smartmeter:
     """Smartmeter client."""
 
-    def __init__(self, username, password, input_code_verifier=None):
+    def __init__(self, username, password, input_code_verifier=None,
+                 payload_log_mode: const.PayloadLogMode = const.PayloadLogMode.FULL,
+                 session: requests.Session = None):
         """Access the Smartmeter API.
 
         Args:
             username (str): Username used for API Login.
             password (str): Password used for API Login.
+            payload_log_mode (const.PayloadLogMode, optional): How API payloads are written
+                to the debug log. Payloads are only serialized if DEBUG is enabled.
+            session (requests.Session, optional): Session used for all requests. If None, a
+                session retrying transient failures is created.
         """
         self.username = username
         self.password = password
-        self.session = requests.Session()
+        self.payload_log_mode = payload_log_mode
+        self.session = _create_session() if session is None else session
         self._access_token = None
         self._refresh_token = None
         self._api_gateway_token = None
         self._access_token_expiration = None
         self._refresh_token_expiration = None
         self._api_gateway_b2b_token = None
+        self._session_state = None
+        self._contracts = None
+        self._contracts_session = None
+        self._contracts_expiration = None
+        self._zaehlpunkt_index = {}
         
         self._code_verifier = None
         if input_code_verifier is not None:
@@ -54,16 +140,22 @@ class Smartmeter:
         self._local_login_args = None
 
     def reset(self):
-        self.session = requests.Session()
+        # keep the session and its connections, only drop the cookies of the old login
+        self._clear_cookies()
         self._access_token = None
         self._refresh_token = None
         self._api_gateway_token = None
         self._access_token_expiration = None
         self._refresh_token_expiration = None
         self._api_gateway_b2b_token = None
+        self._session_state = None
         self._code_verifier = None
         self._code_challenge = None
         self._local_login_args = None
+        self.invalidate_contracts()
+
+    def _clear_cookies(self):
+        self.session.cookies.clear()
 
     def is_login_expired(self):
         return self._access_token_expiration is not None and datetime.now() >= self._access_token_expiration
@@ -71,6 +163,18 @@ class Smartmeter:
     def is_logged_in(self):
         return self._access_token is not None and not self.is_login_expired()
 
+    def expire_access_token(self):
+        """Marks the access token as expired, e.g. after the API rejected it. The next login() renews it."""
+        if self._access_token_expiration is not None:
+            self._access_token_expiration = datetime.now()
+
+    def is_refresh_token_valid(self):
+        return (
+            self._refresh_token is not None
+            and self._refresh_token_expiration is not None
+            and datetime.now() < self._refresh_token_expiration
+        )
+
     def generate_code_verifier(self):
         """
         generate a code verifier
@@ -94,9 +198,9 @@ class Smartmeter:
         
         return True
     
-    def load_login_page(self):
+    def _prepare_login_url(self):
         """
-        loads login page and extracts encoded login url
+        prepares code verifier and code challenge and returns the url of the login page
         """
         
         #generate a code verifier, which serves as a secure random value
@@ -113,7 +217,21 @@ class Smartmeter:
         #add code_challenge in self._local_login_args
         self._local_login_args["code_challenge"] = self._code_challenge
         
-        login_url = const.AUTH_URL + "auth?" + parse.urlencode(self._local_login_args)
+        return const.AUTH_URL + "auth?" + parse.urlencode(self._local_login_args)
+
+    @staticmethod
+    def _form_action(content):
+        """
+        extracts the action of the first form of a html page or None if there is no form
+        """
+        forms = html.fromstring(content).xpath("(//form/@action)")
+        return forms[0] if forms else None
+
+    def load_login_page(self):
+        """
+        loads login page and extracts encoded login url
+        """
+        login_url = self._prepare_login_url()
         try:
             result = self.session.get(login_url)
         except Exception as exception:
@@ -122,13 +240,11 @@ class Smartmeter:
             raise SmartmeterConnectionError(
                 f"Could not load login page. Error: {result.content}"
             )
-        tree = html.fromstring(result.content)
-        forms = tree.xpath("(//form/@action)")
+        action = self._form_action(result.content)
         
-        if not forms:
+        if action is None:
             raise SmartmeterConnectionError("No form found on the login page.")
         
-        action = forms[0]
         return action
 
     def credentials_login(self, url):
@@ -144,8 +260,9 @@ class Smartmeter:
                 },
                 allow_redirects=False,
             )
-            tree = html.fromstring(result.content)
-            action = tree.xpath("(//form/@action)")[0]
+            action = self._form_action(result.content)
+            if action is None:
+                raise SmartmeterConnectionError("No form found on the credentials page.")
 
             result = self.session.post(
                 action,
@@ -160,9 +277,16 @@ class Smartmeter:
                 "Could not login with credentials"
             ) from exception
 
-        if "Location" not in result.headers:
+        return self._code_from_location(result.headers)
+
+    @staticmethod
+    def _code_from_location(headers):
+        """
+        extracts the code from the 'Location' header of the credentials login redirect
+        """
+        if "Location" not in headers:
             raise SmartmeterLoginError("Login failed. Check username/password.")
-        location = result.headers["Location"]
+        location = headers["Location"]
 
         parsed_url = parse.urlparse(location)
 
@@ -199,42 +323,118 @@ class Smartmeter:
             raise SmartmeterConnectionError(
                 f"Could not obtain access token: {result.content}"
             )
-        tokens = result.json()
+        return self._check_tokens(json_backend.loads(result.content))
+
+    def refresh_tokens(self):
+        """
+        Uses the refresh token to obtain a new access (and refresh) token
+        """
+        try:
+            result = self.session.post(
+                const.AUTH_URL + "token",
+                data=const.build_refresh_token_args(refresh_token=self._refresh_token)
+            )
+        except Exception as exception:
+            raise SmartmeterConnectionError(
+                "Could not refresh access token"
+            ) from exception
+
+        if result.status_code != 200:
+            raise SmartmeterConnectionError(
+                f"Could not refresh access token: {result.content}"
+            )
+        return self._check_tokens(json_backend.loads(result.content))
+
+    @staticmethod
+    def _check_tokens(tokens):
         if tokens["token_type"] != "Bearer":
             raise SmartmeterLoginError(
                 f'Bearer token required, but got {tokens["token_type"]!r}'
             )
         return tokens
 
+    def _can_refresh(self):
+        """Only a refresh of the access token is needed, since the API keys are known and the refresh token is valid"""
+        return self.is_refresh_token_valid() and self._api_gateway_token is not None
+
+    def _set_tokens(self, tokens):
+        self._access_token = tokens["access_token"]
+        self._refresh_token = tokens.get("refresh_token", self._refresh_token)
+        self._session_state = tokens.get("session_state", self._session_state)
+        now = datetime.now()
+        self._access_token_expiration = now + timedelta(seconds=tokens["expires_in"])
+        if "refresh_expires_in" in tokens:
+            self._refresh_token_expiration = now + timedelta(
+                seconds=tokens["refresh_expires_in"]
+            )
+
+        logger.debug("Access Token valid until %s", self._access_token_expiration)
+
     def login(self):
         """
         login with credentials specified in ctor
+        If the access token expired, but the refresh token is still valid, the access token is refreshed instead.
         """
         if self.is_login_expired():
+            if self._can_refresh():
+                try:
+                    self._set_tokens(self.refresh_tokens())
+                    return self
+                except (SmartmeterConnectionError, SmartmeterLoginError) as exception:
+                    logger.debug("Refreshing access token failed, performing full login: %s", exception)
             self.reset()
         if not self.is_logged_in():
             url = self.load_login_page()
             code = self.credentials_login(url)
-            tokens = self.load_tokens(code)
-            self._access_token = tokens["access_token"]
-            self._refresh_token = tokens["refresh_token"]
-            now = datetime.now()
-            self._access_token_expiration = now + timedelta(seconds=tokens["expires_in"])
-            self._refresh_token_expiration = now + timedelta(
-                seconds=tokens["refresh_expires_in"]
-            )
-
-            logger.debug("Access Token valid until %s" % self._access_token_expiration)
+            self._set_tokens(self.load_tokens(code))
 
             self._api_gateway_token, self._api_gateway_b2b_token = self._get_api_key(
                 self._access_token
             )
         return self
 
+    def export_session(self) -> dict:
+        """
+        Returns tokens, their expirations and the API gateway keys as JSON serializable dict,
+        which can be passed to restore_session to avoid a new login.
+        """
+        def _iso(value):
+            return None if value is None else value.isoformat()
+
+        return {
+            "access_token": self._access_token,
+            "refresh_token": self._refresh_token,
+            "session_state": self._session_state,
+            "access_token_expiration": _iso(self._access_token_expiration),
+            "refresh_token_expiration": _iso(self._refresh_token_expiration),
+            "api_gateway_token": self._api_gateway_token,
+            "api_gateway_b2b_token": self._api_gateway_b2b_token,
+        }
+
+    def restore_session(self, session: dict):
+        """
+        Restores a session previously returned by export_session.
+        Incomplete sessions are ignored, login() then performs a full login.
+        """
+        def _datetime(value):
+            return None if value is None else datetime.fromisoformat(value)
+
+        required = ["access_token", "access_token_expiration", "api_gateway_token", "api_gateway_b2b_token"]
+        if not session or any(session.get(key) is None for key in required):
+            return self
+        self._access_token = session["access_token"]
+        self._refresh_token = session.get("refresh_token")
+        self._session_state = session.get("session_state")
+        self._access_token_expiration = _datetime(session["access_token_expiration"])
+        self._refresh_token_expiration = _datetime(session.get("refresh_token_expiration"))
+        self._api_gateway_token = session["api_gateway_token"]
+        self._api_gateway_b2b_token = session["api_gateway_b2b_token"]
+        return self
+
     def _access_valid_or_raise(self):
         """Checks if the access token is still valid or raises an exception"""
         if datetime.now() >= self._access_token_expiration:
-            # TODO: If the refresh token is still valid, it could be refreshed here
+            # login() refreshes the access token as long as the refresh token is still valid
             raise SmartmeterConnectionError(
                 "Access Token is not valid anymore, please re-log!"
             )
@@ -244,10 +444,17 @@ class Smartmeter:
 
         headers = {"Authorization": f"Bearer {token}"}
         try:
-            result = self.session.get(const.API_CONFIG_URL, headers=headers).json()
+            result = json_backend.loads(self.session.get(const.API_CONFIG_URL, headers=headers).content)
         except Exception as exception:
             raise SmartmeterConnectionError("Could not obtain API key") from exception
 
+        return self._api_keys_from_config(result)
+
+    @staticmethod
+    def _api_keys_from_config(result):
+        """
+        extracts b2c and b2b API keys from app-config.json and updates the API urls if they changed
+        """
         find_keys = ["b2cApiKey", "b2bApiKey"]
         for key in find_keys:
             if key not in result:
@@ -279,6 +486,29 @@ class Smartmeter:
         timeout=60.0,
         extra_headers=None,
     ):
+        url, headers = self._prepare_request(endpoint, base_url, data, query, extra_headers)
+
+        response = self.session.request(
+            method, url, headers=headers, json=data, timeout=timeout
+        )
+
+        if return_response:
+            if logger.isEnabledFor(logging.DEBUG):
+                try:
+                    payload = json_backend.loads(response.content)
+                except ValueError:
+                    payload = response.text
+                self._log_api_call(url, data, payload)
+            return response
+
+        payload = json_backend.loads(response.content)
+        self._log_api_call(url, data, payload)
+        return payload
+
+    def _prepare_request(self, endpoint, base_url=None, data=None, query=None, extra_headers=None):
+        """
+        checks the access token and returns url and headers for an API call
+        """
         self._access_valid_or_raise()
 
         if base_url is None:
@@ -307,33 +537,85 @@ class Smartmeter:
         if data:
             headers["Content-Type"] = "application/json"
 
-        response = self.session.request(
-            method, url, headers=headers, json=data, timeout=timeout
+        return url, headers
+
+    def _format_payload(self, payload):
+        if self.payload_log_mode == const.PayloadLogMode.SUMMARY:
+            return _summarize_payload(payload)
+        return json_backend.dumps(payload, indent=True)
+
+    def _log_api_call(self, url, data, payload):
+        """Writes request and response payload to the debug log, only serializing them if DEBUG is enabled."""
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
+        logger.debug(
+            "\nAPI Request: %s\n%s\n\nAPI Response: %s",
+            url,
+            "" if data is None else "body: " + self._format_payload(data),
+            None if payload is None else self._format_payload(payload),
         )
 
-        logger.debug("\nAPI Request: %s\n%s\n\nAPI Response: %s" % (
-            url, ("" if data is None else "body: "+json.dumps(data, indent=2)),
-            None if response is None or response.json() is None else json.dumps(response.json(), indent=2)))
+    def _login_session_key(self):
+        """Identifies the current login session, the contracts cache is bound to it."""
+        return self._session_state or self._access_token
 
-        if return_response:
-            return response
+    def invalidate_contracts(self):
+        """Drops the cached zaehlpunkte (contracts) response."""
+        self._contracts = None
+        self._contracts_session = None
+        self._contracts_expiration = None
+        self._zaehlpunkt_index = {}
 
-        return response.json()
+    def contracts(self):
+        """
+        Returns the zaehlpunkte (contracts) response, cached for the current login session.
+        The cache expires after const.CONTRACTS_CACHE_TTL_SECONDS.
+        """
+        contracts = self._cached_contracts()
+        if contracts is not None:
+            return contracts
+        return self._cache_contracts(self.zaehlpunkte())
+
+    def _cached_contracts(self):
+        if (
+            self._contracts is not None
+            and self._contracts_session == self._login_session_key()
+            and datetime.now() < self._contracts_expiration
+        ):
+            return self._contracts
+        return None
+
+    def _cache_contracts(self, contracts):
+        if not isinstance(contracts, list):
+            # do not cache error responses
+            return contracts
+
+        index = {}
+        for contract in contracts:
+            for z in contract.get("zaehlpunkte", []):
+                index[z["zaehlpunktnummer"]] = (
+                    contract.get("geschaeftspartner"),
+                    z.get("anlage", {}).get("typ"),
+                )
+        self._contracts = contracts
+        self._contracts_session = self._login_session_key()
+        self._contracts_expiration = datetime.now() + timedelta(seconds=const.CONTRACTS_CACHE_TTL_SECONDS)
+        self._zaehlpunkt_index = index
+        return contracts
 
     def get_zaehlpunkt(self, zaehlpunkt: str = None) -> tuple[str, str, str]:
-        contracts = self.zaehlpunkte()
+        return self._resolve_zaehlpunkt(self.contracts(), zaehlpunkt)
+
+    def _resolve_zaehlpunkt(self, contracts, zaehlpunkt: str = None) -> tuple[str, str, str]:
         if zaehlpunkt is None:
             customer_id = contracts[0]["geschaeftspartner"]
             zp = contracts[0]["zaehlpunkte"][0]["zaehlpunktnummer"]
             anlagetype = contracts[0]["zaehlpunkte"][0]["anlage"]["typ"]
+        elif zaehlpunkt in self._zaehlpunkt_index:
+            customer_id, anlagetype = self._zaehlpunkt_index[zaehlpunkt]
+            zp = zaehlpunkt
         else:
             customer_id = zp = anlagetype = None
-            for contract in contracts:
-                zp_details = [z for z in contract["zaehlpunkte"] if z["zaehlpunktnummer"] == zaehlpunkt]
-                if len(zp_details) > 0:
-                    anlagetype = zp_details[0]["anlage"]["typ"]
-                    zp = zp_details[0]["zaehlpunktnummer"]
-                    customer_id = contract["geschaeftspartner"]
         return customer_id, zp, const.AnlagenType.from_str(anlagetype)
 
     def zaehlpunkte(self):
@@ -379,12 +661,14 @@ class Smartmeter:
         if zaehlpunkt is None or customer_id is None:
             customer_id, zaehlpunkt, anlagetype = self.get_zaehlpunkt()
         endpoint = f"messdaten/{customer_id}/{zaehlpunkt}/verbrauch"
-        query = const.build_verbrauchs_args(
+        return self._call_api(endpoint, query=self._verbrauch_query(date_from, resolution))
+
+    def _verbrauch_query(self, date_from: datetime, resolution: const.Resolution):
+        return const.build_verbrauchs_args(
             # This one does not have a dateTo...
             dateFrom=self._dt_string(date_from),
             dayViewResolution=resolution.value
         )
-        return self._call_api(endpoint, query=query)
 
     def verbrauchRaw(
         self,
@@ -411,18 +695,20 @@ class Smartmeter:
             dict: JSON response of api call to
                 'messdaten/CUSTOMER_ID/ZAEHLPUNKT/verbrauchRaw'
         """
-        if date_to is None:
-            date_to = datetime.now()
         if zaehlpunkt is None or customer_id is None:
             customer_id, zaehlpunkt, anlagetype = self.get_zaehlpunkt()
         endpoint = f"messdaten/{customer_id}/{zaehlpunkt}/verbrauchRaw"
-        query = dict(
+        return self._call_api(endpoint, query=self._verbrauch_raw_query(date_from, date_to))
+
+    def _verbrauch_raw_query(self, date_from: datetime, date_to: datetime = None):
+        if date_to is None:
+            date_to = datetime.now()
+        return dict(
             # These are the only three fields that are used for that endpoint:
             dateFrom=self._dt_string(date_from),
             dateTo=self._dt_string(date_to),
             granularity="DAY",
         )
-        return self._call_api(endpoint, query=query)
 
     def profil(self):
         """Returns profile of a logged-in user.
@@ -540,6 +826,17 @@ class Smartmeter:
         else:
             customer_id, zaehlpunkt, anlagetype = self.get_zaehlpunkt(zaehlpunktnummer)
 
+        # API Call
+        data = self._call_api(
+            f"zaehlpunkte/{customer_id}/{zaehlpunkt}/messwerte",
+            base_url=const.API_URL_B2B,
+            query=self._historical_data_query(date_from, date_until, valuetype),
+            extra_headers=ACCEPT_JSON,
+        )
+        return self._validate_historical_data(data, zaehlpunkt)
+
+    @staticmethod
+    def _historical_data_query(date_from: date, date_until: date, valuetype: const.ValueType):
         # Set date range defaults
         if date_until is None:
             date_until = date.today()
@@ -548,25 +845,13 @@ class Smartmeter:
             date_from = date_until - relativedelta(years=3)
 
         # Query parameters
-        query = {
+        return {
             "datumVon": date_from.strftime("%Y-%m-%d"),
             "datumBis": date_until.strftime("%Y-%m-%d"),
             "wertetyp": valuetype.value,
         }
-        
-        extra = {
-            # For this API Call, requesting json is important!
-            "Accept": "application/json"
-        }
-
-        # API Call
-        data = self._call_api(
-            f"zaehlpunkte/{customer_id}/{zaehlpunkt}/messwerte",
-            base_url=const.API_URL_B2B,
-            query=query,
-            extra_headers=extra,
-        )
 
+    def _validate_historical_data(self, data, zaehlpunkt: str):
         # Sanity check: Validate returned zaehlpunkt
         if data.get("zaehlpunkt") != zaehlpunkt:
             logger.debug("Returned data: %s", data)
@@ -587,15 +872,36 @@ class Smartmeter:
         date_from: date = None,
         date_until: date = None,
         valuetype: const.ValueType = const.ValueType.QUARTER_HOUR,
-        aggregat: str = None,
+        aggregat: const.AggregatType = None,
     ):
         """
         Query historical data in a batch
         If no arguments are given, a span of three year is queried (same day as today but from current year - 3).
         If date_from is not given but date_until, again a three year span is assumed.
+        With aggregat, the API sums up the values, e.g. per hour, instead of returning every value.
         """
         customer_id, zaehlpunkt, anlagetype = self.get_zaehlpunkt(zaehlpunktnummer)
 
+        data = self._call_api(
+            f"user/messwerte/bewegungsdaten",
+            base_url=const.API_URL_ALT,
+            query=self._bewegungsdaten_query(
+                customer_id, zaehlpunkt, anlagetype, date_from, date_until, valuetype, aggregat
+            ),
+            extra_headers=ACCEPT_JSON,
+        )
+        return self._validate_bewegungsdaten(data, zaehlpunkt)
+
+    @staticmethod
+    def _bewegungsdaten_query(
+        customer_id: str,
+        zaehlpunkt: str,
+        anlagetype: const.AnlagenType,
+        date_from: date,
+        date_until: date,
+        valuetype: const.ValueType,
+        aggregat: const.AggregatType,
+    ):
         if anlagetype == const.AnlagenType.FEEDING:
             if valuetype == const.ValueType.DAY:
                 rolle = const.RoleType.DAILY_FEEDING.value
@@ -613,26 +919,17 @@ class Smartmeter:
         if date_from is None:
             date_from = date_until - relativedelta(years=3)
 
-        query = {
+        return {
             "geschaeftspartner": customer_id,
             "zaehlpunktnummer": zaehlpunkt,
             "rolle": rolle,
             "zeitpunktVon": date_from.strftime("%Y-%m-%dT%H:%M:00.000Z"), # we catch up from the exact date of the last import to compensate for time shift
             "zeitpunktBis": date_until.strftime("%Y-%m-%dT23:59:59.999Z"),
-            "aggregat": aggregat or "NONE"
+            "aggregat": (aggregat or const.AggregatType.NONE).value
         }
 
-        extra = {
-            # For this API Call, requesting json is important!
-            "Accept": "application/json"
-        }
-
-        data = self._call_api(
-            f"user/messwerte/bewegungsdaten",
-            base_url=const.API_URL_ALT,
-            query=query,
-            extra_headers=extra,
-        )
+    @staticmethod
+    def _validate_bewegungsdaten(data, zaehlpunkt: str):
         if data["descriptor"]["zaehlpunktnummer"] != zaehlpunkt:
             raise SmartmeterQueryError("Returned data does not match given zaehlpunkt!")
         return data
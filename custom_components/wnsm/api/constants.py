@@ -12,6 +12,12 @@ API_URL_B2B = "https://api.wstw.at/gateway/WN_SMART_METER_PORTAL_API_B2B/1.0"
 REDIRECT_URI = "https://smartmeter-web.wienernetze.at/"
 API_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
 AUTH_URL = "https://log.wien/auth/realms/logwien/protocol/openid-connect/"  # noqa
+CONTRACTS_CACHE_TTL_SECONDS = 60 * 60  #: how long the zaehlpunkte (contracts) response is reused within a login session
+STREAM_CHUNK_SIZE = 64 * 1024  #: bytes read at a time from streamed responses
+HTTP_RETRIES = 3  #: retries of failed connections and of HTTP_RETRY_STATUS_CODES responses to idempotent requests
+HTTP_RETRY_BACKOFF_FACTOR = 0.5  #: seconds before the first retry, doubled for each further one
+HTTP_RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+HTTP_MAX_RETRY_AFTER_SECONDS = 60  #: longer Retry-After headers are capped, the call is held up meanwhile
 
 LOGIN_ARGS = {
     "client_id": "wn-smartmeter",
@@ -37,6 +43,12 @@ class Resolution(enum.Enum):
     QUARTER_HOUR = "QUARTER-HOUR"  #: gets consumption data per 15min
 
 
+class PayloadLogMode(enum.Enum):
+    """How API payloads are written to the debug log"""
+    FULL = "FULL"  #: pretty-printed request and response bodies
+    SUMMARY = "SUMMARY"  #: top-level fields, item counts and first/last timestamps of lists only
+
+
 class ValueType(enum.Enum):
     """Possible 'wertetyp' for querying historical data"""
     METER_READ = "METER_READ"  #: Meter reading for the day
@@ -76,6 +88,14 @@ class RoleType(enum.Enum):
     DAILY_FEEDING = "E001"  #: Feeding data is updated in daily steps
     QUARTER_HOURLY_FEEDING = "E002"  #: Feeding data is updated in quarter hour steps
 
+
+class AggregatType(enum.Enum):
+    """Possible server-side aggregations of bewegungsdaten"""
+    NONE = "NONE"  #: values in the granularity of the role
+    SUM_PER_HOUR = "SUM_PER_HOUR"  #: sum of the values of each hour
+    SUM_PER_DAY = "SUM_PER_DAY"  #: sum of the values of each day
+
+
 def build_access_token_args(**kwargs):
     """
     build access token and add kwargs
@@ -89,6 +109,18 @@ def build_access_token_args(**kwargs):
     return args
 
 
+def build_refresh_token_args(**kwargs):
+    """
+    build refresh token grant args and add kwargs
+    """
+    args = {
+        "grant_type": "refresh_token",
+        "client_id": "wn-smartmeter",
+    }
+    args.update(**kwargs)
+    return args
+
+
 def build_verbrauchs_args(**kwargs):
     """
     build arguments for verbrauchs call and add kwargs
@@ -0,0 +1,29 @@
+"""JSON decoding and encoding of the API client, with orjson if it is installed."""
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson ships with Home Assistant
+    orjson = None
+
+#: name of the library used by loads and dumps
+BACKEND = "stdlib" if orjson is None else "orjson"
+
+
+def loads(data: bytes | str) -> Any:
+    """Decode a JSON document, raises ValueError if it is invalid."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any, indent: bool = False) -> str:
+    """Encode obj as JSON, indented by two spaces if indent is set."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else None).decode()
+        except TypeError:
+            # e.g. integers beyond 64 bit or non-string keys, which the stdlib encoder handles
+            pass
+    return json.dumps(obj, indent=2 if indent else None)
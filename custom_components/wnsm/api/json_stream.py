@@ -0,0 +1,106 @@
+"""Incremental parsing of JSON responses with one large array."""
+import codecs
+import json
+from typing import Any, AsyncIterable, AsyncIterator
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+_NUMBER_CHARS = "0123456789+-.eE"
+
+
+class _ChunkBuffer:
+    """Decoded text of a byte stream, of which only the unparsed rest is kept."""
+
+    def __init__(self, chunks: AsyncIterable[bytes]):
+        self._chunks = chunks.__aiter__()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    async def fill(self) -> bool:
+        """Append the next chunk, returns False if the stream is exhausted."""
+        if self.eof:
+            return False
+        try:
+            chunk = await self._chunks.__anext__()
+            decoded = self._utf8.decode(chunk)
+        except StopAsyncIteration:
+            self.eof = True
+            decoded = self._utf8.decode(b"", final=True)
+        self.text = self.text[self.pos:] + decoded
+        self.pos = 0
+        return True
+
+    async def peek(self) -> str:
+        """Skip whitespace and return the next character, an empty string at the end."""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not await self.fill():
+                return ""
+
+    async def expect(self, char: str) -> None:
+        """Consume char, raises ValueError if the stream continues differently."""
+        found = await self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} in JSON stream, got {found or 'end of data'!r}")
+        self.pos += 1
+
+    async def value(self) -> Any:
+        """Decode the next JSON value, reading chunks until it is complete."""
+        await self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if not await self.fill():
+                    raise
+                continue
+            # a number at the end of the buffer may continue in the next chunk
+            if (
+                self.eof
+                or isinstance(value, bool)
+                or not isinstance(value, (int, float))
+                or self.text[end:].strip(_NUMBER_CHARS)
+            ):
+                self.pos = end
+                return value
+            await self.fill()
+
+
+async def iter_object_members(chunks: AsyncIterable[bytes], array_key: str) -> AsyncIterator[tuple[str, Any]]:
+    """Parse a JSON object from chunks of bytes and yield (key, value) per member.
+
+    The items of the array under array_key are yielded one by one as (array_key, item),
+    so only the item being parsed and one chunk are held in memory. An empty array is
+    yielded as (array_key, []). Raises ValueError if the data is not a JSON object.
+    """
+    buffer = _ChunkBuffer(chunks)
+    await buffer.expect("{")
+    if await buffer.peek() == "}":
+        return
+    while True:
+        key = await buffer.value()
+        if not isinstance(key, str):
+            raise ValueError(f"Expected a member name in JSON stream, got {key!r}")
+        await buffer.expect(":")
+        if key == array_key and await buffer.peek() == "[":
+            buffer.pos += 1
+            if await buffer.peek() == "]":
+                buffer.pos += 1
+                yield key, []
+            else:
+                while True:
+                    yield key, await buffer.value()
+                    if await buffer.peek() == "]":
+                        buffer.pos += 1
+                        break
+                    await buffer.expect(",")
+        else:
+            yield key, await buffer.value()
+        if await buffer.peek() == "}":
+            return
+        await buffer.expect(",")
@@ -3,28 +3,54 @@
 from __future__ import annotations
 
 from homeassistant.components.sensor import SensorEntity
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from .AsyncSmartmeter import AsyncSmartmeter
-from .api import Smartmeter
+from .coordinator import WNSMDataUpdateCoordinator, ZaehlpunktData
 
 
-class WNSMBaseSensor(SensorEntity):
-    """Provide shared Smartmeter client handling for sensors."""
+class WNSMBaseSensor(CoordinatorEntity[WNSMDataUpdateCoordinator], SensorEntity):
+    """Provide shared coordinator handling for sensors of one Zählpunkt."""
 
     def __init__(
         self,
-        async_smartmeter: AsyncSmartmeter | None,
-        username: str,
-        password: str,
+        coordinator: WNSMDataUpdateCoordinator,
+        zaehlpunkt: str,
     ) -> None:
-        super().__init__()
-        self.username = username
-        self.password = password
-        self._async_smartmeter = async_smartmeter
-
-    def _get_async_smartmeter(self) -> AsyncSmartmeter:
-        """Return shared async smartmeter client, fallback to per-entity one."""
-        if self._async_smartmeter is None:
-            smartmeter = Smartmeter(username=self.username, password=self.password)
-            self._async_smartmeter = AsyncSmartmeter(self.hass, smartmeter)
-        return self._async_smartmeter
+        super().__init__(coordinator)
+        self.zaehlpunkt = zaehlpunkt
+
+    @property
+    def async_smartmeter(self) -> AsyncSmartmeter:
+        """Return the async smartmeter client shared by the config entry."""
+        return self.coordinator.async_smartmeter
+
+    @property
+    def zaehlpunkt_data(self) -> ZaehlpunktData | None:
+        """Return the data fetched for this Zählpunkt in the last update cycle."""
+        if not self.coordinator.data:
+            return None
+        return self.coordinator.data.get(self.zaehlpunkt)
+
+    @property
+    def available(self) -> bool:
+        """Return True if the last update cycle produced data for this Zählpunkt."""
+        return super().available and self.zaehlpunkt_data is not None
+
+    async def async_added_to_hass(self) -> None:
+        """Apply data of the initial refresh when the entity is added."""
+        await super().async_added_to_hass()
+        self._handle_coordinator_update()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Update entity state from the coordinator data."""
+        data = self.zaehlpunkt_data
+        if data is not None:
+            self._update_from_data(data)
+        super()._handle_coordinator_update()
+
+    @callback
+    def _update_from_data(self, data: ZaehlpunktData) -> None:
+        """Update entity state from the data of this Zählpunkt, sensors override this."""
@@ -0,0 +1,43 @@
+"""Persist the progress of chunked statistics backfills across Home Assistant restarts."""
+
+from __future__ import annotations
+
+from datetime import datetime
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+from .energy import kwh_to_milli_wh, milli_wh_to_kwh_str
+from .statistics_utils import parse_stats_timestamp
+
+STORAGE_VERSION = 1
+
+
+class BackfillCheckpointStore:
+    """Store running sum (milli-Wh, persisted as exact kWh) and end of the last imported backfill window of one statistic."""
+
+    def __init__(self, hass: HomeAssistant, zaehlpunkt: str) -> None:
+        self._store: Store[dict] = Store(
+            hass,
+            STORAGE_VERSION,
+            f"{DOMAIN}.{zaehlpunkt.lower()}.backfill",
+        )
+
+    async def async_load(self) -> tuple[datetime, int] | None:
+        """Return (end, sum) of the last imported window or None if no backfill is in progress."""
+        checkpoint = await self._store.async_load()
+        if not checkpoint:
+            return None
+        end = parse_stats_timestamp(checkpoint.get("end"))
+        if end is None or checkpoint.get("sum") is None:
+            return None
+        return end, kwh_to_milli_wh(checkpoint["sum"])
+
+    async def async_save(self, end: datetime, total_usage: int) -> None:
+        """Persist the checkpoint after a window has been imported."""
+        await self._store.async_save({"end": end.isoformat(), "sum": milli_wh_to_kwh_str(total_usage)})
+
+    async def async_remove(self) -> None:
+        """Drop the checkpoint once the backfill reached its end."""
+        await self._store.async_remove()
@@ -12,18 +12,31 @@ from homeassistant.const import CONF_PASSWORD, CONF_SCAN_INTERVAL, CONF_USERNAME
 
 from .api import Smartmeter
 from .const import (
-    ATTRS_ZAEHLPUNKTE_CALL,
     CONF_ENABLE_DAY_STATISTICS_IMPORT,
+    CONF_MAX_CONCURRENT_REQUESTS,
+    CONF_MAX_REQUESTS_PER_SECOND,
+    CONF_SETTLE_DAYS,
+    CONF_STREAM_RESPONSES,
     CONF_ZAEHLPUNKTE,
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
+    DEFAULT_MAX_REQUESTS_PER_SECOND,
     DEFAULT_SCAN_INTERVAL_MINUTES,
+    DEFAULT_SETTLE_DAYS,
     DOMAIN,
+    ZAEHLPUNKTE_CALL_MAPPER,
 )
-from .utils import translate_dict
 
 _LOGGER = logging.getLogger(__name__)
 
 
-def _options_schema(scan_interval: int, enable_day_statistics_import: bool) -> vol.Schema:
+def _options_schema(
+    scan_interval: int,
+    enable_day_statistics_import: bool,
+    max_concurrent_requests: int,
+    max_requests_per_second: float,
+    settle_days: int,
+    stream_responses: bool,
+) -> vol.Schema:
     """Return schema for options flow.
 
     Uses plain voluptuous validators for broad HA-version compatibility.
@@ -37,6 +50,18 @@ def _options_schema(scan_interval: int, enable_day_statistics_import: bool) -> v
                 CONF_ENABLE_DAY_STATISTICS_IMPORT,
                 default=enable_day_statistics_import,
             ): cv.boolean,
+            vol.Required(
+                CONF_MAX_CONCURRENT_REQUESTS,
+                default=max_concurrent_requests,
+            ): vol.All(vol.Coerce(int), vol.Range(min=1, max=10)),
+            vol.Required(
+                CONF_MAX_REQUESTS_PER_SECOND,
+                default=max_requests_per_second,
+            ): vol.All(vol.Coerce(float), vol.Range(min=0.1, max=20)),
+            vol.Required(CONF_SETTLE_DAYS, default=settle_days): vol.All(
+                vol.Coerce(int), vol.Range(min=1, max=60)
+            ),
+            vol.Required(CONF_STREAM_RESPONSES, default=stream_responses): cv.boolean,
         }
     )
 
@@ -93,7 +118,7 @@ class WienerNetzeSmartMeterCustomConfigFlow(config_entries.ConfigFlow, domain=DO
                     CONF_USERNAME: user_input[CONF_USERNAME],
                     CONF_PASSWORD: user_input[CONF_PASSWORD],
                     CONF_ZAEHLPUNKTE: [
-                        translate_dict(zp, ATTRS_ZAEHLPUNKTE_CALL)
+                        ZAEHLPUNKTE_CALL_MAPPER(zp)
                         for zp in zaehlpunkte
                         if zp.get("isActive")
                     ],
@@ -133,11 +158,25 @@ class WienerNetzeSmartMeterOptionsFlow(config_entries.OptionsFlow):
             CONF_ENABLE_DAY_STATISTICS_IMPORT,
             self._config_entry.data.get(CONF_ENABLE_DAY_STATISTICS_IMPORT, True),
         )
+        current_max_concurrent_requests = self._config_entry.options.get(
+            CONF_MAX_CONCURRENT_REQUESTS, DEFAULT_MAX_CONCURRENT_REQUESTS
+        )
+        current_max_requests_per_second = self._config_entry.options.get(
+            CONF_MAX_REQUESTS_PER_SECOND, DEFAULT_MAX_REQUESTS_PER_SECOND
+        )
+        current_settle_days = self._config_entry.options.get(
+            CONF_SETTLE_DAYS, DEFAULT_SETTLE_DAYS
+        )
+        current_stream_responses = self._config_entry.options.get(CONF_STREAM_RESPONSES, False)
 
         return self.async_show_form(
             step_id="init",
             data_schema=_options_schema(
                 current_scan_interval,
                 current_day_stats_import,
+                current_max_concurrent_requests,
+                current_max_requests_per_second,
+                current_settle_days,
+                current_stream_responses,
             ),
         )
@@ -1,11 +1,30 @@
 """
     component constants
 """
+from .utils import AttributeMapper
+
 DOMAIN = "wnsm"
 
 CONF_ZAEHLPUNKTE = "zaehlpunkte"
 DEFAULT_SCAN_INTERVAL_MINUTES = 60 * 6
 CONF_ENABLE_DAY_STATISTICS_IMPORT = "enable_day_statistics_import"
+CONF_MAX_CONCURRENT_REQUESTS = "max_concurrent_requests"
+DEFAULT_MAX_CONCURRENT_REQUESTS = 3
+CONF_MAX_REQUESTS_PER_SECOND = "max_requests_per_second"
+DEFAULT_MAX_REQUESTS_PER_SECOND = 2.0
+CONF_SETTLE_DAYS = "settle_days"
+# final messwerte of days before today are cached, the coordinator asks for the last two days
+DEFAULT_SETTLE_DAYS = 1
+CONF_STREAM_RESPONSES = "stream_responses"
+# updates are scheduled around the learned publication time of new data
+PUBLICATION_WINDOW_MINUTES = 60
+PUBLICATION_HISTORY_SIZE = 14
+DENSE_POLL_INTERVAL_MINUTES = 15
+MAX_SCHEDULE_JITTER_SECONDS = 300
+DEFAULT_BACKFILL_WINDOW_DAYS = 31
+DAILY_BACKFILL_WINDOW_DAYS = 366
+# identical API calls within this time share one request
+REQUEST_RESULT_TTL_SECONDS = 30
 
 ATTRS_ZAEHLPUNKT_CALL = [
     ("zaehlpunktnummer", "zaehlpunktnummer"),
@@ -95,3 +114,12 @@ ATTRS_BEWEGUNGSDATEN = [
 
 ATTRS_HISTORIC_MEASUREMENT = [
 ]
+
+# compiled once, map a response with e.g. ZAEHLPUNKTE_CALL_MAPPER(response)
+ZAEHLPUNKTE_CALL_MAPPER = AttributeMapper(ATTRS_ZAEHLPUNKTE_CALL)
+CONSUMPTIONS_CALL_MAPPER = AttributeMapper(ATTRS_CONSUMPTIONS_CALL)
+BASEINFORMATION_CALL_MAPPER = AttributeMapper(ATTRS_BASEINFORMATION_CALL)
+METERREADINGS_CALL_MAPPER = AttributeMapper(ATTRS_METERREADINGS_CALL)
+VERBRAUCH_CALL_MAPPER = AttributeMapper(ATTRS_VERBRAUCH_CALL)
+HISTORIC_DATA_MAPPER = AttributeMapper(ATTRS_HISTORIC_DATA)
+BEWEGUNGSDATEN_MAPPER = AttributeMapper(ATTRS_BEWEGUNGSDATEN)
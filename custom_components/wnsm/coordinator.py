@@ -0,0 +1,150 @@
+"""Shared data update coordinator for all WNSM entities of a config entry."""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any
+
+from homeassistant.const import UnitOfEnergy
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
+
+from .AsyncSmartmeter import AsyncSmartmeter
+from .api.constants import ValueType
+from .api.errors import SmartmeterError
+from .const import DOMAIN
+from .day_statistics_importer import DayStatisticsImporter
+from .importer import Importer
+from .main_daily_snapshot_statistics_importer import MainDailySnapshotStatisticsImporter
+from .meter_read_logic import async_get_latest_meter_read_payload
+from .publication_scheduler import PublicationScheduler
+from .utils import before, today
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class ZaehlpunktData:
+    """Data fetched for a single Zählpunkt within one update cycle."""
+
+    zaehlpunkt_response: dict[str, Any]
+    active: bool
+    meter_reading: int | float | None = None
+    meter_read_attributes: dict[str, Any] = field(default_factory=dict)
+    day_messwerte: dict[str, Any] = field(default_factory=dict)
+
+
+class WNSMDataUpdateCoordinator(DataUpdateCoordinator[dict[str, ZaehlpunktData | None]]):
+    """Fetch METER_READ and DAY data once per Zählpunkt and share it with all entities."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        async_smartmeter: AsyncSmartmeter,
+        zaehlpunkte: list[str],
+        update_interval: timedelta,
+        scheduler: PublicationScheduler | None = None,
+        enable_day_statistics_import: bool = False,
+    ) -> None:
+        super().__init__(hass, _LOGGER, name=DOMAIN, update_interval=update_interval)
+        self.async_smartmeter = async_smartmeter
+        self.zaehlpunkte = zaehlpunkte
+        self.scheduler = scheduler
+        self.enable_day_statistics_import = enable_day_statistics_import
+
+    async def _async_update_data(self) -> dict[str, ZaehlpunktData | None]:
+        """Log in once and fetch all configured Zählpunkte."""
+        try:
+            await self.async_smartmeter.login()
+        except SmartmeterError as e:
+            raise UpdateFailed(f"Error logging in to smart meter api: {e}") from e
+
+        results = await self.async_smartmeter.gather_zaehlpunkte(
+            self.zaehlpunkte, self._async_fetch_zaehlpunkt
+        )
+        data: dict[str, ZaehlpunktData | None] = {}
+        for zaehlpunkt, result in results.items():
+            if isinstance(result, TimeoutError):
+                data[zaehlpunkt] = None
+                _LOGGER.warning("Error retrieving data from smart meter api - Timeout: %s", result)
+            elif isinstance(result, (RuntimeError, SmartmeterError)):
+                data[zaehlpunkt] = None
+                _LOGGER.error(
+                    "Error retrieving data from smart meter api - Error: %s",
+                    result,
+                    exc_info=result,
+                )
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                data[zaehlpunkt] = result
+
+        if data and all(value is None for value in data.values()):
+            raise UpdateFailed("Could not retrieve data for any Zählpunkt")
+
+        if self.scheduler is not None:
+            now = dt_util.now()
+            await self.scheduler.async_observe(data, now)
+            self.update_interval = self.scheduler.next_interval(self.zaehlpunkte, now)
+            _LOGGER.debug("Next update in %s", self.update_interval)
+        return data
+
+    async def _async_fetch_zaehlpunkt(self, zaehlpunkt: str) -> ZaehlpunktData:
+        """Perform one METER_READ and one DAY fetch for a Zählpunkt and import them into statistics.
+
+        The imports are awaited within the update cycle, so imports of the same statistic never
+        overlap and end with the coordinator.
+        """
+        zaehlpunkt_response = await self.async_smartmeter.get_zaehlpunkt(zaehlpunkt)
+        result = ZaehlpunktData(
+            zaehlpunkt_response=zaehlpunkt_response,
+            active=self.async_smartmeter.is_active(zaehlpunkt_response),
+        )
+        if not result.active:
+            return result
+
+        result.meter_reading, result.meter_read_attributes = await async_get_latest_meter_read_payload(
+            self.async_smartmeter,
+            zaehlpunkt,
+            zaehlpunkt_response,
+        )
+
+        result.day_messwerte = await self.async_smartmeter.get_historic_data(
+            zaehlpunkt,
+            before(today(), 1),
+            today(),
+            ValueType.DAY,
+        )
+        await self._async_import_statistics(zaehlpunkt, result)
+        return result
+
+    async def _async_import_statistics(self, zaehlpunkt: str, data: ZaehlpunktData) -> None:
+        """Import the fetched METER_READ and DAY values into long-term statistics.
+
+        Failed imports are logged, the data of the Zählpunkt is still shared with the entities.
+        """
+        if data.meter_reading is not None:
+            reading_date = data.meter_read_attributes.get("reading_date")
+            try:
+                importer = Importer(self.hass, self.async_smartmeter, zaehlpunkt, UnitOfEnergy.KILO_WATT_HOUR)
+                await importer.async_import_meter_read(reading_date, data.meter_reading)
+            except TimeoutError as e:
+                _LOGGER.warning("Error retrieving data from smart meter api - Timeout: %s", e)
+            except RuntimeError as e:
+                _LOGGER.exception("Error retrieving data from smart meter api - Error: %s", e)
+            try:
+                snapshot_importer = MainDailySnapshotStatisticsImporter(self.hass, self.async_smartmeter, zaehlpunkt)
+                await snapshot_importer.async_import(reading_date, data.meter_reading)
+            except HomeAssistantError as e:
+                _LOGGER.exception("Error importing main snapshot statistics - Error: %s", e)
+
+        if self.enable_day_statistics_import:
+            try:
+                day_importer = DayStatisticsImporter(self.hass, self.async_smartmeter, zaehlpunkt)
+                await day_importer.async_import_messwerte(data.day_messwerte)
+            except HomeAssistantError as e:
+                _LOGGER.exception("Error importing day statistics - Error: %s", e)
@@ -4,7 +4,8 @@ from dataclasses import dataclass
 from datetime import datetime
 from typing import Any
 
-from homeassistant.util import dt as dt_util
+from .timeseries import ValueSeries
+from .timestamps import parse_datetime, parse_epoch
 
 
 @dataclass
@@ -36,7 +37,7 @@ def extract_day_points(messwerte: dict[str, Any]) -> list[DayValuePoint]:
 
     points: list[DayValuePoint] = []
     for value in values:
-        timestamp = dt_util.parse_datetime(value.get("zeitBis") or value.get("zeitVon"))
+        timestamp = parse_datetime(value.get("zeitBis") or value.get("zeitVon"))
         messwert = value.get("messwert")
         if timestamp is None or messwert is None:
             continue
@@ -50,6 +51,22 @@ def extract_day_points(messwerte: dict[str, Any]) -> list[DayValuePoint]:
     return points
 
 
+def extract_day_series(messwerte: dict[str, Any]) -> ValueSeries:
+    """Extract DAY values in kWh from translated messwerte payload, stamped like extract_day_points."""
+    series = ValueSeries()
+    factor = _unit_factor(messwerte.get("unitOfMeasurement"))
+    if factor is None:
+        return series
+
+    for value in messwerte.get("values") or []:
+        timestamp = parse_epoch(value.get("zeitBis") or value.get("zeitVon"))
+        messwert = value.get("messwert")
+        if timestamp is None or messwert is None:
+            continue
+        series.append(timestamp, messwert * factor, bool(value.get("geschaetzt")))
+    return series
+
+
 def latest_two_day_points(messwerte: dict[str, Any]) -> list[DayValuePoint]:
     """Return up to two latest normalized DAY points (newest first)."""
     points = sorted(
@@ -1,14 +1,14 @@
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 
 from homeassistant.components.sensor import SensorDeviceClass
+from homeassistant.core import callback
 
-from .api.constants import ValueType
 from .base_sensor import WNSMBaseSensor
-from .const import DEFAULT_SCAN_INTERVAL_MINUTES
+from .coordinator import WNSMDataUpdateCoordinator, ZaehlpunktData
 from .day_processing import latest_two_day_points
 from .measurement_attributes import set_messwert_attributes
-from .utils import before, build_reading_date_attributes, today
+from .utils import build_reading_date_attributes
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -18,14 +18,10 @@ class WNSMDayReadingDateSensor(WNSMBaseSensor):
 
     def __init__(
         self,
-        async_smartmeter,
-        username: str,
-        password: str,
+        coordinator: WNSMDataUpdateCoordinator,
         zaehlpunkt: str,
-        scan_interval: timedelta = timedelta(minutes=DEFAULT_SCAN_INTERVAL_MINUTES),
     ) -> None:
-        super().__init__(async_smartmeter, username, password)
-        self.zaehlpunkt = zaehlpunkt
+        super().__init__(coordinator, zaehlpunkt)
 
         self._attr_name = f"{zaehlpunkt} Day Reading Date"
         self._attr_icon = "mdi:calendar-clock"
@@ -33,56 +29,28 @@ class WNSMDayReadingDateSensor(WNSMBaseSensor):
         self._attr_native_value: datetime | None = None
         self._attr_extra_state_attributes = {}
 
-        self._available: bool = True
-        self._attr_suggested_update_interval = scan_interval
-
     @property
     def unique_id(self) -> str:
         """Return the unique ID of the sensor."""
         return f"{self.zaehlpunkt}_day_reading_date"
 
-    @property
-    def available(self) -> bool:
-        """Return True if entity is available."""
-        return self._available
-
-    async def async_update(self):
-        """Update sensor."""
-        try:
-            async_smartmeter = self._get_async_smartmeter()
-            await async_smartmeter.login()
-            zaehlpunkt_response = await async_smartmeter.get_zaehlpunkt(self.zaehlpunkt)
-            _, self._attr_extra_state_attributes = build_reading_date_attributes(
-                zaehlpunkt_response
+    @callback
+    def _update_from_data(self, data: ZaehlpunktData) -> None:
+        """Update sensor from the shared DAY messwerte."""
+        _, self._attr_extra_state_attributes = build_reading_date_attributes(
+            data.zaehlpunkt_response
+        )
+
+        if data.active:
+            latest_two_points = latest_two_day_points(data.day_messwerte)
+            set_messwert_attributes(
+                self._attr_extra_state_attributes,
+                [point.value_kwh for point in latest_two_points],
             )
 
-            if async_smartmeter.is_active(zaehlpunkt_response):
-                start = before(today(), 1)
-                end = today()
-                messwerte = await async_smartmeter.get_historic_data(
-                    self.zaehlpunkt,
-                    start,
-                    end,
-                    ValueType.DAY,
-                )
-
-                latest_two_points = latest_two_day_points(messwerte)
-                set_messwert_attributes(
-                    self._attr_extra_state_attributes,
-                    [point.value_kwh for point in latest_two_points],
-                )
-
-                latest = latest_two_points[0] if latest_two_points else None
-                if latest is not None:
-                    self._attr_native_value = latest.source_timestamp
-                    self._attr_extra_state_attributes["reading_date"] = latest.reading_date
-                else:
-                    _LOGGER.debug("No usable DAY reading_date returned for %s", self.zaehlpunkt)
-
-            self._available = True
-        except TimeoutError as e:
-            self._available = False
-            _LOGGER.warning("Error retrieving day reading date from smart meter api - Timeout: %s", e)
-        except RuntimeError as e:
-            self._available = False
-            _LOGGER.exception("Error retrieving day reading date from smart meter api - Error: %s", e)
+            latest = latest_two_points[0] if latest_two_points else None
+            if latest is not None:
+                self._attr_native_value = latest.source_timestamp
+                self._attr_extra_state_attributes["reading_date"] = latest.reading_date
+            else:
+                _LOGGER.debug("No usable DAY reading_date returned for %s", self.zaehlpunkt)
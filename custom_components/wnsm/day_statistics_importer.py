@@ -1,16 +1,16 @@
 import logging
-from datetime import datetime
+from datetime import datetime, timezone
+from typing import Any
 
 from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
-from homeassistant.components.recorder.statistics import async_add_external_statistics
 from homeassistant.core import HomeAssistant
-from homeassistant.util import slugify
+from homeassistant.util import dt as dt_util
 
 from .AsyncSmartmeter import AsyncSmartmeter
 from .api.constants import ValueType
 from .const import DOMAIN
-from .day_processing import extract_day_points
-from .statistics_utils import as_utc, get_last_stats_timestamp
+from .day_processing import extract_day_series
+from .statistics_utils import as_utc, day_statistic_id
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -22,7 +22,9 @@ class DayStatisticsImporter:
         self.hass = hass
         self.async_smartmeter = async_smartmeter
         self.zaehlpunkt = zaehlpunkt
-        self.id = f"{DOMAIN}:{slugify(zaehlpunkt)}_day"
+        self.id = day_statistic_id(zaehlpunkt)
+        self.last_statistics = async_smartmeter.last_statistics
+        self.watermarks = async_smartmeter.watermarks(zaehlpunkt)
 
     def get_statistics_metadata(self) -> StatisticMetaData:
         return StatisticMetaData(
@@ -36,24 +38,41 @@ class DayStatisticsImporter:
 
     async def async_import(self, date_from: datetime, date_to: datetime) -> None:
         """Import statistics newer than the latest imported sample."""
-        last_start = await get_last_stats_timestamp(self.hass, self.id, "start")
-
+        # DAY values are stamped with the end of their day, today's midnight is the newest possible
+        newest_possible = as_utc(min(date_to, dt_util.start_of_local_day()))
+        if await self.watermarks.async_is_current(self.id, ValueType.DAY, newest_possible):
+            _LOGGER.debug("DAY statistics of %s are up to date, not querying the API", self.zaehlpunkt)
+            return
         raw = await self.async_smartmeter.get_historic_data(
             self.zaehlpunkt,
             date_from,
             date_to,
             ValueType.DAY,
         )
-        points = extract_day_points(raw)
+        await self.async_import_messwerte(raw)
+
+    async def async_import_messwerte(self, raw: dict[str, Any]) -> None:
+        """Import already fetched DAY messwerte newer than the latest imported sample."""
+        series = extract_day_series(raw)
+        if not series:
+            return
+        newest = datetime.fromtimestamp(max(series.timestamps), timezone.utc)
+        last_start = await self.watermarks.async_get(self.id, ValueType.DAY)
+        if last_start is not None and newest <= last_start:
+            return
+        if last_start is None:
+            last_start = await self.last_statistics.async_get_timestamp(self.id, "start")
+
         metadata = self.get_statistics_metadata()
 
         stats = []
-        for point in sorted(points, key=lambda p: p.source_timestamp):
-            ts = as_utc(point.source_timestamp)
+        for timestamp, value_kwh in sorted(series):
+            ts = datetime.fromtimestamp(timestamp, timezone.utc)
             if last_start is not None and ts <= last_start:
                 continue
-            stats.append(StatisticData(start=ts, state=float(point.value_kwh), sum=None))
+            stats.append(StatisticData(start=ts, state=value_kwh, sum=None))
 
         if stats:
             _LOGGER.debug("Importing %s DAY statistics for %s", len(stats), self.zaehlpunkt)
-            async_add_external_statistics(self.hass, metadata, stats)
+            self.last_statistics.add_external_statistics(metadata, stats)
+        await self.watermarks.async_advance(self.id, ValueType.DAY, newest)
@@ -0,0 +1,33 @@
+"""Exact fixed-point energy values: integer milli-Wh, converted to float kWh only for statistics."""
+
+from __future__ import annotations
+
+from decimal import ROUND_HALF_EVEN, Decimal
+
+MILLI_WH_PER_WH = 1_000
+MILLI_WH_PER_KWH = 1_000_000
+
+
+def milli_wh_per_unit(unit: str | None) -> int | None:
+    """Return the milli-Wh of one unit of the API, None for unknown units."""
+    unit = (unit or "").upper()
+    if unit == "WH":
+        return MILLI_WH_PER_WH
+    if unit in ("KWH", "KWHOUR"):
+        return MILLI_WH_PER_KWH
+    return None
+
+
+def kwh_to_milli_wh(value: int | float | str | Decimal) -> int:
+    """Convert kWh, e.g. a meter reading or a recorded sum, to milli-Wh without float error."""
+    return int((Decimal(str(value)) * MILLI_WH_PER_KWH).to_integral_value(ROUND_HALF_EVEN))
+
+
+def milli_wh_to_kwh(value: int) -> float:
+    """Convert milli-Wh to kWh for StatisticData."""
+    return value / MILLI_WH_PER_KWH
+
+
+def milli_wh_to_kwh_str(value: int) -> str:
+    """Convert milli-Wh to an exact kWh string for persisting."""
+    return str(Decimal(value).scaleb(-6))
@@ -0,0 +1,42 @@
+"""Choose how bewegungsdaten of a Zählpunkt are fetched from its reported granularity."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import timedelta
+
+from .api.constants import AggregatType, ValueType
+from .const import DAILY_BACKFILL_WINDOW_DAYS, DEFAULT_BACKFILL_WINDOW_DAYS
+
+
+@dataclass(frozen=True, slots=True)
+class FetchPlan:
+    """Value type (and thereby role), server-side aggregation and backfill window of one Zählpunkt."""
+
+    granularity: ValueType
+    aggregat: AggregatType
+    backfill_window: timedelta
+
+
+QUARTER_HOUR_PLAN = FetchPlan(
+    ValueType.QUARTER_HOUR,
+    AggregatType.SUM_PER_HOUR,
+    timedelta(days=DEFAULT_BACKFILL_WINDOW_DAYS),
+)
+# one value per day, so much larger windows stay small
+DAY_PLAN = FetchPlan(
+    ValueType.DAY,
+    AggregatType.NONE,
+    timedelta(days=DAILY_BACKFILL_WINDOW_DAYS),
+)
+
+
+def plan_fetch(granularity: str | None) -> FetchPlan:
+    """Return the plan for the idexStatus granularity of a Zählpunkt.
+
+    Meters that did not opt in to quarter hour values only report DAY, querying
+    quarter hour roles for them returns nothing. Unknown values keep the quarter hour plan.
+    """
+    if granularity is not None and granularity.upper() == ValueType.DAY.value:
+        return DAY_PLAN
+    return QUARTER_HOUR_PLAN
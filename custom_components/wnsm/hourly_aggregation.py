@@ -0,0 +1,54 @@
+"""Aggregate bewegungsdaten values into hourly consumption buckets."""
+
+from __future__ import annotations
+
+import logging
+import math
+from datetime import datetime, timezone
+from itertools import accumulate
+
+from .timeseries import ValueSeries
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def aggregate_hourly_series(
+    series: ValueSeries,
+    start: datetime,
+    milli_wh_per_unit: int,
+) -> list[tuple[datetime, int]]:
+    """Sum up the values of a series per hour in integer milli-Wh, returns (hour, usage) sorted by hour.
+
+    Values older than the previous value (or start) are ignored. Each value is rounded to
+    milli-Wh once, so the sums are exact. Timestamps of a series are whole seconds.
+    """
+    usages: dict[int, int] = {}
+    last_ts = math.floor(start.timestamp())
+    readings: dict[float, int] = {}
+    values = series.values
+    for index, ts in enumerate(series.timestamps):
+        if ts < last_ts:
+            _LOGGER.warning(f"Timestamp from API ({series.datetime(index)}) is less than previously collected timestamp "
+                            f"({datetime.fromtimestamp(last_ts, timezone.utc)}), ignoring value!")
+            continue
+        last_ts = ts
+        wert = values[index]
+        if math.isnan(wert):
+            continue
+        reading = readings.get(wert)
+        if reading is None:
+            reading = readings[wert] = round(wert * milli_wh_per_unit)
+        seconds_of_hour = ts % 3600
+        if seconds_of_hour % 900:
+            _LOGGER.warning(f"Unexpected time detected in historic data: {series.datetime(index)}")
+        # like datetime.replace(minute=0), seconds are kept
+        hour = ts - seconds_of_hour + seconds_of_hour % 60
+        usages[hour] = usages.get(hour, 0) + reading
+        if series.is_estimated(index):
+            _LOGGER.debug(f"Not seen that before: Estimated Value found for {series.datetime(index)}: {reading}")
+    return [(datetime.fromtimestamp(hour, timezone.utc), usages[hour]) for hour in sorted(usages)]
+
+
+def cumulative_sums(hourly: list[tuple[datetime, int]], total_usage: int) -> list[int]:
+    """Running total in milli-Wh after each hour, starting from total_usage."""
+    return list(accumulate((usage for _, usage in hourly), initial=total_usage))[1:]
@@ -1,44 +1,63 @@
 import logging
-from collections import defaultdict
 from datetime import timedelta, timezone, datetime
-from decimal import Decimal
-from operator import itemgetter
 
-from homeassistant.components.recorder import get_instance
 from homeassistant.components.recorder.models import (
     StatisticData,
     StatisticMetaData,
 )
-from homeassistant.components.recorder.statistics import (
-    get_last_statistics, async_add_external_statistics,
-)
 from homeassistant.core import HomeAssistant
 from homeassistant.util import dt as dt_util
 
 from .AsyncSmartmeter import AsyncSmartmeter
-from .api.constants import ValueType
+from .api.constants import AggregatType, ValueType
+from .api.errors import SmartmeterConnectionError, SmartmeterError
+from .checkpoint_store import BackfillCheckpointStore
 from .const import DOMAIN
-from .statistics_utils import parse_stats_timestamp
+from .energy import MILLI_WH_PER_KWH, kwh_to_milli_wh, milli_wh_per_unit, milli_wh_to_kwh
+from .fetch_plan import plan_fetch
+from .hourly_aggregation import aggregate_hourly_series, cumulative_sums
+from .statistics_utils import meter_read_statistic_id, parse_stats_timestamp
+from .timeseries import ValueSeries
 
 _LOGGER = logging.getLogger(__name__)
 
+# bewegungsdaten are published a day later, there is nothing new within 24h of the last import
+MIN_WAIT = timedelta(hours=24)
+
 class Importer:
 
-    def __init__(self, hass: HomeAssistant, async_smartmeter: AsyncSmartmeter, zaehlpunkt: str, unit_of_measurement: str, granularity: ValueType = ValueType.QUARTER_HOUR):
-        self.id = f'{DOMAIN}:{zaehlpunkt.lower()}'
+    def __init__(self, hass: HomeAssistant, async_smartmeter: AsyncSmartmeter, zaehlpunkt: str, unit_of_measurement: str, granularity: ValueType | None = None,
+                 backfill_window: timedelta | None = None):
+        """granularity and backfill_window default to the fetch plan of the Zählpunkt."""
+        self.id = meter_read_statistic_id(zaehlpunkt)
         self.zaehlpunkt = zaehlpunkt
         self.granularity = granularity
+        self.aggregat = plan_fetch(granularity.value).aggregat if granularity is not None else None
         self.unit_of_measurement = unit_of_measurement
         self.hass = hass
         self.async_smartmeter = async_smartmeter
+        self.backfill_window = backfill_window
+        self.checkpoint_store = BackfillCheckpointStore(hass, zaehlpunkt)
+        self.watermarks = async_smartmeter.watermarks(zaehlpunkt)
+        self.last_statistics = async_smartmeter.last_statistics
+
+    async def _async_last_inserted_stat(self) -> dict:
+        """Last statistics row in the format of get_last_statistics, read from the cache."""
+        row = await self.last_statistics.async_get(self.id)
+        return {} if row is None else {self.id: [row]}
 
     def is_last_inserted_stat_valid(self, last_inserted_stat):
         return len(last_inserted_stat) == 1 and len(last_inserted_stat[self.id]) == 1 and \
             "sum" in last_inserted_stat[self.id][0] and "end" in last_inserted_stat[self.id][0]
 
+    @staticmethod
+    def newest_possible_end() -> datetime:
+        """Statistics ending after this cannot be imported yet."""
+        return datetime.now(timezone.utc).replace(microsecond=0) - MIN_WAIT
+
     def prepare_start_off_point(self, last_inserted_stat):
         # Previous data found in the statistics table
-        _sum = Decimal(last_inserted_stat[self.id][0]["sum"])
+        _sum = kwh_to_milli_wh(last_inserted_stat[self.id][0]["sum"])
         # The next start is the previous end
         # XXX: since HA core 2022.12, we get a datetime and not a str...
         # XXX: since HA core 2023.03, we get a float and not a datetime...
@@ -60,29 +79,33 @@ class Importer:
         # Extra check to not strain the API too much:
         # If the last insert date is less than 24h away, simply exit here,
         # because we will not get any data from the API
-        min_wait = timedelta(hours=24)
-        delta_t = datetime.now(timezone.utc).replace(microsecond=0) - start.replace(microsecond=0)
-        if delta_t <= min_wait:
+        newest_possible_end = self.newest_possible_end()
+        if start.replace(microsecond=0) >= newest_possible_end:
             _LOGGER.debug(
                 "Not querying the API, because last update is not older than 24 hours. Earliest update in %s" % (
-                        min_wait - delta_t))
+                        start.replace(microsecond=0) - newest_possible_end))
             return None
         return start, _sum
 
+    async def _async_apply_fetch_plan(self) -> None:
+        """Fill in what has not been given explicitly from the cached fetch plan."""
+        if self.granularity is not None and self.backfill_window is not None:
+            return
+        plan = await self.async_smartmeter.fetch_plan(self.zaehlpunkt)
+        if self.granularity is None:
+            self.granularity = plan.granularity
+            self.aggregat = plan.aggregat
+        if self.backfill_window is None:
+            self.backfill_window = plan.backfill_window
+
     async def async_import(self):
-        # Query the statistics database for the last value
-        # It is crucial to use get_instance here!
-        last_inserted_stat = await get_instance(
-            self.hass
-        ).async_add_executor_job(
-            get_last_statistics,
-            self.hass,
-            1,  # Get at most one entry
-            self.id,  # of this sensor
-            True,  # convert the units
-            # XXX: since HA core 2022.12 need to specify this:
-            {"sum", "state"},  # the fields we want to query (state might be used in the future)
-        )
+        await self._async_apply_fetch_plan()
+        # The watermark answers the 24h check without the statistics database
+        if await self.watermarks.async_is_current(self.id, self.granularity, self.newest_possible_end()):
+            _LOGGER.debug("Statistics of %s are up to date, not querying the API", self.zaehlpunkt)
+            return
+        # The last value of the statistics database
+        last_inserted_stat = await self._async_last_inserted_stat()
         _LOGGER.debug("Last inserted stat: %s" % last_inserted_stat)
         try:
             await self.async_smartmeter.login()
@@ -92,13 +115,22 @@ class Importer:
                 _LOGGER.debug("Smartmeter %s is not active" % zaehlpunkt)
                 return
 
-            if not self.is_last_inserted_stat_valid(last_inserted_stat):
+            checkpoint = await self.checkpoint_store.async_load()
+            if checkpoint is not None:
+                # A previous backfill was interrupted - resume after its last imported window
+                start, _sum = checkpoint
+                _LOGGER.warning("Resuming import of historical data from %s.", start)
+                _sum = await self._backfill_statistics(start, _sum, resumed=True)
+            elif not self.is_last_inserted_stat_valid(last_inserted_stat):
                 # No previous data - start from scratch
                 _LOGGER.warning("Starting import of historical data. This might take some time.")
                 _sum = await self._initial_import_statistics()
             else:
                 start_off_point = self.prepare_start_off_point(last_inserted_stat)
                 if start_off_point is None:
+                    await self.watermarks.async_advance(
+                        self.id, self.granularity, parse_stats_timestamp(last_inserted_stat[self.id][0]["end"])
+                    )
                     return
                 start, _sum = start_off_point
                 _sum = await self._incremental_import_statistics(start, _sum)
@@ -111,77 +143,89 @@ class Importer:
             # same time.
             # Due to None, the sensor will always show "unkown" - but that is currently the only way
             # how historical data can be imported without rewriting the database on our own...
-            last_inserted_stat = await get_instance(self.hass).async_add_executor_job(
-                get_last_statistics,
-                self.hass,
-                1,  # Get at most one entry
-                self.id,  # of this sensor's statistics
-                True,  # convert the units
-                {"sum"}  # the fields we want to query
-            )
+            last_inserted_stat = await self._async_last_inserted_stat()
             _LOGGER.debug("Last inserted stat: %s", last_inserted_stat)
+            if self.is_last_inserted_stat_valid(last_inserted_stat):
+                await self.watermarks.async_advance(
+                    self.id, self.granularity, parse_stats_timestamp(last_inserted_stat[self.id][0]["end"])
+                )
         except TimeoutError as e:
+            # the next run continues from what the recorder actually stored
+            self.last_statistics.invalidate(self.id)
             _LOGGER.warning("Error retrieving data from smart meter api - Timeout: %s" % e)
         except RuntimeError as e:
+            self.last_statistics.invalidate(self.id)
             _LOGGER.exception("Error retrieving data from smart meter api - Error: %s" % e)
 
     async def async_import_meter_read(self, reading_date: str | None, meter_reading: int | float) -> None:
         """Import one aligned METER_READ point using the provided reading timestamp."""
-        if reading_date is None:
-            _LOGGER.debug("Skipping import for %s: reading_date is missing", self.zaehlpunkt)
+        start = self._parse_reading_date(reading_date)
+        if start is None:
             return
 
-        start = parse_stats_timestamp(dt_util.parse_datetime(reading_date))
-        if start is None:
-            _LOGGER.warning("Skipping import for %s: invalid reading_date '%s'", self.zaehlpunkt, reading_date)
+        if await self.watermarks.async_is_current(self.id, ValueType.METER_READ, start):
+            _LOGGER.debug("Skipping import for %s: reading_date %s has already been imported", self.zaehlpunkt, start)
             return
 
-        last_inserted_stat = await get_instance(self.hass).async_add_executor_job(
-            get_last_statistics,
-            self.hass,
-            1,
-            self.id,
-            True,
-            {"sum", "state"},
-        )
+        last_meter_read = await self._async_last_meter_read(start)
+        if last_meter_read is None:
+            await self.watermarks.async_advance(self.id, ValueType.METER_READ, start)
+            return
+        last_sum, last_state = last_meter_read
 
-        last_sum = Decimal(0)
-        last_state = None
-        if len(last_inserted_stat) == 1 and len(last_inserted_stat.get(self.id, [])) == 1:
-            last_entry = last_inserted_stat[self.id][0]
-            raw_sum = last_entry.get("sum")
-            raw_state = last_entry.get("state")
-            raw_end = last_entry.get("end")
-
-            if raw_end is not None:
-                parsed_end = parse_stats_timestamp(raw_end)
-                if isinstance(parsed_end, datetime) and start <= parsed_end:
-                    _LOGGER.debug("Skipping import for %s: reading_date %s is not newer than last end %s", self.zaehlpunkt, start, parsed_end)
-                    return
+        current_reading = kwh_to_milli_wh(meter_reading)
+        usage = self._meter_read_usage(last_state, current_reading)
+        statistics = [
+            StatisticData(start=start, sum=milli_wh_to_kwh(last_sum + usage), state=milli_wh_to_kwh(current_reading))
+        ]
+        self.last_statistics.add_external_statistics(self.get_statistics_metadata(), statistics)
+        await self.watermarks.async_advance(self.id, ValueType.METER_READ, start)
 
-            if raw_sum is not None:
-                last_sum = Decimal(str(raw_sum))
-            if raw_state is not None:
-                last_state = Decimal(str(raw_state))
+    def _parse_reading_date(self, reading_date: str | None) -> datetime | None:
+        """Start of the statistics row of a METER_READ point, None if reading_date is missing or invalid."""
+        if reading_date is None:
+            _LOGGER.debug("Skipping import for %s: reading_date is missing", self.zaehlpunkt)
+            return None
 
-        current_reading = Decimal(str(meter_reading))
+        start = parse_stats_timestamp(dt_util.parse_datetime(reading_date))
+        if start is None:
+            _LOGGER.warning("Skipping import for %s: invalid reading_date '%s'", self.zaehlpunkt, reading_date)
+        return start
+
+    async def _async_last_meter_read(self, start: datetime) -> tuple[int, int | None] | None:
+        """Sum and state of the last statistics row in milli-Wh, None if it does not end before start."""
+        last_inserted_stat = await self._async_last_inserted_stat()
+        if len(last_inserted_stat) != 1 or len(last_inserted_stat.get(self.id, [])) != 1:
+            return 0, None
+
+        last_entry = last_inserted_stat[self.id][0]
+        raw_end = last_entry.get("end")
+        if raw_end is not None:
+            parsed_end = parse_stats_timestamp(raw_end)
+            if isinstance(parsed_end, datetime) and start <= parsed_end:
+                _LOGGER.debug("Skipping import for %s: reading_date %s is not newer than last end %s", self.zaehlpunkt, start, parsed_end)
+                return None
+
+        raw_sum = last_entry.get("sum")
+        raw_state = last_entry.get("state")
+        last_sum = kwh_to_milli_wh(raw_sum) if raw_sum is not None else 0
+        last_state = kwh_to_milli_wh(raw_state) if raw_state is not None else None
+        return last_sum, last_state
+
+    def _meter_read_usage(self, last_state: int | None, current_reading: int) -> int:
+        """Usage since the last METER_READ state in milli-Wh, decreasing readings count as no usage."""
         if last_state is None:
-            usage = Decimal(0)
-        else:
-            usage = current_reading - last_state
-            if usage < 0:
-                _LOGGER.warning(
-                    "Detected decreasing METER_READ value for %s (previous=%s, current=%s). Ignoring delta.",
-                    self.zaehlpunkt,
-                    last_state,
-                    current_reading,
-                )
-                usage = Decimal(0)
-
-        statistics = [
-            StatisticData(start=start, sum=last_sum + usage, state=float(current_reading))
-        ]
-        async_add_external_statistics(self.hass, self.get_statistics_metadata(), statistics)
+            return 0
+        usage = current_reading - last_state
+        if usage < 0:
+            _LOGGER.warning(
+                "Detected decreasing METER_READ value for %s (previous=%s, current=%s). Ignoring delta.",
+                self.zaehlpunkt,
+                milli_wh_to_kwh(last_state),
+                milli_wh_to_kwh(current_reading),
+            )
+            return 0
+        return usage
 
     def get_statistics_metadata(self):
         return StatisticMetaData(
@@ -194,13 +238,87 @@ class Importer:
         )
 
     async def _initial_import_statistics(self):
-        return await self._import_statistics()
+        start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=365 * 3)
+        return await self._backfill_statistics(start, 0)
+
+    async def _incremental_import_statistics(self, start: datetime, total_usage: int):
+        return await self._backfill_statistics(start, total_usage)
 
-    async def _incremental_import_statistics(self, start: datetime, total_usage: Decimal):
-        return await self._import_statistics(start=start, total_usage=total_usage)
+    async def _backfill_statistics(self, start: datetime, total_usage: int, end: datetime = None, resumed: bool = False):
+        """Import statistics from start to end in windows of self.backfill_window.
+
+        If the backfill spans several windows, the running sum and the end of each window but the
+        last are persisted, so an interrupted backfill resumes after the last imported window
+        instead of starting over. The checkpoint is removed once end is reached.
+        """
+        end = end if end is not None else datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
 
-    async def _import_statistics(self, start: datetime = None, end: datetime = None, total_usage: Decimal = Decimal(0)):
-        """Import statistics"""
+        checkpointed = resumed
+        window_start = start
+        while window_start < end:
+            # Windows end at midnight, bewegungsdaten are then queried until 23:59:59.999 of the previous day
+            window_end = (window_start + self.backfill_window).replace(hour=0, minute=0, second=0, microsecond=0)
+            if window_end >= end or window_end <= window_start:
+                window_end = end
+                query_end = end
+            else:
+                query_end = window_end - timedelta(days=1)
+
+            _LOGGER.debug("Importing window %s - %s for %s", window_start, window_end, self.zaehlpunkt)
+            window_usage = await self._import_statistics(start=window_start, end=query_end, total_usage=total_usage)
+            if window_usage is not None:
+                total_usage = window_usage
+            if window_end < end:
+                await self.checkpoint_store.async_save(window_end, total_usage)
+                checkpointed = True
+            window_start = window_end
+
+        if checkpointed:
+            await self.checkpoint_store.async_remove()
+        return total_usage
+
+    @staticmethod
+    def _is_aggregated(bewegungsdaten: dict, series: ValueSeries | None, aggregat: AggregatType) -> bool:
+        """Check that the API summed up the values as requested."""
+        if bewegungsdaten.get("aggregator") != aggregat.value or series is None:
+            return False
+        return all(timestamp % 3600 == 0 for timestamp in series.timestamps)
+
+    async def _fetch_bewegungsdaten(
+        self, start: datetime, end: datetime, aggregat: AggregatType = AggregatType.NONE
+    ) -> tuple[dict, ValueSeries | None]:
+        """Query bewegungsdaten and their values as series, None if the response has no values list."""
+        if self.async_smartmeter.stream_responses:
+            return await self.async_smartmeter.get_bewegungsdaten_series(
+                self.zaehlpunkt, start, end, self.granularity, aggregat
+            )
+        bewegungsdaten = await self.async_smartmeter.get_bewegungsdaten(
+            self.zaehlpunkt, start, end, self.granularity, aggregat
+        )
+        _LOGGER.debug("Mapped historical data: %s", bewegungsdaten)
+        values = bewegungsdaten.pop('values', None)
+        if not isinstance(values, list):
+            return bewegungsdaten, None
+        return bewegungsdaten, ValueSeries.from_values(values, 'zeitpunktVon', 'wert')
+
+    async def _get_bewegungsdaten(self, start: datetime, end: datetime) -> tuple[dict, ValueSeries | None]:
+        """Query the sums of the planned aggregat, or the values in self.granularity if the API does not aggregate them."""
+        aggregat = self.aggregat
+        if aggregat not in (None, AggregatType.NONE) and aggregat not in self.async_smartmeter.unsupported_aggregats:
+            try:
+                bewegungsdaten, series = await self._fetch_bewegungsdaten(start, end, aggregat)
+                if self._is_aggregated(bewegungsdaten, series, aggregat):
+                    return bewegungsdaten, series
+            except SmartmeterConnectionError:
+                raise
+            except (RuntimeError, SmartmeterError, KeyError) as e:
+                _LOGGER.debug("Querying %s bewegungsdaten failed: %s", aggregat.value, e)
+            _LOGGER.info("API does not support %s, aggregating bewegungsdaten locally", aggregat.value)
+            self.async_smartmeter.unsupported_aggregats.add(aggregat)
+        return await self._fetch_bewegungsdaten(start, end)
+
+    async def _import_statistics(self, start: datetime = None, end: datetime = None, total_usage: int = 0):
+        """Import statistics, total_usage and the returned running sum are in milli-Wh"""
 
         start = start if start is not None else datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=365 * 3)
         end = end if end is not None else datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
@@ -213,62 +331,39 @@ class Importer:
             _LOGGER.warning(f"Ignoring async update since last import happened in the future (should not happen) {start} > {end}")
             return
 
-        bewegungsdaten = await self.async_smartmeter.get_bewegungsdaten(self.zaehlpunkt, start, end, self.granularity)
-        _LOGGER.debug(f"Mapped historical data: {bewegungsdaten}")
+        bewegungsdaten, series = await self._get_bewegungsdaten(start, end)
 
         unit = (bewegungsdaten.get("unitOfMeasurement") or self.unit_of_measurement or "").upper()
-        if unit == 'WH':
-            factor = 1e-3
-        elif unit in ('KWH', 'KWHOUR'):
-            factor = 1.0
-        else:
+        milli_wh = milli_wh_per_unit(unit)
+        if milli_wh is None:
             _LOGGER.warning(
-                "Unexpected or missing unitOfMeasurement in bewegungsdaten (%s) for %s. Falling back to factor 1.0",
+                "Unexpected or missing unitOfMeasurement in bewegungsdaten (%s) for %s. Falling back to KWH",
                 unit or "<missing>",
                 self.zaehlpunkt,
             )
-            factor = 1.0
+            milli_wh = MILLI_WH_PER_KWH
 
-        dates = defaultdict(Decimal)
-        values = bewegungsdaten.get('values')
-        if not isinstance(values, list):
+        if series is None:
             _LOGGER.warning("WienerNetze does not report historical data list (yet) for %s", self.zaehlpunkt)
             return total_usage
 
-        total_consumption = sum([v.get("wert", 0) or 0 for v in values])
+        total_consumption = series.total()
         # Can actually check, if the whole batch can be skipped.
         if total_consumption == 0:
             _LOGGER.debug(f"Batch of data starting at {start} does not contain any bewegungsdaten. Seems there is nothing to import, yet.")
             return total_usage
 
-        last_ts = start
-        for value in values:
-            ts = dt_util.parse_datetime(value.get('zeitpunktVon'))
-            if ts is None:
-                _LOGGER.debug("Skipping historical value without zeitpunktVon: %s", value)
-                continue
-            if ts < last_ts:
-                # This should prevent any issues with ambiguous values though...
-                _LOGGER.warning(f"Timestamp from API ({ts}) is less than previously collected timestamp ({last_ts}), ignoring value!")
-                continue
-            last_ts = ts
-            if value.get('wert') is None:
-                # Usually this means that the measurement is not yet in the WSTW database.
-                continue
-            reading = Decimal(value.get('wert') * factor)
-            if ts.minute % 15 != 0 or ts.second != 0 or ts.microsecond != 0:
-                _LOGGER.warning(f"Unexpected time detected in historic data: {value}")
-            dates[ts.replace(minute=0)] += reading
-            if value.get('geschaetzt'):
-                _LOGGER.debug(f"Not seen that before: Estimated Value found for {ts}: {reading}")
+        hourly = aggregate_hourly_series(series, start, milli_wh)
 
         statistics = []
         metadata = self.get_statistics_metadata()
 
-        for ts, usage in sorted(dates.items(), key=itemgetter(0)):
-            total_usage += usage
-            statistics.append(StatisticData(start=ts, sum=total_usage, state=float(usage)))
+        sums = cumulative_sums(hourly, total_usage)
+        for (ts, usage), _sum in zip(hourly, sums):
+            statistics.append(StatisticData(start=ts, sum=milli_wh_to_kwh(_sum), state=milli_wh_to_kwh(usage)))
+        if sums:
+            total_usage = sums[-1]
         if len(statistics) > 0:
             _LOGGER.debug(f"Importing statistics from {statistics[0]} to {statistics[-1]}")
-        async_add_external_statistics(self.hass, metadata, statistics)
+        self.last_statistics.add_external_statistics(metadata, statistics)
         return total_usage
\ No newline at end of file
@@ -1,13 +1,13 @@
 import logging
 
 from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
-from homeassistant.components.recorder.statistics import async_add_external_statistics
 from homeassistant.core import HomeAssistant
 from homeassistant.util import dt as dt_util
-from homeassistant.util import slugify
 
+from .AsyncSmartmeter import AsyncSmartmeter
+from .api.constants import ValueType
 from .const import DOMAIN
-from .statistics_utils import as_utc, get_last_stats_timestamp
+from .statistics_utils import as_utc, main_daily_snapshot_statistic_id
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -15,10 +15,12 @@ _LOGGER = logging.getLogger(__name__)
 class MainDailySnapshotStatisticsImporter:
     """Import METER_READ snapshot points into long-term statistics with reading-date timestamps."""
 
-    def __init__(self, hass: HomeAssistant, zaehlpunkt: str):
+    def __init__(self, hass: HomeAssistant, async_smartmeter: AsyncSmartmeter, zaehlpunkt: str):
         self.hass = hass
         self.zaehlpunkt = zaehlpunkt
-        self.id = f"{DOMAIN}:{slugify(zaehlpunkt)}_main_daily_snapshot"
+        self.id = main_daily_snapshot_statistic_id(zaehlpunkt)
+        self.last_statistics = async_smartmeter.last_statistics
+        self.watermarks = async_smartmeter.watermarks(zaehlpunkt)
 
     def get_statistics_metadata(self) -> StatisticMetaData:
         return StatisticMetaData(
@@ -41,10 +43,14 @@ class MainDailySnapshotStatisticsImporter:
             _LOGGER.warning("Skipping main snapshot import for %s: invalid reading_date '%s'", self.zaehlpunkt, reading_date)
             return
 
-        last_start = await get_last_stats_timestamp(self.hass, self.id, "start")
+        last_start = await self.watermarks.async_get(self.id, ValueType.METER_READ)
+        if last_start is None:
+            last_start = await self.last_statistics.async_get_timestamp(self.id, "start")
         if last_start is not None and start <= last_start:
+            await self.watermarks.async_advance(self.id, ValueType.METER_READ, last_start)
             return
 
         metadata = self.get_statistics_metadata()
         stats = [StatisticData(start=start, state=float(meter_reading), sum=None)]
-        async_add_external_statistics(self.hass, metadata, stats)
+        self.last_statistics.add_external_statistics(metadata, stats)
+        await self.watermarks.async_advance(self.id, ValueType.METER_READ, start)
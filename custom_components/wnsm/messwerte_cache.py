@@ -0,0 +1,126 @@
+"""Persistent cache of messwerte of settled days."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, tzinfo
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+from .timestamps import parse_datetime
+from .utils import today
+
+STORAGE_VERSION = 1
+SAVE_DELAY_SECONDS = 30
+
+
+def is_estimated(value: dict[str, Any]) -> bool:
+    """Return True for values the API flags as estimated, they may still change."""
+    return bool(value.get("geschaetzt")) or value.get("qualitaet") not in (None, "VAL")
+
+
+def start_of_day(day: date, tz: tzinfo) -> datetime:
+    """Return the start of a day in the given time zone."""
+    return datetime.combine(day, time(), tzinfo=tz)
+
+
+def day_of(timestamp: str | None, tz: tzinfo) -> date | None:
+    """Return the day in the given time zone a value with the given timestamp belongs to."""
+    parsed = parse_datetime(timestamp)
+    return None if parsed is None else parsed.astimezone(tz).date()
+
+
+def complete_days(covered_from: datetime, covered_until: datetime, tz: tzinfo) -> list[date]:
+    """Return the days in the given time zone that lie completely within [covered_from, covered_until)."""
+    day = covered_from.astimezone(tz).date()
+    days = []
+    while start_of_day(day + timedelta(days=1), tz) <= covered_until:
+        if start_of_day(day, tz) >= covered_from:
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+class MesswerteCache:
+    """Cache the messwerte of one Zählpunkt per series (value type) and day.
+
+    Only days older than settle_days without estimated values are stored, so the
+    API is only asked for the days that may still change.
+    """
+
+    def __init__(self, hass: HomeAssistant, zaehlpunkt: str, settle_days: int) -> None:
+        self._store: Store[dict] = Store(
+            hass,
+            STORAGE_VERSION,
+            f"{DOMAIN}.{zaehlpunkt.lower()}.messwerte",
+        )
+        self.settle_days = settle_days
+        self._data: dict[str, dict[str, Any]] | None = None
+        self._load_lock = asyncio.Lock()
+
+    async def _async_load(self) -> dict[str, dict[str, Any]]:
+        async with self._load_lock:
+            if self._data is None:
+                self._data = await self._store.async_load() or {}
+        return self._data
+
+    async def async_get(
+        self, series: str, first_day: date, last_day: date
+    ) -> tuple[dict[str, Any] | None, list[tuple[date, list[dict[str, Any]]]], date]:
+        """Return the response metadata, the cached consecutive days from first_day on and the first day to fetch."""
+        entry = (await self._async_load()).get(series)
+        if not entry or entry.get("meta") is None:
+            return None, [], first_day
+
+        cached_days = []
+        day = first_day
+        while day <= last_day and day.isoformat() in entry["days"]:
+            cached_days.append((day, entry["days"][day.isoformat()]))
+            day += timedelta(days=1)
+        return entry["meta"], cached_days, day
+
+    async def async_update(
+        self,
+        series: str,
+        meta: dict[str, Any],
+        values: list[dict[str, Any]],
+        timestamp_key: str,
+        covered_from: datetime,
+        covered_until: datetime,
+        tz: tzinfo,
+    ) -> None:
+        """Store the settled days of a response that covered [covered_from, covered_until)."""
+        data = await self._async_load()
+        entry = data.setdefault(series, {"meta": None, "days": {}})
+        entry["meta"] = meta
+
+        values_by_day: dict[date, list[dict[str, Any]]] = defaultdict(list)
+        for value in values:
+            day = day_of(value.get(timestamp_key), tz)
+            if day is not None:
+                values_by_day[day].append(value)
+
+        changed = False
+        settled_until = today().date() - timedelta(days=self.settle_days)
+        for day in complete_days(covered_from, covered_until, tz):
+            if day > settled_until:
+                break
+            day_values = values_by_day.get(day)
+            if not day_values or any(is_estimated(value) for value in day_values):
+                # fetched again until the API reports final values
+                changed |= entry["days"].pop(day.isoformat(), None) is not None
+            elif entry["days"].get(day.isoformat()) != day_values:
+                entry["days"][day.isoformat()] = day_values
+                changed = True
+        # the metadata alone is saved with the next day
+        if changed:
+            self._store.async_delay_save(lambda: self._data, SAVE_DELAY_SECONDS)
+
+    async def async_remove(self) -> None:
+        """Remove the cache from disk."""
+        await self._store.async_remove()
+        self._data = None
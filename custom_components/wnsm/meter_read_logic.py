@@ -2,12 +2,42 @@
 
 from __future__ import annotations
 
-from datetime import datetime
+from bisect import bisect_left
+from datetime import date, datetime
 from typing import Any
 
+from homeassistant.util import dt as dt_util
+
 from .AsyncSmartmeter import AsyncSmartmeter
+from .api.constants import ValueType
 from .measurement_attributes import set_messwert_attributes
-from .utils import build_reading_date_attributes
+from .timestamps import parse_datetime
+from .utils import build_reading_date_attributes, today
+
+
+def index_meter_reads_by_date(values: list[dict[str, Any]]) -> dict[date, float]:
+    """Index METER_READ messwerte (Wh) by their local reading date, keeping the first value per date (kWh)."""
+    timestamped = []
+    for value in values:
+        timestamp = value.get("zeitVon")
+        messwert = value.get("messwert")
+        if timestamp is None or messwert is None:
+            continue
+        parsed = parse_datetime(timestamp)
+        if parsed is not None:
+            timestamped.append((parsed, messwert))
+
+    meter_reads: dict[date, float] = {}
+    for timestamp, messwert in sorted(timestamped, key=lambda item: item[0]):
+        meter_reads.setdefault(dt_util.as_local(timestamp).date(), messwert / 1000)
+    return meter_reads
+
+
+def first_meter_read_on_or_after(meter_reads: dict[date, float], reading_date: datetime) -> float | None:
+    """Return the first indexed meter read at or after the reading date, like a window starting at that date."""
+    dates = list(meter_reads)
+    position = bisect_left(dates, reading_date.date())
+    return meter_reads[dates[position]] if position < len(dates) else None
 
 
 async def async_get_latest_meter_read_payload(
@@ -15,17 +45,27 @@ async def async_get_latest_meter_read_payload(
     zaehlpunkt: str,
     zaehlpunkt_response: dict[str, Any],
 ) -> tuple[int | float | None, dict[str, Any]]:
-    """Return latest meter read value and normalized attributes for a Zählpunkt."""
+    """Return latest meter read value and normalized attributes for a Zählpunkt.
+
+    A single METER_READ window covering all candidate reading dates is fetched and
+    the value of each reading date is picked locally.
+    """
     reading_dates, attributes = build_reading_date_attributes(zaehlpunkt_response)
+    historic_data = await async_smartmeter.get_historic_data(
+        zaehlpunkt,
+        min(reading_dates),
+        # only the date is sent, so identical calls of the same day can be coalesced
+        today(),
+        ValueType.METER_READ,
+    )
+    indexed_reads = index_meter_reads_by_date(historic_data.get("values") or [])
     meter_reads: list[int | float | None] = []
 
     selected_value: int | float | None = None
     selected_reading_date = None
 
     for reading_date in reading_dates:
-        meter_reading = await async_smartmeter.get_meter_reading_from_historic_data(
-            zaehlpunkt, reading_date, datetime.now()
-        )
+        meter_reading = first_meter_read_on_or_after(indexed_reads, reading_date)
         meter_reads.append(meter_reading)
         if selected_value is None and meter_reading is not None:
             selected_value = meter_reading
@@ -0,0 +1,148 @@
+"""Schedule coordinator refreshes around the time Wiener Netze publishes new data."""
+
+from __future__ import annotations
+
+import logging
+import random
+from datetime import date, datetime, timedelta
+from statistics import median
+from typing import TYPE_CHECKING
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DENSE_POLL_INTERVAL_MINUTES,
+    DOMAIN,
+    MAX_SCHEDULE_JITTER_SECONDS,
+    PUBLICATION_HISTORY_SIZE,
+    PUBLICATION_WINDOW_MINUTES,
+)
+from .timestamps import parse_datetime
+
+if TYPE_CHECKING:
+    from .coordinator import ZaehlpunktData
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+MIN_INTERVAL = timedelta(minutes=1)
+MAX_INTERVAL = timedelta(days=1)
+
+
+def newest_reading_date(data: ZaehlpunktData) -> date | None:
+    """Return the newest day with METER_READ or DAY data of a Zählpunkt."""
+    dates = []
+    reading_date = data.meter_read_attributes.get("reading_date")
+    if reading_date is not None:
+        parsed = dt_util.parse_datetime(reading_date)
+        if parsed is not None:
+            dates.append(dt_util.as_local(parsed).date())
+    for value in data.day_messwerte.get("values") or []:
+        parsed = parse_datetime(value.get("zeitVon"))
+        if parsed is not None and value.get("messwert") is not None:
+            dates.append(dt_util.as_local(parsed).date())
+    return max(dates, default=None)
+
+
+class PublicationScheduler:
+    """Learn when new data of each Zählpunkt arrives and derive the next update interval.
+
+    Data of a day is published on the following day. Once it has been seen for all
+    Zählpunkte, updates pause until tomorrow's publication window; within the window
+    they are dense. Without learned arrival times, the fallback interval is used.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str, fallback_interval: timedelta) -> None:
+        self._store: Store[dict] = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.schedule")
+        self.fallback_interval = fallback_interval
+        # stable per config entry, so several entries do not poll at the same moment
+        self.jitter = timedelta(seconds=random.Random(entry_id).uniform(0, MAX_SCHEDULE_JITTER_SECONDS))
+        # arrival times of new data in minutes after local midnight
+        self._arrivals: dict[str, list[int]] = {}
+        self._newest: dict[str, str] = {}
+        # time of the last update that did not see yesterday's data yet
+        self._last_empty: dict[str, datetime] = {}
+
+    async def async_load(self) -> None:
+        """Restore learned arrival times."""
+        stored = await self._store.async_load() or {}
+        self._arrivals = stored.get("arrivals", {})
+        self._newest = stored.get("newest", {})
+
+    async def async_remove(self) -> None:
+        """Remove learned arrival times from disk."""
+        await self._store.async_remove()
+
+    def observe(self, zaehlpunkt: str, newest: date | None, now: datetime) -> bool:
+        """Record the newest reading date of a Zählpunkt, returns True if it changed.
+
+        Yesterday's data arrived between the last update without it and now. The start of
+        that interval is learned, a sparse poll seeing the data hours later would skew it.
+        """
+        yesterday = now.date() - timedelta(days=1)
+        known = zaehlpunkt in self._newest
+        changed = newest is not None and self._newest.get(zaehlpunkt, "") < newest.isoformat()
+        if changed:
+            self._newest[zaehlpunkt] = newest.isoformat()
+        if known and self._newest[zaehlpunkt] < yesterday.isoformat():
+            self._last_empty[zaehlpunkt] = now
+            return changed
+        last_empty = self._last_empty.pop(zaehlpunkt, None)
+        # the arrival time is only known if yesterday's data appeared since the last update
+        if changed and known and newest == yesterday:
+            # data of yesterday is published today at the earliest
+            arrived_after = dt_util.start_of_local_day(now.date())
+            if last_empty is not None:
+                arrived_after = max(dt_util.as_local(last_empty), arrived_after)
+            arrivals = self._arrivals.setdefault(zaehlpunkt, [])
+            arrivals.append(arrived_after.hour * 60 + arrived_after.minute)
+            del arrivals[:-PUBLICATION_HISTORY_SIZE]
+            _LOGGER.debug("New data of %s arrived between %s and %s", zaehlpunkt, arrived_after.time(), now.time())
+        return changed
+
+    async def async_observe(self, data: dict[str, ZaehlpunktData | None], now: datetime) -> None:
+        """Record the data of an update cycle and persist changes."""
+        changed = False
+        for zaehlpunkt, zaehlpunkt_data in data.items():
+            if zaehlpunkt_data is not None and zaehlpunkt_data.active:
+                changed |= self.observe(zaehlpunkt, newest_reading_date(zaehlpunkt_data), now)
+        if changed:
+            await self._store.async_save({"arrivals": self._arrivals, "newest": self._newest})
+
+    def publication_window(self, zaehlpunkt: str) -> tuple[timedelta, timedelta] | None:
+        """Return start and end of the expected publication window after local midnight."""
+        arrivals = self._arrivals.get(zaehlpunkt)
+        if not arrivals:
+            return None
+        typical = timedelta(minutes=median(arrivals))
+        window = timedelta(minutes=PUBLICATION_WINDOW_MINUTES)
+        return max(typical - window, timedelta()), typical + window
+
+    def next_interval(self, zaehlpunkte: list[str], now: datetime) -> timedelta:
+        """Return the time until the next update."""
+        yesterday = (now.date() - timedelta(days=1)).isoformat()
+        waiting = [zp for zp in zaehlpunkte if self._newest.get(zp, "") < yesterday]
+        windows = [self.publication_window(zp) for zp in (waiting or zaehlpunkte)]
+        if not windows or None in windows:
+            return self.fallback_interval
+
+        start = min(window[0] for window in windows)
+        if not waiting:
+            # everything arrived, sleep until tomorrow's window
+            next_update = dt_util.start_of_local_day(now.date() + timedelta(days=1)) + start + self.jitter
+        else:
+            midnight = dt_util.start_of_local_day(now.date())
+            window_start = midnight + start + self.jitter
+            window_end = midnight + max(window[1] for window in windows) + self.jitter
+            if now < window_start:
+                next_update = window_start
+            elif now <= window_end:
+                next_update = now + timedelta(minutes=DENSE_POLL_INTERVAL_MINUTES)
+            else:
+                # late today, keep polling at the configured interval
+                return self.fallback_interval
+        # times in the same zone subtract as wall clock times, which is off by an hour across DST changes
+        interval = dt_util.as_utc(next_update) - dt_util.as_utc(now)
+        return min(max(interval, MIN_INTERVAL), MAX_INTERVAL)
@@ -0,0 +1,50 @@
+"""Persist Smartmeter authentication state across Home Assistant restarts."""
+
+from __future__ import annotations
+
+import logging
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .api import Smartmeter
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+
+
+class WnsmSessionStore:
+    """Store tokens and API gateway keys of one config entry in HA storage."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        self._store: Store[dict] = Store(
+            hass,
+            STORAGE_VERSION,
+            f"{DOMAIN}.{entry_id}.session",
+            private=True,
+        )
+        self._last_saved: dict | None = None
+
+    async def async_restore(self, smartmeter: Smartmeter) -> None:
+        """Restore a persisted session into the given client."""
+        session = await self._store.async_load()
+        if session is None:
+            return
+        smartmeter.restore_session(session)
+        self._last_saved = session
+        _LOGGER.debug("Restored smart meter session, access token valid until %s", session.get("access_token_expiration"))
+
+    async def async_save(self, smartmeter: Smartmeter) -> None:
+        """Persist the session of the given client if it changed since the last save."""
+        session = smartmeter.export_session()
+        if session == self._last_saved or session.get("access_token") is None:
+            return
+        await self._store.async_save(session)
+        self._last_saved = session
+
+    async def async_remove(self) -> None:
+        """Remove the persisted session."""
+        await self._store.async_remove()
+        self._last_saved = None
@@ -2,12 +2,18 @@
 
 from __future__ import annotations
 
-from datetime import datetime, timezone
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable
 
-from homeassistant.components.recorder import get_instance
-from homeassistant.components.recorder.statistics import get_last_statistics
-from homeassistant.core import HomeAssistant
+from homeassistant.components.recorder import EVENT_RECORDER_HOURLY_STATISTICS_GENERATED, get_instance
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import async_add_external_statistics, get_last_statistics
+from homeassistant.core import Event, HomeAssistant, callback
 from homeassistant.util import dt as dt_util
+from homeassistant.util import slugify
+
+from .const import DOMAIN
 
 
 def as_utc(value: datetime | None) -> datetime | None:
@@ -30,20 +36,136 @@ def parse_stats_timestamp(value: datetime | str | int | float | None) -> datetim
     return None
 
 
-async def get_last_stats_timestamp(
-    hass: HomeAssistant,
-    statistic_id: str,
-    field: str,
-) -> datetime | None:
-    """Read and parse last imported timestamp field for a statistic_id."""
-    last = await get_instance(hass).async_add_executor_job(
-        get_last_statistics,
-        hass,
-        1,
-        statistic_id,
-        True,
-        {field},
-    )
-    if statistic_id in last and len(last[statistic_id]) == 1:
-        return parse_stats_timestamp(last[statistic_id][0].get(field))
-    return None
+def meter_read_statistic_id(zaehlpunkt: str) -> str:
+    """Statistic id of the METER_READ/bewegungsdaten statistics of a Zählpunkt."""
+    return f"{DOMAIN}:{zaehlpunkt.lower()}"
+
+
+def day_statistic_id(zaehlpunkt: str) -> str:
+    """Statistic id of the DAY statistics of a Zählpunkt."""
+    return f"{DOMAIN}:{slugify(zaehlpunkt)}_day"
+
+
+def main_daily_snapshot_statistic_id(zaehlpunkt: str) -> str:
+    """Statistic id of the METER_READ snapshot statistics of a Zählpunkt."""
+    return f"{DOMAIN}:{slugify(zaehlpunkt)}_main_daily_snapshot"
+
+
+def statistic_ids(zaehlpunkt: str) -> list[str]:
+    """All statistic ids imported for a Zählpunkt."""
+    return [
+        meter_read_statistic_id(zaehlpunkt),
+        day_statistic_id(zaehlpunkt),
+        main_daily_snapshot_statistic_id(zaehlpunkt),
+    ]
+
+
+def _last_statistics(hass: HomeAssistant, statistic_ids: list[str]) -> dict[str, dict[str, Any] | None]:
+    """Read the last row of each statistic, runs in the recorder executor."""
+    rows = {}
+    for statistic_id in statistic_ids:
+        last = get_last_statistics(hass, 1, statistic_id, True, {"sum", "state"})
+        rows[statistic_id] = last[statistic_id][0] if len(last.get(statistic_id, [])) == 1 else None
+    return rows
+
+
+class LastStatisticsCache:
+    """Write-through cache of the last row (start, end, sum, state) of each statistic.
+
+    Seeded with one recorder job at setup and updated by add_external_statistics, so
+    importers do not need a recorder round trip to learn where to continue. The recorder
+    commits imports later without reporting failures, so rows are only read again after
+    the recorder compiled statistics or an import was rejected before it was queued.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        # None marks statistics known to have no rows yet
+        self._rows: dict[str, dict[str, Any] | None] = {}
+        self._lock = asyncio.Lock()
+        self._invalidate_listeners: list[Callable[[str | None], None]] = []
+
+    async def async_seed(self, statistic_ids: list[str]) -> None:
+        """Read the last rows of all given statistics in a single executor job."""
+        async with self._lock:
+            missing = [statistic_id for statistic_id in statistic_ids if statistic_id not in self._rows]
+            if missing:
+                rows = await get_instance(self.hass).async_add_executor_job(_last_statistics, self.hass, missing)
+                self._rows.update({statistic_id: self._normalize(row) for statistic_id, row in rows.items()})
+
+    async def async_get(self, statistic_id: str) -> dict[str, Any] | None:
+        """Return the last row of a statistic or None if it has none."""
+        if statistic_id not in self._rows:
+            await self.async_seed([statistic_id])
+        return self._rows[statistic_id]
+
+    async def async_get_timestamp(self, statistic_id: str, field: str) -> datetime | None:
+        """Return start or end of the last row of a statistic."""
+        row = await self.async_get(statistic_id)
+        return None if row is None else row[field]
+
+    @callback
+    def invalidate(self, statistic_id: str | None = None) -> None:
+        """Forget the last row of a statistic, or of all statistics if None."""
+        if statistic_id is None:
+            self._rows.clear()
+        else:
+            self._rows.pop(statistic_id, None)
+        for listener in self._invalidate_listeners:
+            listener(statistic_id)
+
+    @callback
+    def async_add_invalidate_listener(self, listener: Callable[[str | None], None]) -> Callable[[], None]:
+        """Call listener with the statistic id, None for all, whenever rows are invalidated.
+
+        Returns the function to remove the listener.
+        """
+        self._invalidate_listeners.append(listener)
+        return lambda: self._invalidate_listeners.remove(listener)
+
+    @callback
+    def async_listen(self) -> Callable[[], None]:
+        """Invalidate all rows whenever the recorder compiled statistics, returns the function to stop.
+
+        The recorder does not report statistics cleared or adjusted by the user, the hourly
+        compilation bounds how long such a change goes unnoticed.
+        """
+        @callback
+        def _statistics_generated(event: Event) -> None:
+            self.invalidate()
+
+        return self.hass.bus.async_listen(EVENT_RECORDER_HOURLY_STATISTICS_GENERATED, _statistics_generated)
+
+    def add_external_statistics(self, metadata: StatisticMetaData, statistics: list[StatisticData]) -> None:
+        """Queue statistics with the recorder and remember the newest of them.
+
+        Invalid statistics are rejected here, a failure of the recorder job is not noticed.
+        """
+        try:
+            async_add_external_statistics(self.hass, metadata, statistics)
+        except Exception:
+            self.invalidate(metadata["statistic_id"])
+            raise
+        if not statistics:
+            return
+        newest = max(statistics, key=lambda statistic: statistic["start"])
+        start = as_utc(newest["start"])
+        cached = self._rows.get(metadata["statistic_id"])
+        if cached is None or start >= cached["start"]:
+            self._rows[metadata["statistic_id"]] = {
+                "start": start,
+                "end": start + timedelta(hours=1),
+                "sum": newest.get("sum"),
+                "state": newest.get("state"),
+            }
+
+    @staticmethod
+    def _normalize(row: dict[str, Any] | None) -> dict[str, Any] | None:
+        if row is None:
+            return None
+        return {
+            "start": parse_stats_timestamp(row.get("start")),
+            "end": parse_stats_timestamp(row.get("end")),
+            "sum": row.get("sum"),
+            "state": row.get("state"),
+        }
@@ -0,0 +1,81 @@
+"""Compact storage of the values of a messwerte or bewegungsdaten response."""
+
+from __future__ import annotations
+
+import logging
+import math
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Iterator
+
+from .timestamps import parse_epoch
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ValueSeries:
+    """Timestamps, values and estimated flags of a response in arrays instead of dicts.
+
+    Timestamps are UTC epoch seconds, missing values are stored as NaN and the
+    geschaetzt flags as a bitset, about 17 bytes per value instead of a dict each.
+    """
+
+    __slots__ = ("timestamps", "values", "_estimated")
+
+    def __init__(self) -> None:
+        self.timestamps = array("q")
+        self.values = array("d")
+        self._estimated = bytearray()
+
+    @classmethod
+    def from_values(
+        cls,
+        values: list[dict[str, Any]],
+        timestamp_key: str,
+        value_key: str,
+        factor: float = 1.0,
+    ) -> ValueSeries:
+        """Build a series in response order, values without a valid timestamp are skipped."""
+        series = cls()
+        for value in values:
+            series.append_value(value, timestamp_key, value_key, factor)
+        return series
+
+    def append_value(self, value: dict[str, Any], timestamp_key: str, value_key: str, factor: float = 1.0) -> None:
+        """Add a value dict of a response, it is skipped if it has no valid timestamp."""
+        timestamp = parse_epoch(value.get(timestamp_key))
+        if timestamp is None:
+            _LOGGER.debug("Skipping value without %s: %s", timestamp_key, value)
+            return
+        wert = value.get(value_key)
+        self.append(timestamp, None if wert is None else wert * factor, bool(value.get("geschaetzt")))
+
+    def append(self, timestamp: int, value: float | None, estimated: bool = False) -> None:
+        """Add a value, None for values the API does not have yet."""
+        index = len(self.timestamps)
+        self.timestamps.append(timestamp)
+        self.values.append(math.nan if value is None else value)
+        if index % 8 == 0:
+            self._estimated.append(0)
+        if estimated:
+            self._estimated[index >> 3] |= 1 << (index & 7)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def __iter__(self) -> Iterator[tuple[int, float | None]]:
+        """Yield (timestamp, value) pairs, value is None if missing."""
+        for timestamp, value in zip(self.timestamps, self.values):
+            yield timestamp, None if math.isnan(value) else value
+
+    def is_estimated(self, index: int) -> bool:
+        """Return the geschaetzt flag of a value."""
+        return bool(self._estimated[index >> 3] & (1 << (index & 7)))
+
+    def datetime(self, index: int) -> datetime:
+        """Return the timestamp of a value as UTC datetime."""
+        return datetime.fromtimestamp(self.timestamps[index], timezone.utc)
+
+    def total(self) -> float:
+        """Sum of all present values."""
+        return math.fsum(value for value in self.values if not math.isnan(value))
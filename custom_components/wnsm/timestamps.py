@@ -0,0 +1,47 @@
+"""Parse the fixed ISO 8601 timestamp formats of the API quickly."""
+
+from __future__ import annotations
+
+import math
+from datetime import datetime, timezone
+
+from homeassistant.util import dt as dt_util
+
+# "2024-01-01T00:00:00Z", "2024-01-01T00:00:00.000Z", "2024-01-01T00:00:00+01:00" and "2024-01-01T00:00:00.000+01:00"
+_API_FORMAT_LENGTHS = frozenset((20, 24, 25, 29))
+_fromisoformat = datetime.fromisoformat
+
+
+def parse_datetime(timestamp: str | None) -> datetime | None:
+    """Parse an API timestamp, other formats are passed to dt_util.parse_datetime.
+
+    The formats of the API are parsed by datetime.fromisoformat in C.
+    """
+    if timestamp is None:
+        return None
+    if len(timestamp) in _API_FORMAT_LENGTHS and timestamp[10] == "T":
+        try:
+            return _fromisoformat(timestamp)
+        except ValueError:
+            pass
+    return dt_util.parse_datetime(timestamp)
+
+
+def parse_epoch(timestamp: str | None) -> int | None:
+    """Return the UTC epoch seconds of an API timestamp, naive timestamps are taken as UTC."""
+    if timestamp is None:
+        return None
+    parsed = None
+    if len(timestamp) in _API_FORMAT_LENGTHS and timestamp[10] == "T":
+        try:
+            parsed = _fromisoformat(timestamp)
+        except ValueError:
+            pass
+    if parsed is None:
+        # not in a format of the API, fromisoformat has been tried already
+        parsed = dt_util.parse_datetime(timestamp)
+        if parsed is None:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return math.floor(parsed.timestamp())
@@ -2,10 +2,8 @@
 Utility functions and convenience methods to avoid boilerplate
 """
 from __future__ import annotations
-from functools import reduce
 from datetime import tzinfo, timezone, timedelta, datetime
-import logging
-from typing import Any
+from typing import Any, Callable
 
 from homeassistant.util import dt as dt_util
 
@@ -54,33 +52,55 @@ def strint(string: str) -> int | None:
     return string
 
 
-def is_valid_access(data: list | dict, accessor: str | int) -> bool:
+def compile_path(path: str) -> Callable[[Any], Any]:
     """
-    convenience function for double-checking if attribute of list or dict can be accessed
+    compile a path of nested accessors separated by '.' into a function returning the addressed value
+    or None if it cannot be accessed. Digits index lists, everything else dict keys.
     """
-    if isinstance(accessor, int) and isinstance(data, list):
-        return accessor < len(data)
-    if isinstance(accessor, str) and isinstance(data, dict):
-        return accessor in data
-    else:
-        return False
+    accessors = tuple(strint(s) for s in path.split("."))
+
+    def access(data: Any) -> Any:
+        for accessor in accessors:
+            if isinstance(accessor, int):
+                if not isinstance(data, list) or accessor >= len(data):
+                    return None
+                data = data[accessor]
+            elif isinstance(data, dict):
+                data = data.get(accessor)
+            else:
+                return None
+        return data
+
+    if len(accessors) == 1 and not isinstance(accessors[0], int):
+        key = accessors[0]
+        return lambda data: data.get(key) if isinstance(data, dict) else None
+    return access
 
 
 def dict_path(path: str, dictionary: dict) -> str | None:
     """
     convenience function for accessing nested attributes within a dict
     """
-    try:
-        return reduce(
-            lambda acc, i: acc[i] if is_valid_access(acc, i) else None,
-            [strint(s) for s in path.split(".")],
-            dictionary,
-        )
-    except KeyError as exception:
-        logging.warning("Could not find key '%s' in response", exception.args[0])
-    except Exception as exception:  # pylint: disable=broad-except
-        logging.exception(exception)
-    return None
+    return compile_path(path)(dictionary)
+
+
+class AttributeMapper:
+    """
+    attribute mapping (see translate_dict) with its paths compiled once, calling it maps a response in a single pass
+    """
+
+    __slots__ = ("_accessors",)
+
+    def __init__(self, attrs_list: list[tuple[str, str]]) -> None:
+        self._accessors = tuple((compile_path(src), destination) for src, destination in attrs_list)
+
+    def __call__(self, dictionary: dict) -> dict[str, Any]:
+        result = {}
+        for access, destination in self._accessors:
+            value = access(dictionary)
+            if value is not None:
+                result[destination] = value
+        return result
 
 
 def safeget(dct, *keys, default=None):
@@ -97,11 +117,7 @@ def translate_dict(
 ) -> dict[str, str]:
     """
     Given a response dictionary and an attribute mapping (with nested accessors separated by '.')
-    returns a dictionary including all "picked" attributes addressed by attrs_list
+    returns a dictionary including all "picked" attributes addressed by attrs_list.
+    Mappings used repeatedly should be compiled once into an AttributeMapper instead.
     """
-    result = {}
-    for src, destination in attrs_list:
-        value = dict_path(src, dictionary)
-        if value is not None:
-            result[destination] = value
-    return result
+    return AttributeMapper(attrs_list)(dictionary)
@@ -0,0 +1,85 @@
+"""Persist the newest data already imported into statistics per Zählpunkt and value type."""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .api.constants import ValueType
+from .const import DOMAIN
+from .statistics_utils import LastStatisticsCache, parse_stats_timestamp
+
+STORAGE_VERSION = 1
+SAVE_DELAY_SECONDS = 10
+
+
+class IngestWatermarkStore:
+    """Newest imported timestamp of each statistic and value type of one Zählpunkt.
+
+    Importers compare the newest data the API could have against the watermark before
+    they query the API, so updates without new data cost nothing. Imports are only queued
+    with the recorder, so given last_statistics a watermark never reaches beyond the last
+    row the recorder has for the statistic.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, zaehlpunkt: str, last_statistics: LastStatisticsCache | None = None
+    ) -> None:
+        self._store: Store[dict] = Store(
+            hass,
+            STORAGE_VERSION,
+            f"{DOMAIN}.{zaehlpunkt.lower()}.watermark",
+        )
+        self.last_statistics = last_statistics
+        self._data: dict[str, dict[str, str]] | None = None
+        self._load_lock = asyncio.Lock()
+
+    async def _async_load(self) -> dict[str, dict[str, str]]:
+        async with self._load_lock:
+            if self._data is None:
+                self._data = await self._store.async_load() or {}
+        return self._data
+
+    async def async_get(self, statistic_id: str, value_type: ValueType) -> datetime | None:
+        """Return the newest imported timestamp or None if nothing has been imported yet."""
+        data = await self._async_load()
+        watermark = parse_stats_timestamp(data.get(statistic_id, {}).get(value_type.value))
+        if watermark is None or self.last_statistics is None:
+            return watermark
+        # a failed import or statistics cleared by the user leave the recorder behind
+        last_end = await self.last_statistics.async_get_timestamp(statistic_id, "end")
+        return None if last_end is None else min(watermark, last_end)
+
+    async def async_is_current(self, statistic_id: str, value_type: ValueType, newest: datetime | None) -> bool:
+        """Return True if data up to newest has already been imported."""
+        if newest is None:
+            return False
+        watermark = await self.async_get(statistic_id, value_type)
+        return watermark is not None and newest <= watermark
+
+    async def async_advance(self, statistic_id: str, value_type: ValueType, newest: datetime | None) -> None:
+        """Move the watermark forward to newest, it never moves backwards."""
+        if newest is None or await self.async_is_current(statistic_id, value_type, newest):
+            return
+        data = await self._async_load()
+        data.setdefault(statistic_id, {})[value_type.value] = newest.isoformat()
+        self._store.async_delay_save(lambda: self._data, SAVE_DELAY_SECONDS)
+
+    @callback
+    def reset(self, statistic_id: str | None = None) -> None:
+        """Forget the watermarks of a statistic, or of all statistics if None."""
+        if not self._data:
+            return
+        if statistic_id is None:
+            self._data.clear()
+        elif self._data.pop(statistic_id, None) is None:
+            return
+        self._store.async_delay_save(lambda: self._data, SAVE_DELAY_SECONDS)
+
+    async def async_remove(self) -> None:
+        """Remove the watermarks from disk."""
+        await self._store.async_remove()
+        self._data = None
@@ -1,5 +1,5 @@
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Any, Optional
 
 from homeassistant.components.sensor import (
@@ -8,13 +8,11 @@ from homeassistant.components.sensor import (
     ENTITY_ID_FORMAT,
 )
 from homeassistant.const import UnitOfEnergy
+from homeassistant.core import callback
 from homeassistant.util import slugify
 
-from .api.constants import ValueType
 from .base_sensor import WNSMBaseSensor
-from .const import DEFAULT_SCAN_INTERVAL_MINUTES
-from .importer import Importer
-from .meter_read_logic import async_get_latest_meter_read_payload
+from .coordinator import WNSMDataUpdateCoordinator, ZaehlpunktData
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -27,14 +25,10 @@ class WNSMSensor(WNSMBaseSensor):
 
     def __init__(
         self,
-        async_smartmeter,
-        username: str,
-        password: str,
+        coordinator: WNSMDataUpdateCoordinator,
         zaehlpunkt: str,
-        scan_interval: timedelta = timedelta(minutes=DEFAULT_SCAN_INTERVAL_MINUTES),
     ) -> None:
-        super().__init__(async_smartmeter, username, password)
-        self.zaehlpunkt = zaehlpunkt
+        super().__init__(coordinator, zaehlpunkt)
 
         self._attr_native_value: int | float | None = 0
         self._attr_extra_state_attributes = {"raw_api": {}}
@@ -46,9 +40,7 @@ class WNSMSensor(WNSMBaseSensor):
 
         self.attrs: dict[str, Any] = {}
         self._name: str = zaehlpunkt
-        self._available: bool = True
         self._updatets: str | None = None
-        self._attr_suggested_update_interval = scan_interval
 
     @property
     def get_state(self) -> Optional[str]:
@@ -72,42 +64,11 @@ class WNSMSensor(WNSMBaseSensor):
         """Return the unique ID of the sensor."""
         return self.zaehlpunkt
 
-    @property
-    def available(self) -> bool:
-        """Return True if entity is available."""
-        return self._available
-
-    def granularity(self) -> ValueType:
-        return ValueType.from_str(self._attr_extra_state_attributes.get("granularity", "QUARTER_HOUR"))
-
-    async def async_update(self):
-        """Update sensor."""
-        try:
-            async_smartmeter = self._get_async_smartmeter()
-            await async_smartmeter.login()
-            zaehlpunkt_response = await async_smartmeter.get_zaehlpunkt(self.zaehlpunkt)
-            if async_smartmeter.is_active(zaehlpunkt_response):
-                meter_reading, self._attr_extra_state_attributes = await async_get_latest_meter_read_payload(
-                    async_smartmeter,
-                    self.zaehlpunkt,
-                    zaehlpunkt_response,
-                )
-                if meter_reading is not None:
-                    self._attr_native_value = meter_reading
-                    reading_date = self._attr_extra_state_attributes.get("reading_date")
-                    importer = Importer(
-                        self.hass,
-                        async_smartmeter,
-                        self.zaehlpunkt,
-                        self.unit_of_measurement,
-                        self.granularity(),
-                    )
-                    await importer.async_import_meter_read(reading_date, meter_reading)
-            self._available = True
-            self._updatets = datetime.now().strftime("%d.%m.%Y %H:%M:%S")
-        except TimeoutError as e:
-            self._available = False
-            _LOGGER.warning("Error retrieving data from smart meter api - Timeout: %s", e)
-        except RuntimeError as e:
-            self._available = False
-            _LOGGER.exception("Error retrieving data from smart meter api - Error: %s", e)
+    @callback
+    def _update_from_data(self, data: ZaehlpunktData) -> None:
+        """Update sensor from the shared METER_READ payload."""
+        if data.active:
+            self._attr_extra_state_attributes = dict(data.meter_read_attributes)
+            if data.meter_reading is not None:
+                self._attr_native_value = data.meter_reading
+        self._updatets = datetime.now().strftime("%d.%m.%Y %H:%M:%S")
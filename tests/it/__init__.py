@@ -1,3 +1,4 @@
+import asyncio
 import datetime as dt
 import json
 import os
@@ -7,9 +8,12 @@ from datetime import datetime, timedelta
 from importlib.resources import files
 from urllib import parse
 from urllib.parse import urlencode
+from typing import Awaitable, Callable, TypeVar
 
+import aiohttp
 import pytest
 import requests
+from homeassistant.core import HomeAssistant
 from requests_mock import Mocker
 
 from test_resources import post_data_matcher
@@ -18,7 +22,22 @@ from test_resources import post_data_matcher
 myPath = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, myPath + '/../../custom_components')
 from wnsm import api  # noqa: E402
-from wnsm.api.constants import ValueType, AnlagenType, RoleType  # noqa: E402
+from wnsm.api.constants import AggregatType, ValueType, AnlagenType, RoleType  # noqa: E402
+
+
+_T = TypeVar("_T")
+
+
+def run_with_hass(config_dir, test: Callable[[HomeAssistant], Awaitable[_T]]) -> _T:
+    """Run test with a HomeAssistant instance whose .storage lives in config_dir."""
+    async def main():
+        hass = HomeAssistant(str(config_dir))
+        try:
+            return await test(hass)
+        finally:
+            await hass.async_stop(force=True)
+
+    return asyncio.run(main())
 
 
 def _dt_string(datetime_string):
@@ -332,7 +351,7 @@ def bewegungsdaten(count=24, timestamp=None, interval='h'):
 
 def bewegungsdaten_response(customer_id: str, zp: str,
                             granularity: ValueType = ValueType.QUARTER_HOUR, anlagetype: AnlagenType = AnlagenType.CONSUMING,
-                            wrong_zp: bool = False, values_count: int = 10):
+                            wrong_zp: bool = False, values_count: int = 10, aggregat: AggregatType = AggregatType.NONE):
     if granularity == ValueType.QUARTER_HOUR:
         gran = "QH"
         if anlagetype == AnlagenType.CONSUMING:
@@ -348,14 +367,15 @@ def bewegungsdaten_response(customer_id: str, zp: str,
     if wrong_zp:
         zp = zp + "9"
 
-    values = [] if values_count == 0 else bewegungsdaten(count=values_count, timestamp=datetime(2022,8,7,0,0,0), interval=gran)
+    interval = "h" if aggregat == AggregatType.SUM_PER_HOUR else gran
+    values = [] if values_count == 0 else bewegungsdaten(count=values_count, timestamp=datetime(2022,8,7,0,0,0), interval=interval)
 
     return {
         "descriptor": {
             "geschaeftspartnernummer": customer_id,
             "zaehlpunktnummer": zp,
             "rolle": rolle,
-            "aggregat": "NONE",
+            "aggregat": aggregat.value,
             "granularitaet": gran,
             "einheit": "KWH"
         },
@@ -367,6 +387,83 @@ def smartmeter(username=USERNAME, password=PASSWORD, code_verifier=CODE_VERIFIER
     return api.client.Smartmeter(username=username, password=password, input_code_verifier=code_verifier)
 
 
+class _MockStreamReader:
+    def __init__(self, body: bytes):
+        self._body = body
+
+    async def iter_chunked(self, n: int):
+        for i in range(0, len(self._body), n):
+            yield self._body[i:i + n]
+
+
+class _MockClientResponse:
+    """The parts of aiohttp.ClientResponse used by the client, backed by a requests.Response."""
+
+    def __init__(self, response: requests.Response):
+        self.status = response.status_code
+        self.headers = response.headers
+        self._body = response.content
+        self.content = _MockStreamReader(self._body)
+
+    async def read(self):
+        return self._body
+
+    async def text(self):
+        return self._body.decode()
+
+
+class _MockRequestContext:
+    def __init__(self, send):
+        self._send = send
+
+    async def __aenter__(self):
+        return _MockClientResponse(self._send())
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class _MockCookieJar:
+    def __init__(self):
+        self.cleared = 0
+
+    def clear(self):
+        self.cleared += 1
+
+
+class MockAiohttpSession:
+    """
+    aiohttp.ClientSession stand-in answering from requests_mock, so the mock_* helpers serve the async client too.
+    requests' timeouts and connection errors are raised as their aiohttp counterparts, aiohttp exceptions registered
+    with exc= are raised as they are.
+    """
+
+    def __init__(self):
+        self.cookie_jar = _MockCookieJar()
+
+    def request(self, method, url, allow_redirects=True, timeout=None, **kwargs):
+        def send():
+            try:
+                return requests.request(method, url, allow_redirects=allow_redirects, **kwargs)
+            except requests.exceptions.Timeout as exception:
+                raise asyncio.TimeoutError() from exception
+            except requests.exceptions.ConnectionError as exception:
+                raise aiohttp.ClientConnectionError(str(exception)) from exception
+
+        return _MockRequestContext(send)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+
+def async_smartmeter_client(username=USERNAME, password=PASSWORD, code_verifier=CODE_VERIFIER, **kwargs):
+    return api.AsyncSmartmeterClient(username, password, MockAiohttpSession(), input_code_verifier=code_verifier,
+                                     **kwargs)
+
+
 @pytest.mark.usefixtures("requests_mock")
 def mock_login_page(requests_mock: Mocker, status: int | None = 200):
     """
@@ -453,6 +550,32 @@ def mock_token(requests_mock: Mocker, code=RESPONSE_CODE, access_token=ACCESS_TO
         }), json={}, status_code=status)
 
 
+@pytest.mark.usefixtures("requests_mock")
+def mock_refresh_token(requests_mock: Mocker, refresh_token=REFRESH_TOKEN, access_token=ACCESS_TOKEN,
+                       status: int | None = 200, expires: int = 300):
+    matcher = post_data_matcher({
+        "grant_type": "refresh_token",
+        "client_id": "wn-smartmeter",
+        "refresh_token": refresh_token,
+    })
+    if status == 200:
+        requests_mock.post(f'{AUTH_URL}/token', additional_matcher=matcher, json={
+            "access_token": access_token,
+            "expires_in": expires,
+            "refresh_expires_in": 6 * expires,
+            "refresh_token": refresh_token,
+            "token_type": "Bearer",
+            "not-before-policy": 0,
+            "session_state": "949e0f0d-b447-4208-bfef-273d694dc633",
+            "scope": "openid email profile"
+        })
+    elif status is None:
+        requests_mock.post(f'{AUTH_URL}/token', additional_matcher=matcher, exc=requests.exceptions.ConnectTimeout)
+    else:
+        requests_mock.post(f'{AUTH_URL}/token', additional_matcher=matcher, json={"error": "invalid_grant"},
+                           status_code=status)
+
+
 @pytest.mark.usefixtures("requests_mock")
 def mock_authenticate(requests_mock: Mocker, username, password, code=RESPONSE_CODE, status: int | None = 302):
     """
@@ -574,7 +697,7 @@ def expect_history(
 @pytest.mark.usefixtures("requests_mock")
 def expect_bewegungsdaten(requests_mock: Mocker, customer_id: str, zp: str, dateFrom: dt.datetime, dateTo: dt.datetime,
                           granularity:ValueType = ValueType.QUARTER_HOUR, anlagetype: AnlagenType = AnlagenType.CONSUMING,
-                          wrong_zp: bool = False, values_count=10):
+                          wrong_zp: bool = False, values_count=10, aggregat: AggregatType = AggregatType.NONE):
     if anlagetype== AnlagenType.FEEDING:
         if granularity == ValueType.DAY: 
             rolle = RoleType.DAILY_FEEDING.value 
@@ -591,7 +714,7 @@ def expect_bewegungsdaten(requests_mock: Mocker, customer_id: str, zp: str, date
         "rolle": rolle,
         "zeitpunktVon": dateFrom.strftime("%Y-%m-%dT00:00:00.000Z"),
         "zeitpunktBis": dateTo.strftime("%Y-%m-%dT23:59:59.999Z"),
-        "aggregat": "NONE"
+        "aggregat": aggregat.value
     }
     url = parse.urljoin(API_URL_ALT, f'user/messwerte/bewegungsdaten?{urlencode(params)}')
     requests_mock.get(url,
@@ -599,4 +722,5 @@ def expect_bewegungsdaten(requests_mock: Mocker, customer_id: str, zp: str, date
                           "Authorization": f"Bearer {ACCESS_TOKEN}",
                           "Accept": "application/json"
                       },
-                      json=bewegungsdaten_response(customer_id, zp, granularity, anlagetype, wrong_zp, values_count))
+                      json=bewegungsdaten_response(customer_id, zp, granularity, anlagetype, wrong_zp, values_count, aggregat))
+    return url
@@ -1,9 +1,15 @@
 """API tests"""
+import asyncio
+import email.utils
+import aiohttp
 import pytest
 import time
 import logging
 from requests_mock import Mocker
+from urllib3.response import HTTPResponse
+from urllib3.util.retry import RequestHistory
 import datetime as dt
+from urllib import parse
 from dateutil.relativedelta import relativedelta
 
 from it import (
@@ -22,15 +28,22 @@ from it import (
     USERNAME,
     mock_token,
     mock_get_api_key,
-    expect_history, expect_bewegungsdaten, zaehlpunkt_response,
+    mock_refresh_token,
+    CODE_VERIFIER,
+    expect_history, expect_bewegungsdaten, zaehlpunkt_response, bewegungsdaten_response,
+    async_smartmeter_client, API_URL_B2C,
 )
 from wnsm.api.errors import SmartmeterConnectionError, SmartmeterLoginError, SmartmeterQueryError
 import wnsm.api.constants as const
+from wnsm.api import json_backend
+from wnsm.api.async_client import HostRateLimiter, _parse_retry_after
+from wnsm.api.client import JitteredRetry
 
 COUNT = 10
 
 logger = logging.getLogger(__name__)
 
+
 @pytest.mark.usefixtures("requests_mock")
 def test_successful_login(requests_mock: Mocker):
     expect_login(requests_mock)
@@ -122,6 +135,7 @@ def test_unsuccessful_login_failing_on_connection_timeout_while_get_config_on_ge
         smartmeter().login()
     assert 'Could not obtain API key' == str(exc_info.value)
 
+
 @pytest.mark.usefixtures("requests_mock")
 def test_unsuccessful_login_failing_on_b2c_api_key_missing(requests_mock):
     mock_login_page(requests_mock)
@@ -132,6 +146,7 @@ def test_unsuccessful_login_failing_on_b2c_api_key_missing(requests_mock):
         smartmeter().login()
     assert 'b2cApiKey not found in response!' == str(exc_info.value)
 
+
 @pytest.mark.usefixtures("requests_mock")
 def test_unsuccessful_login_failing_on_b2b_api_key_missing(requests_mock):
     mock_login_page(requests_mock)
@@ -142,6 +157,7 @@ def test_unsuccessful_login_failing_on_b2b_api_key_missing(requests_mock):
         smartmeter().login()
     assert 'b2bApiKey not found in response!' == str(exc_info.value)
 
+
 @pytest.mark.usefixtures("requests_mock")
 def test_warning_b2c_api_key_change(requests_mock,caplog):
     mock_login_page(requests_mock)
@@ -152,6 +168,7 @@ def test_warning_b2c_api_key_change(requests_mock,caplog):
     assert const.API_URL == "https://api.wstw.at/gateway/WN_SMART_METER_PORTAL_API_B2C/2.0"
     assert 'The b2cApiUrl has changed' in caplog.text
     
+
 @pytest.mark.usefixtures("requests_mock")
 def test_warning_b2b_api_key_change(requests_mock,caplog):
     mock_login_page(requests_mock)
@@ -162,6 +179,7 @@ def test_warning_b2b_api_key_change(requests_mock,caplog):
     assert const.API_URL_B2B == "https://api.wstw.at/gateway/WN_SMART_METER_PORTAL_API_B2B/2.0"
     assert 'The b2bApiUrl has changed' in caplog.text
 
+
 @pytest.mark.usefixtures("requests_mock")
 def test_access_key_expired(requests_mock):
     mock_login_page(requests_mock)
@@ -175,6 +193,99 @@ def test_access_key_expired(requests_mock):
     assert 'Access Token is not valid anymore' in str(exc_info.value)
 
 
+def _expire_access_token(sm):
+    sm._access_token_expiration = dt.datetime.now() - dt.timedelta(seconds=1)
+
+
+def _token_grant_types(requests_mock: Mocker):
+    return [r.text.split("grant_type=")[1].split("&")[0] for r in requests_mock.request_history
+            if r.path.endswith('/token')]
+
+
+@pytest.mark.usefixtures("requests_mock")
+def test_login_refreshes_expired_access_token(requests_mock: Mocker):
+    expect_login(requests_mock)
+    mock_refresh_token(requests_mock)
+    sm = smartmeter().login()
+    _expire_access_token(sm)
+    requests_mock.reset_mock()
+
+    sm.login()
+
+    assert ['refresh_token'] == _token_grant_types(requests_mock)
+    assert 1 == len(requests_mock.request_history)
+    assert sm.is_logged_in()
+
+
+@pytest.mark.usefixtures("requests_mock")
+def test_expire_access_token_forces_refresh_on_login(requests_mock: Mocker):
+    expect_login(requests_mock)
+    mock_refresh_token(requests_mock)
+    sm = smartmeter().login()
+    requests_mock.reset_mock()
+
+    sm.login()
+    assert 0 == len(requests_mock.request_history)
+
+    sm.expire_access_token()
+    assert not sm.is_logged_in()
+    sm.login()
+
+    assert ['refresh_token'] == _token_grant_types(requests_mock)
+    assert sm.is_logged_in()
+
+
+@pytest.mark.usefixtures("requests_mock")
+def test_login_falls_back_to_credentials_if_refresh_fails(requests_mock: Mocker, mocker):
+    expect_login(requests_mock)
+    mock_refresh_token(requests_mock, status=400)
+    sm = smartmeter().login()
+    mocker.patch.object(sm, "generate_code_verifier", return_value=CODE_VERIFIER)
+    _expire_access_token(sm)
+    requests_mock.reset_mock()
+
+    sm.login()
+
+    assert ['refresh_token', 'authorization_code'] == _token_grant_types(requests_mock)
+    assert sm.is_logged_in()
+
+
+@pytest.mark.usefixtures("requests_mock")
+def test_login_with_expired_refresh_token_performs_credentials_login(requests_mock: Mocker, mocker):
+    expect_login(requests_mock)
+    mock_refresh_token(requests_mock)
+    sm = smartmeter().login()
+    mocker.patch.object(sm, "generate_code_verifier", return_value=CODE_VERIFIER)
+    _expire_access_token(sm)
+    sm._refresh_token_expiration = dt.datetime.now() - dt.timedelta(seconds=1)
+    requests_mock.reset_mock()
+
+    sm.login()
+
+    assert ['authorization_code'] == _token_grant_types(requests_mock)
+    assert sm.is_logged_in()
+
+
+@pytest.mark.usefixtures("requests_mock")
+def test_restored_session_needs_no_login(requests_mock: Mocker):
+    expect_login(requests_mock)
+    expect_zaehlpunkte(requests_mock, [enabled(zaehlpunkt())])
+    session = smartmeter().login().export_session()
+    requests_mock.reset_mock()
+
+    sm = smartmeter().restore_session(session).login()
+    zps = sm.zaehlpunkte()
+
+    assert 1 == len(zps[0]['zaehlpunkte'])
+    assert 1 == len(requests_mock.request_history)
+    assert requests_mock.request_history[0].path.endswith('/zaehlpunkte')
+
+
+def test_restore_incomplete_session_is_ignored():
+    sm = smartmeter().restore_session({"access_token": "token"})
+    assert not sm.is_logged_in()
+
+
 @pytest.mark.usefixtures("requests_mock")
 def test_zaehlpunkte(requests_mock: Mocker):
     expect_login(requests_mock)
@@ -199,6 +310,7 @@ def test_history(requests_mock: Mocker):
     assert 'WH' == hist['einheit']
     assert '1-1:1.8.0' == hist['obisCode']
  
+
 @pytest.mark.usefixtures("requests_mock")
 def test_history_with_zp(requests_mock: Mocker):
     z = zaehlpunkt_response([enabled(zaehlpunkt())])[0]
@@ -212,6 +324,73 @@ def test_history_with_zp(requests_mock: Mocker):
     assert 'WH' == hist['einheit']
     assert '1-1:1.8.0' == hist['obisCode']
     
+
+@pytest.mark.usefixtures("requests_mock")
+def test_history_reuses_cached_contracts(requests_mock: Mocker):
+    z = zaehlpunkt_response([enabled(zaehlpunkt())])[0]
+    zp = z["zaehlpunkte"][0]['zaehlpunktnummer']
+    customer_id = z["geschaeftspartner"]
+    expect_login(requests_mock)
+    expect_history(requests_mock, customer_id, zp)
+    expect_zaehlpunkte(requests_mock, [enabled(zaehlpunkt())])
+    sm = smartmeter().login()
+    sm.historical_data(zp)
+    sm.historical_data(zp)
+    assert sm.get_zaehlpunkt(zp) == (customer_id, zp, const.AnlagenType.CONSUMING)
+    assert 1 == len([r for r in requests_mock.request_history if r.path.endswith('/zaehlpunkte')])
+
+
+@pytest.mark.usefixtures("requests_mock")
+def test_new_login_session_or_reset_invalidates_cached_contracts(requests_mock: Mocker):
+    expect_login(requests_mock)
+    expect_zaehlpunkte(requests_mock, [enabled(zaehlpunkt())])
+    sm = smartmeter().login()
+    sm.contracts()
+    sm._session_state = "another-login-session"
+    sm.contracts()
+    assert 2 == len([r for r in requests_mock.request_history if r.path.endswith('/zaehlpunkte')])
+    sm.reset()
+    assert sm._contracts is None
+    assert {} == sm._zaehlpunkt_index
+
+
+@pytest.mark.usefixtures("requests_mock")
+def test_api_payload_debug_log_full(requests_mock: Mocker, caplog):
+    caplog.set_level(logging.DEBUG)
+    expect_login(requests_mock)
+    expect_zaehlpunkte(requests_mock, [enabled(zaehlpunkt())])
+    smartmeter().login().zaehlpunkte()
+    assert '"zaehlpunktnummer": "AT0010000000000000001000011111111"' in caplog.text
+
+
+@pytest.mark.usefixtures("requests_mock")
+def test_api_payload_debug_log_summary(requests_mock: Mocker, caplog):
+    caplog.set_level(logging.DEBUG)
+    z = zaehlpunkt_response([enabled(zaehlpunkt())])[0]
+    dateFrom = dt.datetime(2023, 4, 21, 00, 00, 00, 0)
+    dateTo = dt.datetime(2023, 5, 1, 23, 59, 59, 999999)
+    zpn = z["zaehlpunkte"][0]['zaehlpunktnummer']
+    expect_login(requests_mock)
+    expect_bewegungsdaten(requests_mock, z["geschaeftspartner"], zpn, dateFrom, dateTo, values_count=COUNT)
+    expect_zaehlpunkte(requests_mock, [enabled(zaehlpunkt())])
+    sm = smartmeter()
+    sm.payload_log_mode = const.PayloadLogMode.SUMMARY
+    sm.login().bewegungsdaten(None, dateFrom, dateTo)
+    assert "values=[10 items, first zeitpunktVon=2022-08-07T00:00:00Z, last zeitpunktVon=2022-08-07T02:15:00Z]" in caplog.text
+    assert '"wert"' not in caplog.text
+
+
+@pytest.mark.usefixtures("requests_mock")
+def test_api_payload_not_serialized_without_debug(requests_mock: Mocker, caplog, mocker):
+    caplog.set_level(logging.INFO)
+    expect_login(requests_mock)
+    expect_zaehlpunkte(requests_mock, [enabled(zaehlpunkt())])
+    sm = smartmeter().login()
+    format_payload = mocker.spy(sm, "_format_payload")
+    sm.zaehlpunkte()
+    format_payload.assert_not_called()
+
+
 @pytest.mark.usefixtures("requests_mock")
 def test_history_wrong_zp(requests_mock: Mocker, caplog):
     caplog.set_level(logging.DEBUG)
@@ -226,6 +405,7 @@ def test_history_wrong_zp(requests_mock: Mocker, caplog):
     assert 'Returned data: ' in caplog.text
     assert 'Returned data does not match given zaehlpunkt!' == str(exc_info.value)
     
+
 @pytest.mark.usefixtures("requests_mock")
 def test_history_invalid_obis_code(requests_mock: Mocker):
     z = zaehlpunkt_response([enabled(zaehlpunkt())])[0]
@@ -238,6 +418,7 @@ def test_history_invalid_obis_code(requests_mock: Mocker):
         smartmeter().login().historical_data()
     assert "No valid OBIS code found. OBIS codes in data: ['9-9:9.9.9']" == str(exc_info.value)
 
+
 @pytest.mark.usefixtures("requests_mock")
 def test_history_multiple_zaehlwerke_one_valid(requests_mock: Mocker):
     z = zaehlpunkt_response([enabled(zaehlpunkt())])[0]
@@ -251,6 +432,7 @@ def test_history_multiple_zaehlwerke_one_valid(requests_mock: Mocker):
     assert 'WH' == hist['einheit']
     assert '1-1:1.8.0' == hist['obisCode']
     
+
 @pytest.mark.usefixtures("requests_mock")
 def test_history_multiple_zaehlwerke_all_valid(requests_mock: Mocker, caplog):
     z = zaehlpunkt_response([enabled(zaehlpunkt())])[0]
@@ -265,6 +447,7 @@ def test_history_multiple_zaehlwerke_all_valid(requests_mock: Mocker, caplog):
     assert '1-1:1.8.0' == hist['obisCode']
     assert "Multiple valid OBIS codes found: ['1-1:1.8.0', '1-1:1.9.0', '1-1:2.8.0']. Using the first one." in caplog.text
 
+
 @pytest.mark.usefixtures("requests_mock")
 def test_history_multiple_zaehlwerke_all_invalid(requests_mock: Mocker, caplog):
     caplog.set_level(logging.DEBUG)
@@ -279,6 +462,7 @@ def test_history_multiple_zaehlwerke_all_invalid(requests_mock: Mocker, caplog):
     assert 'Returned zaehlwerke: ' in caplog.text
     assert "No valid OBIS code found. OBIS codes in data: ['9-9:9.9.9', '9-9:9.9.9', '9-9:9.9.9']" == str(exc_info.value)
     
+
 @pytest.mark.usefixtures("requests_mock")
 def test_history_empty_messwerte(requests_mock: Mocker, caplog):
     caplog.set_level(logging.DEBUG)
@@ -294,6 +478,7 @@ def test_history_empty_messwerte(requests_mock: Mocker, caplog):
     assert '1-1:1.8.0' == hist['obisCode']
     assert "Valid OBIS code '1-1:1.8.0' has empty or missing messwerte." in caplog.text
 
+
 @pytest.mark.usefixtures("requests_mock")
 def test_history_no_zaehlwerke(requests_mock: Mocker, caplog):
     caplog.set_level(logging.DEBUG)
@@ -308,6 +493,7 @@ def test_history_no_zaehlwerke(requests_mock: Mocker, caplog):
     assert 'Returned data: ' in caplog.text
     assert 'Returned data does not contain any zaehlwerke or is empty.' == str(exc_info.value)
 
+
 @pytest.mark.usefixtures("requests_mock")
 def test_history_empty_zaehlwerke(requests_mock: Mocker, caplog):
     caplog.set_level(logging.DEBUG)
@@ -322,6 +508,7 @@ def test_history_empty_zaehlwerke(requests_mock: Mocker, caplog):
     assert 'Returned data: ' in caplog.text
     assert 'Returned data does not contain any zaehlwerke or is empty.' == str(exc_info.value)
     
+
 @pytest.mark.usefixtures("requests_mock")
 def test_history_no_obis_code(requests_mock: Mocker, caplog):
     caplog.set_level(logging.DEBUG)
@@ -336,6 +523,7 @@ def test_history_no_obis_code(requests_mock: Mocker, caplog):
     assert 'Returned zaehlwerke: ' in caplog.text
     assert 'No OBIS codes found in the provided data.' == str(exc_info.value)
 
+
 @pytest.mark.usefixtures("requests_mock")
 def test_bewegungsdaten_quarterly_hour_consuming(requests_mock: Mocker):
     z = zaehlpunkt_response([enabled(zaehlpunkt())])[0]
@@ -350,6 +538,24 @@ def test_bewegungsdaten_quarterly_hour_consuming(requests_mock: Mocker):
 
     assert 10 == len(hist['values'])
 
+
+@pytest.mark.usefixtures("requests_mock")
+def test_bewegungsdaten_aggregated_per_hour(requests_mock: Mocker):
+    z = zaehlpunkt_response([enabled(zaehlpunkt())])[0]
+    dateFrom = dt.datetime(2023, 4, 21, 00, 00, 00, 0)
+    dateTo = dt.datetime(2023, 5, 1, 23, 59, 59, 999999)
+    zpn = z["zaehlpunkte"][0]['zaehlpunktnummer']
+    expect_login(requests_mock)
+    expect_bewegungsdaten(requests_mock, z["geschaeftspartner"], zpn, dateFrom, dateTo, const.ValueType.QUARTER_HOUR,
+                          values_count=COUNT, aggregat=const.AggregatType.SUM_PER_HOUR)
+    expect_zaehlpunkte(requests_mock, [enabled(zaehlpunkt())])
+
+    hist = smartmeter().login().bewegungsdaten(None, dateFrom, dateTo, aggregat=const.AggregatType.SUM_PER_HOUR)
+
+    assert "SUM_PER_HOUR" == hist['descriptor']['aggregat']
+    assert all(value['zeitpunktVon'][14:16] == "00" for value in hist['values'])
+
+
 @pytest.mark.usefixtures("requests_mock")
 def test_bewegungsdaten_daily_consuming(requests_mock: Mocker):
     z = zaehlpunkt_response([enabled(zaehlpunkt())])[0]
@@ -364,6 +570,7 @@ def test_bewegungsdaten_daily_consuming(requests_mock: Mocker):
 
     assert 10 == len(hist['values'])
   
+
 @pytest.mark.usefixtures("requests_mock")
 def test_bewegungsdaten_quarterly_hour_feeding(requests_mock: Mocker):
     z = zaehlpunkt_response([enabled(zaehlpunkt_feeding())])[0]
@@ -378,6 +585,7 @@ def test_bewegungsdaten_quarterly_hour_feeding(requests_mock: Mocker):
 
     assert 10 == len(hist['values'])
     
+
 @pytest.mark.usefixtures("requests_mock")
 def test_bewegungsdaten_daily_feeding(requests_mock: Mocker):
     z = zaehlpunkt_response([enabled(zaehlpunkt_feeding())])[0]
@@ -392,6 +600,7 @@ def test_bewegungsdaten_daily_feeding(requests_mock: Mocker):
 
     assert 10 == len(hist['values'])
     
+
 @pytest.mark.usefixtures("requests_mock")
 def test_bewegungsdaten_no_dates_given(requests_mock: Mocker):
     z = zaehlpunkt_response([enabled(zaehlpunkt())])[0]
@@ -406,6 +615,7 @@ def test_bewegungsdaten_no_dates_given(requests_mock: Mocker):
 
     assert 10 == len(hist['values'])
     
+
 @pytest.mark.usefixtures("requests_mock")
 def test_bewegungsdaten_wrong_zp(requests_mock: Mocker):
     z = zaehlpunkt_response([enabled(zaehlpunkt())])[0]
@@ -435,3 +645,409 @@ def test_verbrauch_raw(requests_mock: Mocker):
     verbrauch = smartmeter().login().verbrauch(customer_id, zp, dateFrom)
 
     assert 7 == len(verbrauch['values'])
+
+
+def test_json_backend_round_trip():
+    response = bewegungsdaten_response("123456789", "AT000000001234567890", values_count=3)
+
+    assert json_backend.loads(json_backend.dumps(response).encode()) == response
+    assert json_backend.loads(json_backend.dumps(response, indent=True)) == response
+    # out of range for orjson, encoded by the stdlib fallback
+    assert json_backend.dumps({"wert": 2 ** 70}) == '{"wert": 1180591620717411303424}'
+
+
+def test_reset_keeps_the_session():
+    sm = smartmeter()
+    session = sm.session
+    session.cookies.set("AUTH_SESSION_ID", "stale")
+
+    sm.reset()
+
+    assert sm.session is session
+    assert len(session.cookies) == 0
+
+
+def test_retry_backoff_is_jittered_and_retry_after_capped():
+    history = tuple(RequestHistory("GET", "/", None, 503, None) for _ in range(3))
+    retry = JitteredRetry(total=5, backoff_factor=1, history=history)
+
+    assert all(2 <= retry.get_backoff_time() <= 4 for _ in range(20))
+    assert retry.get_retry_after(HTTPResponse(status=429, headers={"Retry-After": "3600"})) == \
+        const.HTTP_MAX_RETRY_AFTER_SECONDS
+    assert retry.is_retry("GET", 502, has_retry_after=True)
+
+
+ZAEHLPUNKTE_URL = parse.urljoin(API_URL_B2C, 'zaehlpunkte')
+
+
+@pytest.fixture
+def retry_delays(mocker) -> list[float]:
+    """Delays the async client waited before retries, without waiting for them."""
+    clock = FakeClock()
+    mocker.patch("wnsm.api.async_client.asyncio.sleep", side_effect=clock.sleep)
+    return clock.wake_ups
+
+
+def _async_login(**kwargs):
+    sm = async_smartmeter_client(**kwargs)
+    asyncio.run(sm.login())
+    return sm
+
+
+@pytest.mark.usefixtures("requests_mock")
+def test_async_successful_login(requests_mock: Mocker):
+    expect_login(requests_mock)
+
+    sm = _async_login()
+
+    assert sm.is_logged_in()
+    assert ['authorization_code'] == _token_grant_types(requests_mock)
+    assert sm._api_gateway_token is not None and sm._api_gateway_b2b_token is not None
+
+
+def test_async_client_uses_the_given_session():
+    sm = async_smartmeter_client()
+    session = sm.session
+
+    sm.reset()
+
+    assert sm.session is session
+    assert 1 == session.cookie_jar.cleared
+
+
+@pytest.mark.usefixtures("requests_mock")
+def test_async_login_failing_on_login_page_load(requests_mock: Mocker):
+    mock_login_page(requests_mock, 404)
+    with pytest.raises(SmartmeterConnectionError) as exc_info:
+        _async_login()
+    assert 'Could not load login page. Error: ' in str(exc_info.value)
+
+
+@pytest.mark.usefixtures("requests_mock")
+def test_async_login_failing_on_timeout_while_login_page_load(requests_mock: Mocker):
+    mock_login_page(requests_mock, None)
+    with pytest.raises(SmartmeterConnectionError) as exc_info:
+        _async_login()
+    assert 'Could not load login page' == str(exc_info.value)
+    assert isinstance(exc_info.value.__cause__, asyncio.TimeoutError)
+
+
+@pytest.mark.usefixtures("requests_mock")
+def test_async_login_failing_on_credentials_login(requests_mock: Mocker):
+    mock_login_page(requests_mock)
+    mock_authenticate(requests_mock, USERNAME, "WrongPassword", status=403)
+    with pytest.raises(SmartmeterLoginError) as exc_info:
+        _async_login(password="WrongPassword")
+    assert 'Login failed. Check username/password.' in str(exc_info.value)
+
+
+@pytest.mark.usefixtures("requests_mock")
+def test_async_login_failing_on_connection_error_while_credentials_login(requests_mock: Mocker):
+    mock_login_page(requests_mock)
+    requests_mock.post("https://log.wien/auth/realms/logwien/login-actions/authenticate",
+                       exc=aiohttp.ClientConnectionError("Connection reset by peer"))
+    with pytest.raises(SmartmeterConnectionError) as exc_info:
+        _async_login()
+    assert 'Could not login with credentials' == str(exc_info.value)
+
+
+@pytest.mark.usefixtures("requests_mock")
+def test_async_login_failing_on_token_status(requests_mock: Mocker):
+    mock_login_page(requests_mock)
+    mock_authenticate(requests_mock, USERNAME, PASSWORD)
+    mock_token(requests_mock, status=404)
+    with pytest.raises(SmartmeterConnectionError) as exc_info:
+        _async_login()
+    assert 'Could not obtain access token: ' in str(exc_info.value)
+
+
+@pytest.mark.usefixtures("requests_mock")
+def test_async_login_failing_on_non_bearer_token(requests_mock: Mocker):
+    mock_login_page(requests_mock)
+    mock_authenticate(requests_mock, USERNAME, PASSWORD)
+    mock_token(requests_mock, token_type="IAmNotABearerToken")
+    with pytest.raises(SmartmeterLoginError) as exc_info:
+        _async_login()
+    assert 'Bearer token required' in str(exc_info.value)
+
+
+@pytest.mark.usefixtures("requests_mock")
+def test_async_login_failing_on_invalid_api_key_config(requests_mock: Mocker):
+    mock_login_page(requests_mock)
+    mock_authenticate(requests_mock, USERNAME, PASSWORD)
+    mock_token(requests_mock)
+    requests_mock.get(const.API_CONFIG_URL, text="<html>maintenance</html>")
+    with pytest.raises(SmartmeterConnectionError) as exc_info:
+        _async_login()
+    assert 'Could not obtain API key' == str(exc_info.value)
+
+
+@pytest.mark.usefixtures("requests_mock")
+def test_async_login_refreshes_expired_access_token(requests_mock: Mocker):
+    expect_login(requests_mock)
+    mock_refresh_token(requests_mock)
+    sm = _async_login()
+    _expire_access_token(sm)
+    requests_mock.reset_mock()
+
+    asyncio.run(sm.login())
+
+    assert ['refresh_token'] == _token_grant_types(requests_mock)
+    assert 1 == len(requests_mock.request_history)
+    assert sm.is_logged_in()
+
+
+@pytest.mark.usefixtures("requests_mock")
+def test_async_login_falls_back_to_credentials_if_refresh_fails(requests_mock: Mocker, mocker):
+    expect_login(requests_mock)
+    mock_refresh_token(requests_mock, status=None)
+    sm = _async_login()
+    mocker.patch.object(sm, "generate_code_verifier", return_value=CODE_VERIFIER)
+    _expire_access_token(sm)
+    requests_mock.reset_mock()
+
+    asyncio.run(sm.login())
+
+    assert ['refresh_token', 'authorization_code'] == _token_grant_types(requests_mock)
+    assert 1 == sm.session.cookie_jar.cleared
+    assert sm.is_logged_in()
+
+
+@pytest.mark.usefixtures("requests_mock")
+def test_async_zaehlpunkte(requests_mock: Mocker):
+    expect_login(requests_mock)
+    expect_zaehlpunkte(requests_mock, [enabled(zaehlpunkt()), disabled(zaehlpunkt())])
+    sm = _async_login()
+
+    zps = asyncio.run(sm.zaehlpunkte())
+
+    assert 2 == len(zps[0]['zaehlpunkte'])
+    assert requests_mock.last_request.headers["X-Gateway-APIKey"] == sm._api_gateway_token
+
+
+@pytest.mark.usefixtures("requests_mock")
+def test_async_call_api_returns_none_for_empty_body(requests_mock: Mocker):
+    expect_login(requests_mock)
+    sm = _async_login()
+    requests_mock.get(ZAEHLPUNKTE_URL, text=" ")
+
+    assert asyncio.run(sm.zaehlpunkte()) is None
+
+
+@pytest.mark.parametrize("exception", [
+    aiohttp.ClientPayloadError("connection closed"),
+    aiohttp.ServerDisconnectedError(),
+    asyncio.TimeoutError(),
+])
+@pytest.mark.usefixtures("requests_mock", "retry_delays")
+def test_async_call_api_raises_connection_error(requests_mock: Mocker, exception):
+    expect_login(requests_mock)
+    sm = _async_login()
+    requests_mock.get(ZAEHLPUNKTE_URL, exc=exception)
+
+    with pytest.raises(SmartmeterConnectionError) as exc_info:
+        asyncio.run(sm.zaehlpunkte())
+    assert str(exc_info.value).startswith('Could not call ')
+    assert exc_info.value.__cause__ is exception
+
+
+@pytest.mark.usefixtures("requests_mock")
+def test_async_bewegungsdaten(requests_mock: Mocker):
+    z = zaehlpunkt_response([enabled(zaehlpunkt())])[0]
+    date_from = dt.datetime(2023, 4, 21, 00, 00, 00, 0)
+    date_to = dt.datetime(2023, 5, 1, 23, 59, 59, 999999)
+    zpn = z["zaehlpunkte"][0]['zaehlpunktnummer']
+    expect_login(requests_mock)
+    expect_bewegungsdaten(requests_mock, z["geschaeftspartner"], zpn, date_from, date_to, values_count=COUNT)
+    expect_zaehlpunkte(requests_mock, [enabled(zaehlpunkt())])
+    sm = _async_login()
+
+    data = asyncio.run(sm.bewegungsdaten(None, date_from, date_to))
+
+    assert COUNT == len(data['values'])
+    assert zpn == data['descriptor']['zaehlpunktnummer']
+
+
+@pytest.mark.usefixtures("requests_mock")
+def test_async_bewegungsdaten_wrong_zp(requests_mock: Mocker):
+    z = zaehlpunkt_response([enabled(zaehlpunkt())])[0]
+    date_from = dt.datetime(2023, 4, 21, 00, 00, 00, 0)
+    date_to = dt.datetime(2023, 5, 1, 23, 59, 59, 999999)
+    zpn = z["zaehlpunkte"][0]['zaehlpunktnummer']
+    expect_login(requests_mock)
+    expect_bewegungsdaten(requests_mock, z["geschaeftspartner"], zpn, date_from, date_to, wrong_zp=True,
+                          values_count=COUNT)
+    expect_zaehlpunkte(requests_mock, [enabled(zaehlpunkt())])
+    sm = _async_login()
+
+    with pytest.raises(SmartmeterQueryError) as exc_info:
+        asyncio.run(sm.bewegungsdaten(None, date_from, date_to))
+    assert 'Returned data does not match given zaehlpunkt!' == str(exc_info.value)
+
+
+def _async_stream(sm, *args):
+    async def collect():
+        return [member async for member in sm.bewegungsdaten_stream(*args)]
+
+    return asyncio.run(collect())
+
+
+@pytest.mark.usefixtures("requests_mock")
+def test_async_bewegungsdaten_stream(requests_mock: Mocker):
+    z = zaehlpunkt_response([enabled(zaehlpunkt())])[0]
+    date_from = dt.datetime(2023, 4, 21, 00, 00, 00, 0)
+    date_to = dt.datetime(2023, 5, 1, 23, 59, 59, 999999)
+    zpn = z["zaehlpunkte"][0]['zaehlpunktnummer']
+    expect_login(requests_mock)
+    expect_bewegungsdaten(requests_mock, z["geschaeftspartner"], zpn, date_from, date_to, values_count=COUNT)
+    expect_zaehlpunkte(requests_mock, [enabled(zaehlpunkt())])
+    sm = _async_login()
+
+    members = _async_stream(sm, None, date_from, date_to)
+
+    assert COUNT == len([value for key, value in members if key == 'values'])
+    assert zpn == dict(member for member in members if member[0] != 'values')['descriptor']['zaehlpunktnummer']
+
+
+@pytest.mark.usefixtures("requests_mock")
+def test_async_bewegungsdaten_stream_wrong_zp(requests_mock: Mocker):
+    z = zaehlpunkt_response([enabled(zaehlpunkt())])[0]
+    date_from = dt.datetime(2023, 4, 21, 00, 00, 00, 0)
+    date_to = dt.datetime(2023, 5, 1, 23, 59, 59, 999999)
+    zpn = z["zaehlpunkte"][0]['zaehlpunktnummer']
+    expect_login(requests_mock)
+    expect_bewegungsdaten(requests_mock, z["geschaeftspartner"], zpn, date_from, date_to, wrong_zp=True,
+                          values_count=COUNT)
+    expect_zaehlpunkte(requests_mock, [enabled(zaehlpunkt())])
+    sm = _async_login()
+
+    with pytest.raises(SmartmeterQueryError) as exc_info:
+        _async_stream(sm, None, date_from, date_to)
+    assert 'Returned data does not match given zaehlpunkt!' == str(exc_info.value)
+
+
+@pytest.mark.parametrize("response,error,code", [
+    ({"status_code": 401, "text": "Unauthorized"}, SmartmeterQueryError, 401),
+    ({"status_code": 500, "text": "Internal Server Error"}, SmartmeterQueryError, 500),
+    # truncated response
+    ({"text": '{"values": [{"wert": 1.5}, {"we'}, SmartmeterQueryError, None),
+    ({"exc": aiohttp.ClientConnectionError}, SmartmeterConnectionError, None),
+], ids=["unauthorized", "server_error", "truncated", "connection_error"])
+@pytest.mark.usefixtures("retry_delays")
+def test_async_bewegungsdaten_stream_errors(requests_mock: Mocker, response, error, code):
+    z = zaehlpunkt_response([enabled(zaehlpunkt())])[0]
+    date_from = dt.datetime(2023, 4, 21, 00, 00, 00, 0)
+    date_to = dt.datetime(2023, 5, 1, 23, 59, 59, 999999)
+    zpn = z["zaehlpunkte"][0]['zaehlpunktnummer']
+    expect_login(requests_mock)
+    url = expect_bewegungsdaten(requests_mock, z["geschaeftspartner"], zpn, date_from, date_to)
+    requests_mock.get(url, **response)
+    expect_zaehlpunkte(requests_mock, [enabled(zaehlpunkt())])
+    sm = _async_login()
+
+    with pytest.raises(error) as exc_info:
+        _async_stream(sm, None, date_from, date_to)
+    if code is not None:
+        assert code == exc_info.value.code
+
+
+def test_async_call_api_retries_unavailable_service(requests_mock: Mocker, retry_delays):
+    expect_login(requests_mock)
+    sm = _async_login()
+    requests_mock.get(ZAEHLPUNKTE_URL, [
+        {"status_code": 503, "headers": {"Retry-After": "3600"}},
+        {"status_code": 502},
+        {"json": []},
+    ])
+
+    assert asyncio.run(sm.zaehlpunkte()) == []
+    # Retry-After is capped, without it the backoff is jittered
+    assert retry_delays[0] == const.HTTP_MAX_RETRY_AFTER_SECONDS
+    assert 0.5 * const.HTTP_RETRY_BACKOFF_FACTOR * 2 <= retry_delays[1] <= const.HTTP_RETRY_BACKOFF_FACTOR * 2
+
+
+def test_async_call_api_gives_up_after_retries(requests_mock: Mocker, retry_delays):
+    expect_login(requests_mock)
+    sm = _async_login()
+    matcher = requests_mock.get(ZAEHLPUNKTE_URL, exc=aiohttp.ServerDisconnectedError())
+
+    with pytest.raises(SmartmeterConnectionError):
+        asyncio.run(sm.zaehlpunkte())
+    assert matcher.call_count == const.HTTP_RETRIES + 1
+    assert len(retry_delays) == const.HTTP_RETRIES
+
+
+@pytest.mark.parametrize("method,status_code", [("GET", 401), ("POST", 503)])
+def test_async_call_api_does_not_retry(requests_mock: Mocker, retry_delays, method, status_code):
+    expect_login(requests_mock)
+    sm = _async_login()
+    matcher = requests_mock.register_uri(method, ZAEHLPUNKTE_URL, status_code=status_code, text="")
+
+    response = asyncio.run(sm._call_api("zaehlpunkte", API_URL_B2C, method=method, return_response=True))
+
+    assert response.status == status_code
+    assert matcher.call_count == 1
+    assert retry_delays == []
+
+
+def test_parse_retry_after():
+    in_a_minute = email.utils.format_datetime(dt.datetime.now(dt.timezone.utc) + dt.timedelta(minutes=1), usegmt=True)
+
+    assert _parse_retry_after("120") == 120.0
+    assert 50 < _parse_retry_after(in_a_minute) <= 60
+    assert _parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert _parse_retry_after("soon") is None
+    assert _parse_retry_after(None) is None
+
+
+def test_async_bewegungsdaten_stream_retries_unavailable_service(requests_mock: Mocker, retry_delays):
+    z = zaehlpunkt_response([enabled(zaehlpunkt())])[0]
+    date_from = dt.datetime(2023, 4, 21, 00, 00, 00, 0)
+    date_to = dt.datetime(2023, 5, 1, 23, 59, 59, 999999)
+    zpn = z["zaehlpunkte"][0]['zaehlpunktnummer']
+    expect_login(requests_mock)
+    url = expect_bewegungsdaten(requests_mock, z["geschaeftspartner"], zpn, date_from, date_to, values_count=COUNT)
+    response = bewegungsdaten_response(z["geschaeftspartner"], zpn, values_count=COUNT)
+    requests_mock.get(url, [{"status_code": 503, "headers": {"Retry-After": "2"}}, {"json": response}])
+    expect_zaehlpunkte(requests_mock, [enabled(zaehlpunkt())])
+    sm = _async_login()
+
+    members = _async_stream(sm, None, date_from, date_to)
+
+    assert COUNT == len([value for key, value in members if key == 'values'])
+    assert retry_delays == [2.0]
+
+
+class FakeClock:
+    """Stands in for loop.time and asyncio.sleep, sleeping only records when the caller would wake up."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.wake_ups = []
+
+    def time(self):
+        return self.now
+
+    async def sleep(self, delay):
+        self.wake_ups.append(self.now + delay)
+
+
+def test_rate_limiter_spaces_requests_per_host(mocker):
+    clock = FakeClock()
+    mocker.patch("wnsm.api.async_client.asyncio.sleep", side_effect=clock.sleep)
+    limiter = HostRateLimiter(requests_per_second=2)
+
+    async def run():
+        asyncio.get_running_loop().time = clock.time
+        await asyncio.gather(*(limiter.acquire(ZAEHLPUNKTE_URL) for _ in range(4)))
+        # another host has its own slots
+        await limiter.acquire(const.API_URL_ALT + "user/messwerte/bewegungsdaten")
+        assert [0.5, 1.0, 1.5] == clock.wake_ups
+        # once the reserved slots have passed, requests start right away
+        clock.now = 10.0
+        await limiter.acquire(ZAEHLPUNKTE_URL)
+        await limiter.acquire(ZAEHLPUNKTE_URL)
+
+    asyncio.run(run())
+
+    assert [0.5, 1.0, 1.5, 10.5] == clock.wake_ups
@@ -0,0 +1,287 @@
+"""AsyncSmartmeter tests"""
+import asyncio
+
+import pytest
+
+from wnsm.AsyncSmartmeter import AsyncSmartmeter
+from wnsm.api.errors import SmartmeterConnectionError, SmartmeterQueryError
+from wnsm.const import REQUEST_RESULT_TTL_SECONDS
+
+ZAEHLPUNKTE = [f"AT00100000000000000010000{i:08d}" for i in range(6)]
+
+
+class FakeSmartmeter:
+    """The API accepts only the current token, which login fetches if the local one expired."""
+
+    def __init__(self, expired: bool = False, unauthorized_response: bool = False):
+        self.token = "old"
+        self.server_token = "new"
+        self.expired = expired
+        self.unauthorized_response = unauthorized_response
+        self.logins = 0
+        self.requests = []
+
+    def is_logged_in(self):
+        return not self.expired
+
+    def expire_access_token(self):
+        self.expired = True
+
+    async def login(self):
+        self.logins += 1
+        await asyncio.sleep(0)
+        if self.expired:
+            self.token = self.server_token
+            self.expired = False
+        return self
+
+    async def verbrauch(self, zaehlpunkt):
+        token = self.token
+        await asyncio.sleep(0)
+        self.requests.append((zaehlpunkt, token))
+        if token != self.server_token:
+            if self.unauthorized_response:
+                return {"Exception": "401 Unauthorized"}
+            raise SmartmeterConnectionError("token expired")
+        return {"zaehlpunkt": zaehlpunkt}
+
+
+def test_gather_zaehlpunkte_bounds_concurrency():
+    async_smartmeter = AsyncSmartmeter(None, max_concurrent_requests=2)
+    running = set()
+    max_running = 0
+
+    async def fetch(zaehlpunkt):
+        nonlocal max_running
+        running.add(zaehlpunkt)
+        max_running = max(max_running, len(running))
+        for _ in range(3):
+            await asyncio.sleep(0)
+        running.discard(zaehlpunkt)
+        if zaehlpunkt == ZAEHLPUNKTE[3]:
+            raise RuntimeError("no data")
+        return zaehlpunkt.lower()
+
+    results = asyncio.run(async_smartmeter.gather_zaehlpunkte(ZAEHLPUNKTE, fetch))
+
+    assert 2 == max_running
+    assert list(results) == ZAEHLPUNKTE
+    # a failing Zählpunkt does not affect the others
+    assert isinstance(results.pop(ZAEHLPUNKTE[3]), RuntimeError)
+    assert all(result == zaehlpunkt.lower() for zaehlpunkt, result in results.items())
+
+
+@pytest.mark.parametrize("smartmeter", [
+    # the token expired locally while the requests were sent
+    FakeSmartmeter(expired=True),
+    # the API rejects a token that is still valid locally, it has to be renewed with force=True
+    FakeSmartmeter(unauthorized_response=True),
+], ids=["connection_error", "unauthorized"])
+def test_concurrent_failing_calls_log_in_once(smartmeter):
+    async_smartmeter = AsyncSmartmeter(None, smartmeter)
+
+    async def call_all():
+        return await asyncio.gather(
+            *(async_smartmeter._call_with_reauth(smartmeter.verbrauch, zaehlpunkt) for zaehlpunkt in ZAEHLPUNKTE)
+        )
+
+    results = asyncio.run(call_all())
+
+    assert results == [{"zaehlpunkt": zaehlpunkt} for zaehlpunkt in ZAEHLPUNKTE]
+    assert smartmeter.logins == 1
+    assert async_smartmeter._auth_generation == 1
+    # every call is retried once, with the renewed token
+    assert sorted(smartmeter.requests) == sorted(
+        [(zaehlpunkt, "old") for zaehlpunkt in ZAEHLPUNKTE] + [(zaehlpunkt, "new") for zaehlpunkt in ZAEHLPUNKTE]
+    )
+
+
+class SlowSmartmeter:
+    """Holds every request until released, counting the requests per endpoint."""
+
+    def __init__(self):
+        self.released = asyncio.Event()
+        self.requests = {"contracts": 0, "bewegungsdaten": 0}
+        self.error = None
+
+    async def contracts(self):
+        self.requests["contracts"] += 1
+        await self.released.wait()
+        if self.error is not None:
+            raise self.error
+        return [{"zaehlpunkte": []}]
+
+    async def bewegungsdaten(self, zaehlpunkt):
+        self.requests["bewegungsdaten"] += 1
+        await self.released.wait()
+        return {"values": []}
+
+
+async def _gather_released(smartmeter, *calls):
+    tasks = [asyncio.ensure_future(call) for call in calls]
+    await asyncio.sleep(0)
+    smartmeter.released.set()
+    return await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def test_identical_calls_in_flight_share_one_request():
+    smartmeter = SlowSmartmeter()
+    async_smartmeter = AsyncSmartmeter(None, smartmeter)
+
+    results = asyncio.run(_gather_released(
+        smartmeter, *(async_smartmeter._call_with_reauth(smartmeter.contracts) for _ in range(3))
+    ))
+
+    assert smartmeter.requests["contracts"] == 1
+    assert results[0] == results[1] == results[2] == [{"zaehlpunkte": []}]
+
+
+def test_bewegungsdaten_are_neither_coalesced_nor_kept():
+    smartmeter = SlowSmartmeter()
+    async_smartmeter = AsyncSmartmeter(None, smartmeter)
+
+    asyncio.run(_gather_released(
+        smartmeter, *(async_smartmeter._call_with_reauth(smartmeter.bewegungsdaten, "zp") for _ in range(3))
+    ))
+
+    assert smartmeter.requests["bewegungsdaten"] == 3
+    assert async_smartmeter._recent_results == {}
+
+
+def test_results_are_kept_for_the_ttl(mocker):
+    smartmeter = SlowSmartmeter()
+    smartmeter.released.set()
+    async_smartmeter = AsyncSmartmeter(None, smartmeter)
+    monotonic = mocker.patch("wnsm.AsyncSmartmeter.time.monotonic", return_value=100.0)
+
+    async def call():
+        return await async_smartmeter._call_with_reauth(smartmeter.contracts)
+
+    first = asyncio.run(call())
+    monotonic.return_value = 100.0 + REQUEST_RESULT_TTL_SECONDS - 1
+    assert asyncio.run(call()) == first
+    assert smartmeter.requests["contracts"] == 1
+
+    monotonic.return_value = 100.0 + REQUEST_RESULT_TTL_SECONDS + 1
+    asyncio.run(call())
+    assert smartmeter.requests["contracts"] == 2
+
+
+def test_changing_a_shared_result_does_not_affect_other_callers():
+    smartmeter = SlowSmartmeter()
+    async_smartmeter = AsyncSmartmeter(None, smartmeter)
+
+    async def test():
+        in_flight = await _gather_released(
+            smartmeter, *(async_smartmeter._call_with_reauth(smartmeter.contracts) for _ in range(2))
+        )
+        in_flight[0][0]["zaehlpunkte"].append({"zaehlpunktnummer": "changed"})
+        kept = await async_smartmeter._call_with_reauth(smartmeter.contracts)
+        kept.clear()
+        return in_flight[1], await async_smartmeter._call_with_reauth(smartmeter.contracts)
+
+    other, later = asyncio.run(test())
+
+    # one request, every caller got the response as sent
+    assert smartmeter.requests["contracts"] == 1
+    assert other == later == [{"zaehlpunkte": []}]
+
+
+def test_failure_is_raised_to_every_waiter_and_not_kept():
+    smartmeter = SlowSmartmeter()
+    smartmeter.error = RuntimeError("API unavailable")
+    async_smartmeter = AsyncSmartmeter(None, smartmeter)
+
+    results = asyncio.run(_gather_released(
+        smartmeter, *(async_smartmeter._call_with_reauth(smartmeter.contracts) for _ in range(3))
+    ))
+
+    assert smartmeter.requests["contracts"] == 1
+    assert all(result is smartmeter.error for result in results)
+    assert async_smartmeter._recent_results == {}
+    assert async_smartmeter._in_flight == {}
+
+    smartmeter.error = None
+    assert asyncio.run(async_smartmeter._call_with_reauth(smartmeter.contracts)) == [{"zaehlpunkte": []}]
+    assert smartmeter.requests["contracts"] == 2
+
+
+DESCRIPTOR = ("descriptor", {"zaehlpunktnummer": ZAEHLPUNKTE[0], "aggregat": "NONE", "einheit": "KWH"})
+VALUES = [
+    ("values", {"zeitpunktVon": "2024-01-01T00:00:00Z", "wert": 0.25, "geschaetzt": False}),
+    ("values", {"zeitpunktVon": "2024-01-01T00:15:00Z", "wert": 0.5, "geschaetzt": True}),
+]
+
+
+class StreamingSmartmeter(FakeSmartmeter):
+    """Streams the given members, or fails like the API with a token it does not accept."""
+
+    def __init__(self, members, error=None, **kwargs):
+        super().__init__(**kwargs)
+        self.members = members
+        self.error = error
+        if not (self.expired or self.unauthorized_response):
+            self.token = self.server_token
+
+    async def bewegungsdaten_stream(self, zaehlpunkt, *args):
+        self.requests.append((zaehlpunkt, self.token))
+        if self.error is not None:
+            raise self.error
+        if self.token != self.server_token:
+            if self.unauthorized_response:
+                raise SmartmeterQueryError("Could not call bewegungsdaten", 401, "Unauthorized")
+            raise SmartmeterConnectionError("token expired")
+        for member in self.members:
+            await asyncio.sleep(0)
+            yield member
+
+
+def _bewegungsdaten_series(smartmeter):
+    return asyncio.run(AsyncSmartmeter(None, smartmeter, stream_responses=True).get_bewegungsdaten_series(ZAEHLPUNKTE[0]))
+
+
+def test_streamed_bewegungsdaten_series():
+    meta, series = _bewegungsdaten_series(StreamingSmartmeter([DESCRIPTOR] + VALUES + [("unitOfMeasurement", "KWH")]))
+
+    assert meta["zaehlpunkt"] == ZAEHLPUNKTE[0]
+    assert meta["unitOfMeasurement"] == "KWH"
+    assert list(series) == [(1704067200, 0.25), (1704068100, 0.5)]
+    assert [series.is_estimated(i) for i in range(len(series))] == [False, True]
+
+
+@pytest.mark.parametrize("members,length", [
+    ([DESCRIPTOR], None),
+    ([DESCRIPTOR, ("values", None)], None),
+    ([DESCRIPTOR, ("values", [])], 0),
+])
+def test_streamed_series_without_values(members, length):
+    _, series = _bewegungsdaten_series(StreamingSmartmeter(members))
+
+    assert (None if series is None else len(series)) == length
+
+
+@pytest.mark.parametrize("smartmeter", [
+    StreamingSmartmeter([DESCRIPTOR] + VALUES, expired=True),
+    StreamingSmartmeter([DESCRIPTOR] + VALUES, unauthorized_response=True),
+], ids=["connection_error", "unauthorized"])
+def test_streamed_bewegungsdaten_are_retried_once_after_login(smartmeter):
+    _, series = _bewegungsdaten_series(smartmeter)
+
+    assert len(series) == 2
+    assert smartmeter.logins == 1
+    assert smartmeter.requests == [(ZAEHLPUNKTE[0], "old"), (ZAEHLPUNKTE[0], "new")]
+
+
+@pytest.mark.parametrize("error", [
+    SmartmeterQueryError("Could not call bewegungsdaten", 500, "Internal Server Error"),
+    SmartmeterConnectionError("Could not call bewegungsdaten"),
+])
+def test_streamed_bewegungsdaten_are_not_retried_twice(error):
+    smartmeter = StreamingSmartmeter([DESCRIPTOR] + VALUES, error=error)
+
+    with pytest.raises(type(error)):
+        _bewegungsdaten_series(smartmeter)
+
+    # only the connection error is retried, once
+    assert len(smartmeter.requests) == (2 if isinstance(error, SmartmeterConnectionError) else 1)
+    assert smartmeter.logins == (1 if isinstance(error, SmartmeterConnectionError) else 0)
@@ -0,0 +1,102 @@
+"""Coordinator tests"""
+from datetime import timedelta
+
+from it import run_with_hass
+from wnsm.coordinator import WNSMDataUpdateCoordinator, ZaehlpunktData
+from wnsm.day_reading_date_sensor import WNSMDayReadingDateSensor
+from wnsm.meter_read_reading_date_sensor import WNSMMeterReadReadingDateSensor
+
+ZAEHLPUNKTE = ["AT0010000000000000001000011111111", "AT0010000000000000001000011111112"]
+
+
+class FakeAsyncSmartmeter:
+    """Counts update cycles, every Zählpunkt reads as of the cycle's date."""
+
+    def __init__(self):
+        self.logins = 0
+        self.fetches = []
+
+    async def login(self):
+        self.logins += 1
+
+    async def gather_zaehlpunkte(self, zaehlpunkte, fetch):
+        self.fetches.append(list(zaehlpunkte))
+        reading_date = f"2024-01-0{len(self.fetches)}T00:00:00+00:00"
+        return {
+            zaehlpunkt: ZaehlpunktData(
+                zaehlpunkt_response={},
+                active=True,
+                meter_reading=len(self.fetches),
+                meter_read_attributes={"reading_date": reading_date},
+                day_messwerte={"unitOfMeasurement": "WH", "values": [{"zeitVon": reading_date, "messwert": 1000}]},
+            )
+            for zaehlpunkt in zaehlpunkte
+        }
+
+
+def test_coordinator_is_shared_by_all_sensors(tmp_path):
+    async def test(hass):
+        async_smartmeter = FakeAsyncSmartmeter()
+        coordinator = WNSMDataUpdateCoordinator(hass, async_smartmeter, ZAEHLPUNKTE, timedelta(hours=6))
+        sensors = []
+        for zaehlpunkt in ZAEHLPUNKTE:
+            sensors += [
+                WNSMDayReadingDateSensor(coordinator, zaehlpunkt),
+                WNSMMeterReadReadingDateSensor(coordinator, zaehlpunkt),
+            ]
+        for i, sensor in enumerate(sensors):
+            sensor.hass = hass
+            sensor.entity_id = f"sensor.wnsm_{i}"
+            await sensor.async_added_to_hass()
+
+        assert all(sensor.coordinator is coordinator for sensor in sensors)
+        assert not any(sensor.available for sensor in sensors)
+
+        await coordinator.async_refresh()
+        first = [sensor.native_value for sensor in sensors]
+        await coordinator.async_refresh()
+
+        # one login and one fetch of all Zählpunkte per cycle, whatever the number of sensors
+        assert async_smartmeter.logins == 2
+        assert async_smartmeter.fetches == [ZAEHLPUNKTE, ZAEHLPUNKTE]
+        assert all(sensor.available for sensor in sensors)
+        assert all(value.day == 1 for value in first)
+        assert all(sensor.native_value.day == 2 for sensor in sensors)
+        assert hass.states.get("sensor.wnsm_1").state == "2024-01-02T00:00:00+00:00"
+
+    run_with_hass(tmp_path, test)
+
+
+def test_statistics_are_imported_within_the_update(tmp_path, mocker):
+    importers = {
+        name: mocker.patch(f"wnsm.coordinator.{name}")
+        for name in ["Importer", "MainDailySnapshotStatisticsImporter", "DayStatisticsImporter"]
+    }
+    importers["Importer"].return_value.async_import_meter_read = mocker.AsyncMock(side_effect=RuntimeError("boom"))
+    importers["MainDailySnapshotStatisticsImporter"].return_value.async_import = mocker.AsyncMock()
+    importers["DayStatisticsImporter"].return_value.async_import_messwerte = mocker.AsyncMock()
+
+    async def test(hass):
+        coordinator = WNSMDataUpdateCoordinator(
+            hass, FakeAsyncSmartmeter(), ZAEHLPUNKTE, timedelta(hours=6), enable_day_statistics_import=True
+        )
+        data = ZaehlpunktData(
+            zaehlpunkt_response={},
+            active=True,
+            meter_reading=1234.5,
+            meter_read_attributes={"reading_date": "2024-01-01T00:00:00+00:00"},
+            day_messwerte={"values": []},
+        )
+
+        await coordinator._async_import_statistics(ZAEHLPUNKTE[0], data)
+
+        # a failed import is logged and does not keep the others from running
+        importers["Importer"].return_value.async_import_meter_read.assert_awaited_once_with(
+            "2024-01-01T00:00:00+00:00", 1234.5
+        )
+        importers["MainDailySnapshotStatisticsImporter"].return_value.async_import.assert_awaited_once_with(
+            "2024-01-01T00:00:00+00:00", 1234.5
+        )
+        importers["DayStatisticsImporter"].return_value.async_import_messwerte.assert_awaited_once_with({"values": []})
+
+    run_with_hass(tmp_path, test)
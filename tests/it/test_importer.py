@@ -0,0 +1,534 @@
+"""Importer tests"""
+import datetime as dt
+from collections import defaultdict
+from decimal import Decimal
+
+import pytest
+from homeassistant.util import dt as dt_util
+
+from it import bewegungsdaten, run_with_hass
+from wnsm.AsyncSmartmeter import AsyncSmartmeter
+from wnsm.api.constants import AggregatType, ValueType
+from wnsm.api.errors import SmartmeterConnectionError
+from wnsm.checkpoint_store import BackfillCheckpointStore
+from wnsm.day_statistics_importer import DayStatisticsImporter
+from wnsm.energy import MILLI_WH_PER_KWH, kwh_to_milli_wh, milli_wh_per_unit, milli_wh_to_kwh
+from wnsm.fetch_plan import plan_fetch
+from wnsm.hourly_aggregation import aggregate_hourly_series, cumulative_sums
+from wnsm.importer import Importer
+from wnsm.main_daily_snapshot_statistics_importer import MainDailySnapshotStatisticsImporter
+from wnsm.timeseries import ValueSeries
+from wnsm.watermark_store import IngestWatermarkStore
+
+START = dt.datetime(2024, 1, 1, tzinfo=dt.timezone.utc)
+ZAEHLPUNKT = "AT0010000000000000001000011111111"
+
+
+class FakeLastStatistics:
+    """Records imported statistics instead of writing them to the recorder."""
+
+    def __init__(self, row=None):
+        self.row = row
+        self.reads = 0
+        self.imported = []
+
+    async def async_get(self, statistic_id):
+        self.reads += 1
+        return self.row
+
+    async def async_get_timestamp(self, statistic_id, field):
+        row = await self.async_get(statistic_id)
+        return None if row is None else row[field]
+
+    def add_external_statistics(self, metadata, statistics):
+        self.imported.append((metadata["statistic_id"], statistics))
+
+    def invalidate(self, statistic_id=None):
+        self.row = None
+
+
+class FakeAsyncSmartmeter:
+    """Active Zählpunkt whose bewegungsdaten are answered by the test."""
+
+    stream_responses = False
+
+    def __init__(self, hass, get_bewegungsdaten=None, row=None):
+        self.hass = hass
+        self.last_statistics = FakeLastStatistics(row)
+        self.unsupported_aggregats = set()
+        self._watermarks = IngestWatermarkStore(hass, ZAEHLPUNKT)
+        self._get_bewegungsdaten = get_bewegungsdaten
+        self.logins = 0
+        self.historic_data_queries = []
+
+    def watermarks(self, zaehlpunkt):
+        return self._watermarks
+
+    async def login(self):
+        self.logins += 1
+
+    async def get_historic_data(self, zaehlpunkt, date_from, date_to, granularity):
+        self.historic_data_queries.append((date_from, date_to, granularity))
+        return {}
+
+    async def get_zaehlpunkt(self, zaehlpunkt):
+        return {"active": True}
+
+    @staticmethod
+    def is_active(zaehlpunkt_response):
+        return zaehlpunkt_response["active"]
+
+    async def get_bewegungsdaten(self, zaehlpunkt, start, end, granularity, aggregat):
+        return await self._get_bewegungsdaten(start, end, aggregat)
+
+    async def get_bewegungsdaten_series(self, zaehlpunkt, start, end, granularity, aggregat):
+        """The same answers as streamed by AsyncSmartmeter, only used if stream_responses is set."""
+        response = dict(await self._get_bewegungsdaten(start, end, aggregat))
+        values = response.pop("values", None)
+        series = None
+        if values is not None:
+            series = ValueSeries()
+            for value in values:
+                series.append_value(value, "zeitpunktVon", "wert")
+        return response, series
+
+
+def importer(hass, async_smartmeter=None, backfill_window=dt.timedelta(days=10)):
+    return Importer(
+        hass,
+        async_smartmeter or FakeAsyncSmartmeter(hass),
+        ZAEHLPUNKT,
+        "kWh",
+        ValueType.QUARTER_HOUR,
+        backfill_window,
+    )
+
+
+def record_windows(importer_, fail_after=None):
+    """Replace _import_statistics, which adds 1 kWh per window and records the checkpoint it started from."""
+    windows = []
+
+    async def import_statistics(start, end, total_usage):
+        if len(windows) == fail_after:
+            raise RuntimeError("API unavailable")
+        windows.append((start, end, await importer_.checkpoint_store.async_load()))
+        return total_usage + 1_000_000
+
+    importer_._import_statistics = import_statistics
+    return windows
+
+
+def aggregate_hourly_reference(values, start, factor):
+    """Straightforward hourly sums in Decimal, the oracle of aggregate_hourly_series."""
+    dates = defaultdict(Decimal)
+    last_ts = start
+    for value in values:
+        ts = dt_util.parse_datetime(value.get("zeitpunktVon"))
+        if ts is None or ts < last_ts:
+            continue
+        last_ts = ts
+        if value.get("wert") is not None:
+            dates[ts.replace(minute=0)] += Decimal(value["wert"] * factor)
+    return sorted(dates.items())
+
+
+def _in_milli_wh(hourly):
+    return [(ts, int((usage * 10 ** 6).to_integral_value())) for ts, usage in hourly]
+
+
+def _aggregate_series(values, start, milli_wh_per_unit=10 ** 6):
+    return aggregate_hourly_series(ValueSeries.from_values(values, "zeitpunktVon", "wert"), start, milli_wh_per_unit)
+
+
+@pytest.mark.parametrize("interval,count", [("qh", 4 * 24 * 31), ("h", 24 * 7)])
+@pytest.mark.parametrize("factor", [1e-3, 1.0])
+def test_aggregate_hourly_series_matches_reference(interval, count, factor):
+    values = bewegungsdaten(count=count, timestamp=START.replace(tzinfo=None), interval=interval)
+    # missing values and values without timestamp are skipped
+    values[5]["wert"] = None
+    values[7]["zeitpunktVon"] = "invalid"
+    values[9]["geschaetzt"] = True
+
+    actual = _aggregate_series(values, START, round(factor * 10 ** 6))
+
+    assert actual == _in_milli_wh(aggregate_hourly_reference(values, START, factor))
+    # for hourly values, the hours of the skipped values have no bucket
+    assert len(actual) == (count // 4 if interval == "qh" else count - 2)
+
+
+def test_aggregate_hourly_series_skips_values_out_of_order():
+    values = bewegungsdaten(count=8, timestamp=START.replace(tzinfo=None), interval="qh")
+    values.insert(4, dict(values[0]))
+
+    actual = _aggregate_series(values, START)
+
+    assert actual == _in_milli_wh(aggregate_hourly_reference(values, START, 1.0))
+    assert [ts for ts, _ in actual] == [START, START + dt.timedelta(hours=1)]
+
+
+def test_aggregate_hourly_series_skips_values_before_start():
+    values = bewegungsdaten(count=8, timestamp=START.replace(tzinfo=None), interval="h")
+
+    actual = _aggregate_series(values, START + dt.timedelta(hours=3))
+
+    assert actual == _in_milli_wh(aggregate_hourly_reference(values, START + dt.timedelta(hours=3), 1.0))
+    assert actual[0][0] == START + dt.timedelta(hours=3)
+
+
+def test_aggregate_hourly_series_keeps_unaligned_values():
+    values = bewegungsdaten(count=8, timestamp=START.replace(tzinfo=None), interval="qh")
+    values[2]["zeitpunktVon"] = "2024-01-01T00:31:30Z"
+
+    assert _aggregate_series(values, START) == _in_milli_wh(aggregate_hourly_reference(values, START, 1.0))
+
+
+def test_aggregate_hourly_series_parses_milliseconds():
+    values = [
+        {"wert": 1.5, "zeitpunktVon": "2024-01-01T00:00:00.000Z"},
+        {"wert": 2.25, "zeitpunktVon": "2024-01-01T00:15:00.000Z"},
+    ]
+
+    assert _aggregate_series(values, START) == [(START, 3_750_000)]
+
+
+def test_cumulative_sums_start_from_total_usage():
+    hourly = [(START + dt.timedelta(hours=hour), usage) for hour, usage in enumerate((100, 0, 250))]
+
+    assert cumulative_sums(hourly, 12_500) == [12_600, 12_600, 12_850]
+    assert cumulative_sums([], 12_500) == []
+
+
+@pytest.mark.parametrize("granularity,value_type,aggregat", [
+    ("QUARTER_HOUR", ValueType.QUARTER_HOUR, AggregatType.SUM_PER_HOUR),
+    ("DAY", ValueType.DAY, AggregatType.NONE),
+    (None, ValueType.QUARTER_HOUR, AggregatType.SUM_PER_HOUR),
+])
+def test_plan_fetch_follows_granularity(granularity, value_type, aggregat):
+    plan = plan_fetch(granularity)
+
+    assert plan.granularity == value_type
+    assert plan.aggregat == aggregat
+
+
+def test_plan_fetch_uses_larger_windows_for_daily_values():
+    assert plan_fetch("DAY").backfill_window > plan_fetch("QUARTER_HOUR").backfill_window
+
+
+def test_value_series_keeps_missing_values_and_estimated_flags():
+    values = bewegungsdaten(count=20, timestamp=START.replace(tzinfo=None), interval="qh")
+    values[3]["wert"] = None
+    values[9]["geschaetzt"] = True
+    values[17]["geschaetzt"] = True
+
+    series = ValueSeries.from_values(values, "zeitpunktVon", "wert")
+
+    assert len(series) == 20
+    assert list(series)[3] == (int(START.timestamp()) + 3 * 900, None)
+    assert [i for i in range(len(series)) if series.is_estimated(i)] == [9, 17]
+    assert series.datetime(4) == START + dt.timedelta(hours=1)
+
+
+@pytest.mark.parametrize("unit,wert,total_kwh", [("KWH", 0.1, 3516.345), ("WH", 100.1, 3519.849)])
+def test_milli_wh_sums_are_exact(unit, wert, total_kwh):
+    # a year of quarter hours, their float sum drifts away from the exact total
+    count = 4 * 24 * 365
+    values = bewegungsdaten(count=count, timestamp=START.replace(tzinfo=None), interval="qh")
+    for value in values:
+        value["wert"] = wert
+    series = ValueSeries.from_values(values, "zeitpunktVon", "wert")
+    total_usage = kwh_to_milli_wh("12.345")
+
+    hourly = aggregate_hourly_series(series, START, milli_wh_per_unit(unit))
+    sums = cumulative_sums(hourly, total_usage)
+
+    hour_usage = 4 * round(wert * milli_wh_per_unit(unit))
+    assert hourly[:2] == [(START, hour_usage), (START + dt.timedelta(hours=1), hour_usage)]
+    assert len(sums) == count // 4
+    assert sums[-1] == total_usage + count * round(wert * milli_wh_per_unit(unit))
+    assert sum([wert * milli_wh_per_unit(unit) / MILLI_WH_PER_KWH] * count) != milli_wh_to_kwh(sums[-1] - total_usage)
+    assert milli_wh_to_kwh(sums[-1]) == total_kwh
+
+
+def test_backfill_imports_contiguous_windows_and_removes_checkpoint(tmp_path):
+    async def test(hass):
+        backfill = importer(hass)
+        windows = record_windows(backfill)
+        end = START + dt.timedelta(days=25)
+
+        total_usage = await backfill._backfill_statistics(START, 500, end)
+
+        assert total_usage == 3_000_500
+        # bewegungsdaten are queried until the day before the next window starts
+        assert [(start, end) for start, end, _ in windows] == [
+            (START, START + dt.timedelta(days=9)),
+            (START + dt.timedelta(days=10), START + dt.timedelta(days=19)),
+            (START + dt.timedelta(days=20), end),
+        ]
+        assert [checkpoint for _, _, checkpoint in windows] == [
+            None,
+            (START + dt.timedelta(days=10), 1_000_500),
+            (START + dt.timedelta(days=20), 2_000_500),
+        ]
+        assert await backfill.checkpoint_store.async_load() is None
+
+    run_with_hass(tmp_path, test)
+
+
+def test_backfill_within_one_window_is_not_checkpointed(tmp_path, mocker):
+    async def test(hass):
+        backfill = importer(hass)
+        windows = record_windows(backfill)
+        save = mocker.spy(backfill.checkpoint_store, "async_save")
+        remove = mocker.spy(backfill.checkpoint_store, "async_remove")
+
+        assert await backfill._backfill_statistics(START, 0, START + dt.timedelta(days=3)) == 1_000_000
+
+        assert [(start, end) for start, end, _ in windows] == [(START, START + dt.timedelta(days=3))]
+        save.assert_not_called()
+        remove.assert_not_called()
+
+    run_with_hass(tmp_path, test)
+
+
+def test_interrupted_backfill_resumes_from_checkpoint(tmp_path):
+    async def test(hass):
+        end = dt.datetime.now(dt.timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        start = end - dt.timedelta(days=25)
+        interrupted = importer(hass)
+        record_windows(interrupted, fail_after=2)
+
+        with pytest.raises(RuntimeError):
+            await interrupted._backfill_statistics(start, 0, end)
+
+        checkpoint = (start + dt.timedelta(days=20), 2_000_000)
+        assert await BackfillCheckpointStore(hass, ZAEHLPUNKT).async_load() == checkpoint
+
+        # a new importer, e.g. after a restart, continues with the sum and end of the checkpoint
+        resumed = importer(hass)
+        windows = record_windows(resumed)
+        await resumed.async_import()
+
+        assert [(start, end) for start, end, _ in windows] == [(checkpoint[0], end)]
+        assert await BackfillCheckpointStore(hass, ZAEHLPUNKT).async_load() is None
+
+    run_with_hass(tmp_path, test)
+
+
+def test_import_is_skipped_while_watermark_is_current(tmp_path):
+    async def test(hass):
+        async_smartmeter = FakeAsyncSmartmeter(hass)
+        backfill = importer(hass, async_smartmeter)
+        await async_smartmeter.watermarks(ZAEHLPUNKT).async_advance(backfill.id, ValueType.QUARTER_HOUR, backfill.newest_possible_end())
+
+        await backfill.async_import()
+
+        assert async_smartmeter.logins == 0
+        assert async_smartmeter.last_statistics.reads == 0
+
+    run_with_hass(tmp_path, test)
+
+
+def test_import_advances_watermark_if_nothing_newer_can_exist(tmp_path):
+    async def test(hass):
+        end = Importer.newest_possible_end() + dt.timedelta(hours=1)
+        async_smartmeter = FakeAsyncSmartmeter(hass, row={"start": end - dt.timedelta(hours=1), "end": end, "sum": 1.5, "state": 0.5})
+        backfill = importer(hass, async_smartmeter)
+
+        await backfill.async_import()
+        assert async_smartmeter.logins == 1
+        assert await async_smartmeter.watermarks(ZAEHLPUNKT).async_get(backfill.id, ValueType.QUARTER_HOUR) == end
+
+        # the next update does not need the API or the statistics database
+        await importer(hass, async_smartmeter).async_import()
+        assert async_smartmeter.logins == 1
+        assert async_smartmeter.last_statistics.reads == 1
+
+    run_with_hass(tmp_path, test)
+
+
+def test_day_import_is_skipped_while_watermark_is_current(tmp_path):
+    async def test(hass):
+        async_smartmeter = FakeAsyncSmartmeter(hass)
+        day_importer = DayStatisticsImporter(hass, async_smartmeter, ZAEHLPUNKT)
+        midnight = dt.datetime.now(dt.timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        await async_smartmeter.watermarks(ZAEHLPUNKT).async_advance(day_importer.id, ValueType.DAY, midnight)
+
+        await day_importer.async_import(midnight - dt.timedelta(days=7), midnight + dt.timedelta(hours=12))
+        assert async_smartmeter.historic_data_queries == []
+
+        await day_importer.async_import_messwerte({"unitOfMeasurement": "WH", "values": [
+            {"zeitVon": (midnight - dt.timedelta(days=1)).isoformat(), "messwert": 1000},
+        ]})
+        assert async_smartmeter.last_statistics.imported == []
+
+    run_with_hass(tmp_path, test)
+
+
+def test_snapshot_import_skips_reading_dates_behind_watermark(tmp_path):
+    async def test(hass):
+        async_smartmeter = FakeAsyncSmartmeter(hass)
+        snapshot_importer = MainDailySnapshotStatisticsImporter(hass, async_smartmeter, ZAEHLPUNKT)
+        watermarks = async_smartmeter.watermarks(ZAEHLPUNKT)
+
+        await snapshot_importer.async_import("2024-03-10T00:00:00+00:00", 1234.5)
+        await snapshot_importer.async_import("2024-03-09T00:00:00+00:00", 1230.0)
+
+        assert [statistics[0]["start"] for _, statistics in async_smartmeter.last_statistics.imported] == [
+            dt.datetime(2024, 3, 10, tzinfo=dt.timezone.utc)
+        ]
+        assert await watermarks.async_get(snapshot_importer.id, ValueType.METER_READ) == dt.datetime(2024, 3, 10, tzinfo=dt.timezone.utc)
+        # only the first import needed the statistics database
+        assert async_smartmeter.last_statistics.reads == 1
+
+    run_with_hass(tmp_path, test)
+
+
+def test_failed_import_invalidates_last_statistics(tmp_path):
+    async def test(hass):
+        async def unavailable(start, end, aggregat):
+            raise RuntimeError("Cannot access bewegungsdaten")
+
+        end = Importer.newest_possible_end() - dt.timedelta(days=2)
+        async_smartmeter = FakeAsyncSmartmeter(hass, unavailable, row={"start": end - dt.timedelta(hours=1), "end": end, "sum": 1.5, "state": 0.5})
+
+        await importer(hass, async_smartmeter).async_import()
+
+        assert async_smartmeter.last_statistics.row is None
+        assert async_smartmeter.last_statistics.imported == []
+
+    run_with_hass(tmp_path, test)
+
+
+def answer_bewegungsdaten(queries, aggregator="SUM_PER_HOUR", interval="h", error=None):
+    """Answer the first query with the given aggregator and values, and quarter hour values afterwards."""
+    async def get_bewegungsdaten(start, end, aggregat):
+        queries.append(aggregat)
+        if len(queries) > 1:
+            return {"aggregator": "NONE", "unitOfMeasurement": "WH", "values": bewegungsdaten(8, START.replace(tzinfo=None), "qh")}
+        if error is not None:
+            raise error
+        return {"aggregator": aggregator, "unitOfMeasurement": "WH", "values": bewegungsdaten(2, START.replace(tzinfo=None), interval)}
+
+    return get_bewegungsdaten
+
+
+def test_echoed_aggregat_is_used(tmp_path):
+    async def test(hass):
+        queries = []
+        async_smartmeter = FakeAsyncSmartmeter(hass, answer_bewegungsdaten(queries))
+
+        meta, series = await importer(hass, async_smartmeter)._get_bewegungsdaten(START, START + dt.timedelta(days=1))
+
+        assert queries == [AggregatType.SUM_PER_HOUR]
+        assert meta["aggregator"] == "SUM_PER_HOUR"
+        assert len(series) == 2
+        assert async_smartmeter.unsupported_aggregats == set()
+
+    run_with_hass(tmp_path, test)
+
+
+@pytest.mark.parametrize("answer", [
+    # the API ignored the aggregat
+    {"aggregator": "NONE"},
+    # values are not summed per hour
+    {"interval": "qh"},
+    {"error": RuntimeError("Cannot access bewegungsdaten")},
+], ids=["descriptor", "timestamps", "error"])
+def test_unsupported_aggregat_falls_back_to_quarter_hours(tmp_path, answer):
+    async def test(hass):
+        queries = []
+        async_smartmeter = FakeAsyncSmartmeter(hass, answer_bewegungsdaten(queries, **answer))
+
+        meta, series = await importer(hass, async_smartmeter)._get_bewegungsdaten(START, START + dt.timedelta(days=1))
+        # later imports do not ask for the aggregat again
+        await importer(hass, async_smartmeter)._get_bewegungsdaten(START, START + dt.timedelta(days=1))
+
+        assert queries == [AggregatType.SUM_PER_HOUR, AggregatType.NONE, AggregatType.NONE]
+        assert len(series) == 8
+        assert async_smartmeter.unsupported_aggregats == {AggregatType.SUM_PER_HOUR}
+
+    run_with_hass(tmp_path, test)
+
+
+def test_connection_error_does_not_disable_aggregat(tmp_path):
+    async def test(hass):
+        queries = []
+        async_smartmeter = FakeAsyncSmartmeter(hass, answer_bewegungsdaten(queries, error=SmartmeterConnectionError("timeout")))
+
+        with pytest.raises(SmartmeterConnectionError):
+            await importer(hass, async_smartmeter)._get_bewegungsdaten(START, START + dt.timedelta(days=1))
+
+        assert queries == [AggregatType.SUM_PER_HOUR]
+        assert async_smartmeter.unsupported_aggregats == set()
+
+    run_with_hass(tmp_path, test)
+
+
+@pytest.mark.parametrize("stream_responses", [False, True], ids=["json", "stream"])
+def test_import_statistics_of_both_response_modes(tmp_path, stream_responses):
+    async def test(hass):
+        async def quarter_hours(start, end, aggregat):
+            return {"aggregator": "NONE", "unitOfMeasurement": "WH", "values": bewegungsdaten(8, START.replace(tzinfo=None), "qh")}
+
+        async_smartmeter = FakeAsyncSmartmeter(hass, quarter_hours)
+        async_smartmeter.stream_responses = stream_responses
+        async_smartmeter.unsupported_aggregats.add(AggregatType.SUM_PER_HOUR)
+
+        total_usage = await importer(hass, async_smartmeter)._import_statistics(START, START + dt.timedelta(days=1), 1_000)
+
+        [(statistic_id, statistics)] = async_smartmeter.last_statistics.imported
+        assert [statistic["start"] for statistic in statistics] == [START, START + dt.timedelta(hours=1)]
+        assert statistics[-1]["sum"] == milli_wh_to_kwh(total_usage)
+
+    run_with_hass(tmp_path, test)
+
+
+@pytest.mark.parametrize("stream_responses", [False, True], ids=["json", "stream"])
+def test_import_statistics_warns_without_values_list(tmp_path, caplog, stream_responses):
+    async def test(hass):
+        async def no_values(start, end, aggregat):
+            return {"aggregator": "NONE", "unitOfMeasurement": "WH"}
+
+        async_smartmeter = FakeAsyncSmartmeter(hass, no_values)
+        async_smartmeter.stream_responses = stream_responses
+
+        assert await importer(hass, async_smartmeter)._import_statistics(START, START + dt.timedelta(days=1), 1_000) == 1_000
+        assert async_smartmeter.last_statistics.imported == []
+
+    run_with_hass(tmp_path, test)
+
+    assert f"WienerNetze does not report historical data list (yet) for {ZAEHLPUNKT}" in caplog.text
+
+
+class StreamingSmartmeter:
+    """Streams the members of a bewegungsdaten response like the aiohttp client."""
+
+    def __init__(self, response):
+        self.response = response
+
+    async def bewegungsdaten_stream(self, zaehlpunkt, *args):
+        for key, value in self.response.items():
+            if key == "values" and value:
+                for item in value:
+                    yield key, item
+            else:
+                yield key, value
+
+
+@pytest.mark.parametrize("values,imported", [(bewegungsdaten(8, START.replace(tzinfo=None), "qh"), 2), (None, 0)])
+def test_import_statistics_streamed_by_async_smartmeter(tmp_path, mocker, caplog, values, imported):
+    add_external_statistics = mocker.patch("wnsm.statistics_utils.async_add_external_statistics")
+    response = {"descriptor": {"zaehlpunktnummer": ZAEHLPUNKT, "einheit": "WH", "aggregat": "NONE"}}
+    if values is not None:
+        response["values"] = values
+
+    async def test(hass):
+        async_smartmeter = AsyncSmartmeter(hass, StreamingSmartmeter(response), stream_responses=True)
+        async_smartmeter.unsupported_aggregats.add(AggregatType.SUM_PER_HOUR)
+
+        await importer(hass, async_smartmeter)._import_statistics(START, START + dt.timedelta(days=1), 0)
+
+    run_with_hass(tmp_path, test)
+
+    assert sum(len(call.args[2]) for call in add_external_statistics.call_args_list) == imported
+    assert ("does not report historical data list" in caplog.text) == (values is None)
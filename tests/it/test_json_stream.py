@@ -0,0 +1,61 @@
+"""Streamed JSON parsing tests"""
+import asyncio
+import json
+
+import pytest
+
+from it import bewegungsdaten_response
+from wnsm.api.json_stream import iter_object_members
+
+
+def _stream_members(payload: bytes, chunk_size: int, array_key: str = "values"):
+    async def chunks():
+        for i in range(0, len(payload), chunk_size):
+            yield payload[i:i + chunk_size]
+
+    async def collect():
+        return [member async for member in iter_object_members(chunks(), array_key)]
+
+    return asyncio.run(collect())
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1 << 20])
+def test_stream_bewegungsdaten_values(chunk_size):
+    response = bewegungsdaten_response("123456789", "AT000000001234567890", values_count=10)
+    response["values"][3]["wert"] = 0.123456789
+    response["descriptor"]["einheit"] = "kWh ä"
+    members = _stream_members(json.dumps(response, ensure_ascii=False, indent=2).encode(), chunk_size)
+
+    assert [value for key, value in members if key == "values"] == response["values"]
+    assert {key: value for key, value in members if key != "values"} == {
+        key: value for key, value in response.items() if key != "values"
+    }
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 1 << 20])
+def test_stream_numbers_split_between_chunks(chunk_size):
+    members = _stream_members(b'{"values": [12345.678, -1e-3, 7], "count": 3}', chunk_size)
+
+    assert members == [("values", 12345.678), ("values", -1e-3), ("values", 7), ("count", 3)]
+
+
+@pytest.mark.parametrize("payload,members", [
+    (b"{}", []),
+    (b' { "values" : [ ] , "descriptor": null } ', [("values", []), ("descriptor", None)]),
+    # other arrays and a values member that is no array are yielded as a whole
+    (b'{"other": [1, 2], "values": null}', [("other", [1, 2]), ("values", None)]),
+])
+def test_stream_members_without_values_items(payload, members):
+    assert _stream_members(payload, 2) == members
+
+
+@pytest.mark.parametrize("payload", [
+    b'{"descriptor": {}, "values": [{"wert": 1.5}, {"wert": 2',
+    b'{"values": [1, 2] "count": 2}',
+    b'[{"wert": 1.5}]',
+    b'{1: 2}',
+    b"",
+])
+def test_stream_rejects_invalid_response(payload):
+    with pytest.raises(ValueError):
+        _stream_members(payload, 4)
@@ -0,0 +1,193 @@
+"""Messwerte cache tests"""
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from it import run_with_hass
+from wnsm.AsyncSmartmeter import AsyncSmartmeter
+from wnsm.api.constants import ValueType
+from wnsm.const import DEFAULT_SETTLE_DAYS
+from wnsm.coordinator import WNSMDataUpdateCoordinator
+from wnsm.messwerte_cache import MesswerteCache, is_estimated
+
+ZAEHLPUNKT = "AT0010000000000000001000011111111"
+SERIES = "historical_data:DAY"
+TODAY = datetime(2024, 3, 10, tzinfo=timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def fixed_today(mocker):
+    for module in ["messwerte_cache", "utils", "meter_read_logic", "coordinator"]:
+        mocker.patch(f"wnsm.{module}.today", return_value=TODAY)
+
+
+def _messwert(day: date, hour: int = 0, **flags) -> dict:
+    return {"zeitVon": f"{day.isoformat()}T{hour:02d}:00:00.000Z", "messwert": 1000, "qualitaet": "VAL", **flags}
+
+
+def _days(first: date, count: int) -> list[date]:
+    return [first + timedelta(days=i) for i in range(count)]
+
+
+def _start(day: date) -> datetime:
+    return datetime.combine(day, datetime.min.time(), timezone.utc)
+
+
+@pytest.mark.parametrize("flags,estimated", [
+    ({}, False),
+    ({"qualitaet": None}, False),
+    ({"geschaetzt": True}, True),
+    ({"qualitaet": "EST"}, True),
+])
+def test_is_estimated(flags, estimated):
+    assert is_estimated(_messwert(date(2024, 3, 1), **flags)) == estimated
+
+
+def test_only_settled_final_days_are_cached(tmp_path):
+    async def test(hass):
+        cache = MesswerteCache(hass, ZAEHLPUNKT, settle_days=3)
+        days = _days(date(2024, 3, 1), 9)
+        values = [_messwert(day) for day in days]
+        values[2] = _messwert(days[2], geschaetzt=True)
+        values[3] = _messwert(days[3], qualitaet="EST")
+
+        # the response starts within its first day, which is therefore not complete
+        await cache.async_update(
+            SERIES, {"zaehlpunkt": ZAEHLPUNKT}, values, "zeitVon", _start(days[0]) + timedelta(hours=1), _start(TODAY.date()),
+            timezone.utc,
+        )
+
+        meta, cached, fetch_day = await cache.async_get(SERIES, days[1], days[-1])
+        assert meta == {"zaehlpunkt": ZAEHLPUNKT}
+        # days[2] and days[3] hold estimated values, days after TODAY - 3 days may still change
+        assert cached == [(days[1], [values[1]])]
+        assert fetch_day == days[2]
+        assert (await cache.async_get(SERIES, days[4], days[-1]))[1] == [(day, [values[i + 4]]) for i, day in enumerate(days[4:7])]
+        assert (await cache.async_get(SERIES, days[0], days[-1]))[2] == days[0]
+
+    run_with_hass(tmp_path, test)
+
+
+def test_estimated_day_replaces_cached_day(tmp_path):
+    async def test(hass):
+        cache = MesswerteCache(hass, ZAEHLPUNKT, settle_days=3)
+        day = date(2024, 3, 1)
+
+        await cache.async_update(SERIES, {}, [_messwert(day)], "zeitVon", _start(day), _start(day + timedelta(days=1)), timezone.utc)
+        await cache.async_update(
+            SERIES, {}, [_messwert(day, geschaetzt=True)], "zeitVon", _start(day), _start(day + timedelta(days=1)), timezone.utc
+        )
+
+        assert (await cache.async_get(SERIES, day, day))[1:] == ([], day)
+
+    run_with_hass(tmp_path, test)
+
+
+def test_unchanged_days_are_not_saved_again(tmp_path, mocker):
+    async def test(hass):
+        cache = MesswerteCache(hass, ZAEHLPUNKT, settle_days=1)
+        save = mocker.spy(cache._store, "async_delay_save")
+        days = _days(date(2024, 3, 8), 3)
+
+        for _ in range(2):
+            await cache.async_update(
+                SERIES, {}, [_messwert(day) for day in days], "zeitVon", _start(days[0]), _start(TODAY.date() + timedelta(days=1)),
+                timezone.utc,
+            )
+        # today is not settled yet
+        await cache.async_update(
+            SERIES, {}, [_messwert(days[-1])], "zeitVon", _start(days[-1]), _start(TODAY.date() + timedelta(days=1)), timezone.utc
+        )
+
+        assert save.call_count == 1
+        assert (await cache.async_get(SERIES, days[0], days[-1]))[2] == days[-1]
+
+    run_with_hass(tmp_path, test)
+
+
+def test_unknown_series_is_a_miss(tmp_path):
+    async def test(hass):
+        cache = MesswerteCache(hass, ZAEHLPUNKT, settle_days=3)
+
+        assert await cache.async_get(SERIES, date(2024, 3, 1), date(2024, 3, 5)) == (None, [], date(2024, 3, 1))
+
+    run_with_hass(tmp_path, test)
+
+
+class FakeSmartmeter:
+    """Answers messwerte with one final value per day of the query."""
+
+    def __init__(self):
+        self.queries = []
+
+    async def contracts(self):
+        return [{"zaehlpunkte": [{"zaehlpunktnummer": ZAEHLPUNKT}]}]
+
+    async def historical_data(self, zaehlpunkt, date_from, date_to, granularity):
+        self.queries.append((date_from, date_to))
+        first = date_from.date() if isinstance(date_from, datetime) else date_from
+        last = date_to.date() if isinstance(date_to, datetime) else date_to
+        return {
+            "zaehlpunkt": zaehlpunkt,
+            "messwerte": [_messwert(day) for day in _days(first, (last - first).days + 1)],
+        }
+
+
+def test_historic_data_fetches_only_days_missing_from_cache(tmp_path):
+    async def test(hass):
+        smartmeter = FakeSmartmeter()
+        async_smartmeter = AsyncSmartmeter(hass, smartmeter, settle_days=3)
+        first, last = date(2024, 3, 1), date(2024, 3, 9)
+
+        initial = await async_smartmeter._get_historic_data_response(ZAEHLPUNKT, first, last, ValueType.DAY)
+        # the result of an identical call would be shared for the TTL
+        async_smartmeter._recent_results.clear()
+        cached = await async_smartmeter._get_historic_data_response(ZAEHLPUNKT, first, last, ValueType.DAY)
+
+        # days up to TODAY - 3 days are served from the cache, only the rest is queried again
+        assert smartmeter.queries == [(first, last), (_start(date(2024, 3, 8)), last)]
+        assert cached == initial
+        assert len(cached["messwerte"]) == 9
+
+    run_with_hass(tmp_path, test)
+
+
+def test_without_settle_days_nothing_is_cached(tmp_path):
+    async def test(hass):
+        smartmeter = FakeSmartmeter()
+        async_smartmeter = AsyncSmartmeter(hass, smartmeter)
+        first, last = date(2024, 3, 1), date(2024, 3, 9)
+
+        for _ in range(2):
+            async_smartmeter._recent_results.clear()
+            await async_smartmeter._get_historic_data_response(ZAEHLPUNKT, first, last, ValueType.DAY)
+
+        assert smartmeter.queries == [(first, last), (first, last)]
+
+    run_with_hass(tmp_path, test)
+
+
+def test_coordinator_is_served_from_cache_with_default_options(tmp_path, mocker):
+    mocker.patch.object(WNSMDataUpdateCoordinator, "_async_import_statistics")
+
+    async def test(hass):
+        smartmeter = FakeSmartmeter()
+        async_smartmeter = AsyncSmartmeter(hass, smartmeter, settle_days=DEFAULT_SETTLE_DAYS)
+        coordinator = WNSMDataUpdateCoordinator(hass, async_smartmeter, [ZAEHLPUNKT], timedelta(hours=6))
+
+        initial = await coordinator._async_fetch_zaehlpunkt(ZAEHLPUNKT)
+        async_smartmeter._recent_results.clear()
+        cached = await coordinator._async_fetch_zaehlpunkt(ZAEHLPUNKT)
+
+        # METER_READ of the last two days and DAY of yesterday are final, only today is queried again
+        assert smartmeter.queries == [
+            (TODAY - timedelta(days=2), TODAY),
+            (TODAY - timedelta(days=1), TODAY),
+            (TODAY, TODAY),
+            (TODAY, TODAY),
+        ]
+        assert cached == initial
+        assert cached.meter_reading == 1.0
+        assert len(cached.day_messwerte["values"]) == 2
+
+    run_with_hass(tmp_path, test)
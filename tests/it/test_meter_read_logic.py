@@ -0,0 +1,38 @@
+"""METER_READ index tests"""
+from datetime import date, datetime
+
+from wnsm.meter_read_logic import first_meter_read_on_or_after, index_meter_reads_by_date
+
+
+def _meter_reads(*days):
+    return index_meter_reads_by_date([
+        {"zeitVon": f"2024-03-{day:02d}T00:00:00.000Z", "messwert": day * 1000} for day in days
+    ])
+
+
+def test_index_keeps_first_read_per_date_in_kwh():
+    meter_reads = index_meter_reads_by_date([
+        {"zeitVon": "2024-03-02T12:00:00.000Z", "messwert": 3000},
+        {"zeitVon": "2024-03-02T00:00:00.000Z", "messwert": 2000},
+        {"zeitVon": "2024-03-01T00:00:00.000Z", "messwert": 1000},
+        {"zeitVon": None, "messwert": 5000},
+        {"zeitVon": "2024-03-03T00:00:00.000Z", "messwert": None},
+    ])
+
+    assert meter_reads == {date(2024, 3, 1): 1.0, date(2024, 3, 2): 2.0}
+
+
+def test_first_read_on_exact_date():
+    assert first_meter_read_on_or_after(_meter_reads(1, 3, 7), datetime(2024, 3, 3)) == 3.0
+
+
+def test_first_read_after_gap():
+    assert first_meter_read_on_or_after(_meter_reads(1, 3, 7), datetime(2024, 3, 4)) == 7.0
+
+
+def test_first_read_past_the_end():
+    assert first_meter_read_on_or_after(_meter_reads(1, 3, 7), datetime(2024, 3, 8)) is None
+
+
+def test_first_read_of_empty_index():
+    assert first_meter_read_on_or_after(index_meter_reads_by_date([]), datetime(2024, 3, 1)) is None
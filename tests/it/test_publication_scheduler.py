@@ -0,0 +1,172 @@
+"""Publication scheduler tests"""
+from datetime import date, datetime, timedelta
+
+import pytest
+from homeassistant.util import dt as dt_util
+
+from it import run_with_hass
+from wnsm.const import DENSE_POLL_INTERVAL_MINUTES, PUBLICATION_HISTORY_SIZE
+from wnsm.coordinator import ZaehlpunktData
+from wnsm.publication_scheduler import MAX_INTERVAL, PublicationScheduler, newest_reading_date
+
+ZAEHLPUNKT = "AT0010000000000000001000011111111"
+OTHER = "AT0010000000000000001000011111112"
+FALLBACK = timedelta(hours=6)
+VIENNA = dt_util.get_time_zone("Europe/Vienna")
+
+
+@pytest.fixture(autouse=True)
+def vienna():
+    dt_util.set_default_time_zone(VIENNA)
+    yield
+    dt_util.set_default_time_zone(dt_util.UTC)
+
+
+def local(*args) -> datetime:
+    return datetime(*args, tzinfo=VIENNA)
+
+
+def scheduler(arrivals: dict[str, list[int]] | None = None, newest: dict[str, date] | None = None) -> PublicationScheduler:
+    """Scheduler without jitter that learned the given arrival times (minutes after midnight)."""
+    publication_scheduler = PublicationScheduler(None, "entry", FALLBACK)
+    publication_scheduler.jitter = timedelta()
+    publication_scheduler._arrivals = arrivals or {}
+    publication_scheduler._newest = {zp: day.isoformat() for zp, day in (newest or {}).items()}
+    return publication_scheduler
+
+
+def test_newest_reading_date_of_meter_read_and_day_values():
+    data = ZaehlpunktData(
+        zaehlpunkt_response={},
+        active=True,
+        meter_read_attributes={"reading_date": "2024-03-04T23:00:00+00:00"},
+        day_messwerte={"values": [
+            {"zeitVon": "2024-03-03T23:00:00.000Z", "messwert": 1000},
+            {"zeitVon": "2024-03-06T23:00:00.000Z", "messwert": None},
+        ]},
+    )
+
+    # local dates, the value without messwert is not published yet
+    assert newest_reading_date(data) == date(2024, 3, 5)
+
+
+def test_arrival_is_learned_when_yesterday_appears():
+    publication_scheduler = scheduler()
+
+    # the first observation only tells what has been published before
+    assert publication_scheduler.observe(ZAEHLPUNKT, date(2024, 3, 9), local(2024, 3, 10, 5, 0))
+    assert publication_scheduler.publication_window(ZAEHLPUNKT) is None
+
+    assert not publication_scheduler.observe(ZAEHLPUNKT, date(2024, 3, 9), local(2024, 3, 10, 12, 0))
+    assert not publication_scheduler.observe(ZAEHLPUNKT, date(2024, 3, 9), local(2024, 3, 11, 7, 15))
+    assert publication_scheduler.observe(ZAEHLPUNKT, date(2024, 3, 10), local(2024, 3, 11, 7, 30))
+    assert publication_scheduler.publication_window(ZAEHLPUNKT) == (timedelta(hours=6, minutes=15), timedelta(hours=8, minutes=15))
+
+    # data of older days says nothing about the time of publication
+    assert publication_scheduler.observe(ZAEHLPUNKT, date(2024, 3, 11), local(2024, 3, 13, 9, 0))
+    assert publication_scheduler._arrivals[ZAEHLPUNKT] == [7 * 60 + 15]
+
+
+def test_arrival_between_sparse_polls_is_learned_at_the_last_empty_poll():
+    publication_scheduler = scheduler(newest={ZAEHLPUNKT: date(2024, 3, 8)})
+
+    assert not publication_scheduler.observe(ZAEHLPUNKT, date(2024, 3, 8), local(2024, 3, 9, 23, 0))
+    assert not publication_scheduler.observe(ZAEHLPUNKT, None, local(2024, 3, 10, 2, 30))
+    # published some time before the next poll six hours later
+    assert publication_scheduler.observe(ZAEHLPUNKT, date(2024, 3, 9), local(2024, 3, 10, 8, 30))
+
+    assert publication_scheduler._arrivals[ZAEHLPUNKT] == [2 * 60 + 30]
+
+
+def test_arrival_without_empty_poll_of_the_day_is_learned_at_midnight():
+    publication_scheduler = scheduler(newest={ZAEHLPUNKT: date(2024, 3, 8)})
+
+    # the last poll without the data was yesterday
+    assert not publication_scheduler.observe(ZAEHLPUNKT, date(2024, 3, 8), local(2024, 3, 9, 20, 0))
+    assert publication_scheduler.observe(ZAEHLPUNKT, date(2024, 3, 9), local(2024, 3, 10, 6, 0))
+
+    assert publication_scheduler._arrivals[ZAEHLPUNKT] == [0]
+
+
+def test_arrival_history_is_bounded():
+    publication_scheduler = scheduler(newest={ZAEHLPUNKT: date(2024, 1, 1)})
+
+    for day in range(PUBLICATION_HISTORY_SIZE + 5):
+        now = local(2024, 1, 3, 6, 0) + timedelta(days=day, minutes=day)
+        publication_scheduler.observe(ZAEHLPUNKT, None, now - timedelta(minutes=DENSE_POLL_INTERVAL_MINUTES))
+        publication_scheduler.observe(ZAEHLPUNKT, now.date() - timedelta(days=1), now)
+
+    assert publication_scheduler._arrivals[ZAEHLPUNKT] == [
+        6 * 60 - DENSE_POLL_INTERVAL_MINUTES + day for day in range(5, PUBLICATION_HISTORY_SIZE + 5)
+    ]
+
+
+def test_learned_arrivals_are_persisted(tmp_path):
+    async def test(hass):
+        data = {
+            ZAEHLPUNKT: ZaehlpunktData(zaehlpunkt_response={}, active=True, meter_read_attributes={"reading_date": "2024-03-09T00:00:00+01:00"}),
+            OTHER: None,
+        }
+        publication_scheduler = PublicationScheduler(hass, "entry", FALLBACK)
+        await publication_scheduler.async_observe(data, local(2024, 3, 10, 5, 0))
+        await publication_scheduler.async_observe(data, local(2024, 3, 11, 7, 0))
+        data[ZAEHLPUNKT].meter_read_attributes["reading_date"] = "2024-03-10T00:00:00+01:00"
+        await publication_scheduler.async_observe(data, local(2024, 3, 11, 7, 15))
+
+        restored = PublicationScheduler(hass, "entry", FALLBACK)
+        await restored.async_load()
+
+        assert restored.publication_window(ZAEHLPUNKT) == (timedelta(hours=6), timedelta(hours=8))
+        assert restored._newest == {ZAEHLPUNKT: "2024-03-10"}
+
+    run_with_hass(tmp_path, test)
+
+
+@pytest.mark.parametrize("publication_scheduler", [
+    scheduler(),
+    # nothing learned for one of the Zählpunkte that still wait for data
+    scheduler({ZAEHLPUNKT: [420]}, {ZAEHLPUNKT: date(2024, 3, 9), OTHER: date(2024, 3, 8)}),
+], ids=["nothing_learned", "partly_learned"])
+def test_fallback_interval_without_learned_window(publication_scheduler):
+    assert publication_scheduler.next_interval([ZAEHLPUNKT, OTHER], local(2024, 3, 10, 5, 0)) == FALLBACK
+
+
+@pytest.mark.parametrize("now,interval", [
+    # before, within and after the window of 06:00 - 08:00 while waiting for yesterday's data
+    (local(2024, 3, 10, 0, 5), timedelta(hours=5, minutes=55)),
+    (local(2024, 3, 10, 6, 30), timedelta(minutes=DENSE_POLL_INTERVAL_MINUTES)),
+    (local(2024, 3, 10, 9, 0), FALLBACK),
+])
+def test_next_interval_while_waiting(now, interval):
+    publication_scheduler = scheduler({ZAEHLPUNKT: [420]}, {ZAEHLPUNKT: date(2024, 3, 8)})
+
+    assert publication_scheduler.next_interval([ZAEHLPUNKT], now) == interval
+
+
+@pytest.mark.parametrize("now,interval", [
+    (local(2024, 3, 10, 7, 0), timedelta(hours=23)),
+    # just before midnight the next window is hours away
+    (local(2024, 3, 10, 23, 59), timedelta(hours=6, minutes=1)),
+    # clocks move forward at 02:00 on 2024-03-31 and back at 03:00 on 2024-10-27
+    (local(2024, 3, 30, 22, 0), timedelta(hours=7)),
+    (local(2024, 10, 26, 22, 0), timedelta(hours=9)),
+])
+def test_next_interval_after_publication_sleeps_until_next_window(now, interval):
+    yesterday = now.date() - timedelta(days=1)
+    publication_scheduler = scheduler({ZAEHLPUNKT: [420], OTHER: [400, 440]}, {ZAEHLPUNKT: yesterday, OTHER: yesterday})
+
+    assert publication_scheduler.next_interval([ZAEHLPUNKT, OTHER], now) == interval
+
+
+def test_next_interval_at_midnight_waits_for_the_new_day():
+    publication_scheduler = scheduler({ZAEHLPUNKT: [420]}, {ZAEHLPUNKT: date(2024, 3, 9)})
+
+    # data of 2024-03-09 is complete before midnight, after midnight data of 2024-03-10 is expected
+    assert publication_scheduler.next_interval([ZAEHLPUNKT], local(2024, 3, 10, 23, 30)) == timedelta(hours=6, minutes=30)
+    assert publication_scheduler.next_interval([ZAEHLPUNKT], local(2024, 3, 11, 0, 30)) == timedelta(hours=5, minutes=30)
+
+
+def test_next_interval_is_bounded():
+    publication_scheduler = scheduler({ZAEHLPUNKT: [1439]}, {ZAEHLPUNKT: date(2024, 3, 9)})
+
+    assert publication_scheduler.next_interval([ZAEHLPUNKT], local(2024, 3, 10, 0, 0)) == MAX_INTERVAL
@@ -0,0 +1,127 @@
+"""Last statistics cache tests"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from homeassistant.components.recorder import EVENT_RECORDER_HOURLY_STATISTICS_GENERATED
+from homeassistant.components.recorder.models import StatisticMetaData
+from homeassistant.exceptions import HomeAssistantError
+
+from it import run_with_hass
+from wnsm.statistics_utils import LastStatisticsCache
+
+STATISTIC_ID = "wnsm:at0010000000000000001000011111111"
+OTHER_ID = "wnsm:at0010000000000000001000011111111_day"
+START = datetime(2024, 3, 10, tzinfo=timezone.utc)
+METADATA = StatisticMetaData(source="wnsm", statistic_id=STATISTIC_ID, name=None, unit_of_measurement="kWh",
+                             has_mean=False, has_sum=True)
+
+
+class FakeRecorder:
+    """Runs executor jobs inline and answers get_last_statistics from rows."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.jobs = []
+
+    async def async_add_executor_job(self, target, *args):
+        self.jobs.append(args[-1])
+        return target(*args)
+
+    def get_last_statistics(self, hass, number_of_stats, statistic_id, convert_units, types):
+        row = self.rows.get(statistic_id)
+        return {} if row is None else {statistic_id: [row]}
+
+
+@pytest.fixture
+def recorder(mocker):
+    recorder = FakeRecorder({STATISTIC_ID: {"start": START.timestamp(), "end": (START + timedelta(hours=1)).timestamp(), "sum": 2.5, "state": 0.5}})
+    mocker.patch("wnsm.statistics_utils.get_instance", return_value=recorder)
+    mocker.patch("wnsm.statistics_utils.get_last_statistics", side_effect=recorder.get_last_statistics)
+    return recorder
+
+
+@pytest.fixture
+def imported(mocker):
+    return mocker.patch("wnsm.statistics_utils.async_add_external_statistics")
+
+
+def test_seed_reads_all_statistics_in_one_job(recorder):
+    async def test():
+        cache = LastStatisticsCache(None)
+        await cache.async_seed([STATISTIC_ID, OTHER_ID])
+
+        assert await cache.async_get(STATISTIC_ID) == {"start": START, "end": START + timedelta(hours=1), "sum": 2.5, "state": 0.5}
+        assert await cache.async_get(OTHER_ID) is None
+        assert await cache.async_get_timestamp(STATISTIC_ID, "end") == START + timedelta(hours=1)
+        assert recorder.jobs == [[STATISTIC_ID, OTHER_ID]]
+
+    asyncio.run(test())
+
+
+def test_miss_falls_back_to_recorder(recorder):
+    async def test():
+        cache = LastStatisticsCache(None)
+        await cache.async_seed([OTHER_ID])
+
+        assert (await cache.async_get(STATISTIC_ID))["sum"] == 2.5
+        await cache.async_get(STATISTIC_ID)
+        assert recorder.jobs == [[OTHER_ID], [STATISTIC_ID]]
+
+    asyncio.run(test())
+
+
+def test_imports_only_move_the_cached_row_forward(recorder, imported):
+    async def test():
+        cache = LastStatisticsCache(None)
+        await cache.async_seed([STATISTIC_ID])
+        newer = START + timedelta(hours=3)
+
+        cache.add_external_statistics(METADATA, [
+            {"start": newer, "sum": 4.0, "state": 1.0},
+            {"start": newer - timedelta(hours=1), "sum": 3.0, "state": 0.5},
+        ])
+        cache.add_external_statistics(METADATA, [{"start": START - timedelta(days=1), "sum": 1.0, "state": 1.0}])
+        cache.add_external_statistics(METADATA, [])
+
+        assert await cache.async_get(STATISTIC_ID) == {"start": newer, "end": newer + timedelta(hours=1), "sum": 4.0, "state": 1.0}
+        assert imported.call_count == 3
+        assert recorder.jobs == [[STATISTIC_ID]]
+
+    asyncio.run(test())
+
+
+def test_failed_import_drops_the_cached_row(recorder, imported):
+    async def test():
+        cache = LastStatisticsCache(None)
+        await cache.async_seed([STATISTIC_ID, OTHER_ID])
+        imported.side_effect = HomeAssistantError("Invalid timestamp")
+
+        with pytest.raises(HomeAssistantError):
+            cache.add_external_statistics(METADATA, [{"start": START + timedelta(minutes=30), "sum": 4.0, "state": 1.0}])
+
+        assert (await cache.async_get(STATISTIC_ID))["sum"] == 2.5
+        assert recorder.jobs == [[STATISTIC_ID, OTHER_ID], [STATISTIC_ID]]
+
+    asyncio.run(test())
+
+
+def test_compiled_statistics_drop_all_cached_rows(tmp_path, recorder):
+    async def test(hass):
+        cache = LastStatisticsCache(hass)
+        unsubscribe = cache.async_listen()
+        await cache.async_seed([STATISTIC_ID, OTHER_ID])
+
+        hass.bus.async_fire(EVENT_RECORDER_HOURLY_STATISTICS_GENERATED)
+        await hass.async_block_till_done()
+        await cache.async_get(STATISTIC_ID)
+        await cache.async_get(OTHER_ID)
+
+        unsubscribe()
+        hass.bus.async_fire(EVENT_RECORDER_HOURLY_STATISTICS_GENERATED)
+        await hass.async_block_till_done()
+        await cache.async_get(STATISTIC_ID)
+
+        assert recorder.jobs == [[STATISTIC_ID, OTHER_ID], [STATISTIC_ID], [OTHER_ID]]
+
+    run_with_hass(tmp_path, test)
@@ -0,0 +1,66 @@
+"""Timestamp parsing tests"""
+import math
+from datetime import timezone
+
+import pytest
+from homeassistant.util import dt as dt_util
+
+from wnsm.timestamps import parse_datetime, parse_epoch
+
+API_TIMESTAMPS = [
+    "2024-03-31T01:15:00Z",
+    "2024-03-31T01:15:00.000Z",
+    "2024-03-31T03:15:00+02:00",
+    "2024-03-31T01:15:00.000+01:00",
+    "2024-03-31T01:15:00+0100",
+]
+OTHER_TIMESTAMPS = [
+    # naive
+    "2024-03-31T01:15:00",
+    "2024-03-31T01:15:00.000",
+    "2024-03-31 01:15:00",
+    "2024-03-31T01:15:00.5+01:00",
+]
+INVALID_TIMESTAMPS = ["2024-03-31T01:15:0xZ", "2024-03-31X01:15:00.000Z", "garbage", ""]
+
+
+@pytest.mark.parametrize("timestamp", API_TIMESTAMPS + OTHER_TIMESTAMPS)
+def test_parse_datetime_matches_home_assistant(timestamp):
+    parsed = parse_datetime(timestamp)
+
+    assert parsed == dt_util.parse_datetime(timestamp)
+    assert parsed.utcoffset() == dt_util.parse_datetime(timestamp).utcoffset()
+
+
+@pytest.mark.parametrize("timestamp", API_TIMESTAMPS + OTHER_TIMESTAMPS)
+def test_parse_epoch_matches_home_assistant(timestamp):
+    expected = dt_util.parse_datetime(timestamp)
+    if expected.tzinfo is None:
+        expected = expected.replace(tzinfo=timezone.utc)
+
+    assert parse_epoch(timestamp) == math.floor(expected.timestamp())
+
+
+@pytest.mark.parametrize("timestamp", INVALID_TIMESTAMPS + [None])
+def test_invalid_timestamps_are_none(timestamp):
+    assert parse_datetime(timestamp) is None
+    assert parse_epoch(timestamp) is None
+
+
+def test_out_of_range_timestamp_raises_like_home_assistant():
+    with pytest.raises(ValueError):
+        dt_util.parse_datetime("2024-13-01T00:00:00Z")
+    with pytest.raises(ValueError):
+        parse_datetime("2024-13-01T00:00:00Z")
+    with pytest.raises(ValueError):
+        parse_epoch("2024-13-01T00:00:00Z")
+
+
+def test_parse_epoch_tries_fromisoformat_once(mocker):
+    fromisoformat = mocker.patch("wnsm.timestamps._fromisoformat", side_effect=ValueError)
+    fallback = mocker.spy(dt_util, "parse_datetime")
+
+    assert parse_epoch("2024-03-31T01:15:0xZ") is None
+
+    fromisoformat.assert_called_once_with("2024-03-31T01:15:0xZ")
+    fallback.assert_called_once_with("2024-03-31T01:15:0xZ")
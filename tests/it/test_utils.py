@@ -0,0 +1,32 @@
+"""Attribute mapping tests"""
+from it import zaehlpunkt
+from wnsm.const import ZAEHLPUNKTE_CALL_MAPPER
+from wnsm.utils import AttributeMapper, dict_path, translate_dict
+
+
+def test_mapper_picks_nested_attributes():
+    mapped = ZAEHLPUNKTE_CALL_MAPPER(zaehlpunkt())
+
+    assert mapped["zaehlpunktnummer"] == zaehlpunkt()["zaehlpunktnummer"]
+    assert mapped["granularity"] == "QUARTER_HOUR"
+    assert mapped["type"] == "TAGSTROM"
+
+
+def test_mapper_skips_values_that_cannot_be_accessed():
+    mapper = AttributeMapper([
+        ("list.1.value", "second"),
+        ("list.5.value", "missing_index"),
+        ("list.value", "key_on_list"),
+        ("dict.0", "index_on_dict"),
+        ("none.value", "below_none"),
+        ("missing", "missing_key"),
+    ])
+
+    assert mapper({"list": [{}, {"value": 2}], "dict": {"0": 1}, "none": None}) == {"second": 2}
+
+
+def test_translate_dict_and_dict_path_use_the_same_accessors():
+    response = {"meterReadings": [{"value": 1}]}
+
+    assert translate_dict(response, [("meterReadings.0.value", "lastValue")]) == {"lastValue": 1}
+    assert dict_path("meterReadings.0.value", response) == 1
@@ -0,0 +1,117 @@
+"""Ingest watermark tests"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from homeassistant.components.recorder import EVENT_RECORDER_HOURLY_STATISTICS_GENERATED
+
+from it import run_with_hass
+from wnsm.AsyncSmartmeter import AsyncSmartmeter
+from wnsm.api.constants import ValueType
+from wnsm.watermark_store import IngestWatermarkStore
+
+ZAEHLPUNKT = "AT0010000000000000001000011111111"
+STATISTIC_ID = "wnsm:at0010000000000000001000011111111"
+OTHER_ID = "wnsm:at0010000000000000001000011111111_day"
+NEWEST = datetime(2024, 3, 10, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def recorder_rows(mocker):
+    """Last rows of the recorder by statistic id, read inline instead of in the recorder executor."""
+    rows = {}
+    recorder = mocker.Mock()
+    recorder.async_add_executor_job = mocker.AsyncMock(side_effect=lambda target, *args: target(*args))
+    mocker.patch("wnsm.statistics_utils.get_instance", return_value=recorder)
+    mocker.patch(
+        "wnsm.statistics_utils.get_last_statistics",
+        side_effect=lambda hass, count, statistic_id, convert_units, types: (
+            {statistic_id: [rows[statistic_id]]} if statistic_id in rows else {}
+        ),
+    )
+    return rows
+
+
+def _row(end: datetime) -> dict:
+    return {"start": (end - timedelta(hours=1)).timestamp(), "end": end.timestamp(), "sum": 1.0, "state": 1.0}
+
+
+def test_watermark_only_moves_forward(tmp_path):
+    async def test(hass):
+        watermarks = IngestWatermarkStore(hass, ZAEHLPUNKT)
+        assert await watermarks.async_get(STATISTIC_ID, ValueType.DAY) is None
+        assert not await watermarks.async_is_current(STATISTIC_ID, ValueType.DAY, NEWEST)
+
+        await watermarks.async_advance(STATISTIC_ID, ValueType.DAY, NEWEST)
+        await watermarks.async_advance(STATISTIC_ID, ValueType.DAY, NEWEST - timedelta(days=1))
+        await watermarks.async_advance(STATISTIC_ID, ValueType.DAY, None)
+
+        assert await watermarks.async_get(STATISTIC_ID, ValueType.DAY) == NEWEST
+        assert await watermarks.async_is_current(STATISTIC_ID, ValueType.DAY, NEWEST - timedelta(hours=1))
+        assert not await watermarks.async_is_current(STATISTIC_ID, ValueType.DAY, NEWEST + timedelta(hours=1))
+        assert not await watermarks.async_is_current(STATISTIC_ID, ValueType.DAY, None)
+        # each value type of a statistic has its own watermark
+        assert await watermarks.async_get(STATISTIC_ID, ValueType.METER_READ) is None
+
+    run_with_hass(tmp_path, test)
+
+
+def test_watermark_is_persisted_and_removed(tmp_path):
+    async def advance(hass):
+        await IngestWatermarkStore(hass, ZAEHLPUNKT).async_advance(STATISTIC_ID, ValueType.QUARTER_HOUR, NEWEST)
+
+    async def restore_and_remove(hass):
+        watermarks = IngestWatermarkStore(hass, ZAEHLPUNKT)
+        newest = await watermarks.async_get(STATISTIC_ID, ValueType.QUARTER_HOUR)
+        await watermarks.async_remove()
+        return newest, await watermarks.async_get(STATISTIC_ID, ValueType.QUARTER_HOUR)
+
+    # the delayed save is written when Home Assistant stops
+    run_with_hass(tmp_path, advance)
+
+    assert run_with_hass(tmp_path, restore_and_remove) == (NEWEST, None)
+    assert not (tmp_path / ".storage" / f"wnsm.{ZAEHLPUNKT.lower()}.watermark").exists()
+
+
+def test_watermark_does_not_pass_the_recorder(tmp_path, recorder_rows):
+    async def test(hass):
+        async_smartmeter = AsyncSmartmeter(hass)
+        async_smartmeter.last_statistics.async_listen()
+        watermarks = async_smartmeter.watermarks(ZAEHLPUNKT)
+        recorder_rows[STATISTIC_ID] = _row(NEWEST)
+        await watermarks.async_advance(STATISTIC_ID, ValueType.QUARTER_HOUR, NEWEST)
+        assert await watermarks.async_is_current(STATISTIC_ID, ValueType.QUARTER_HOUR, NEWEST)
+
+        # the recorder did not commit the last import
+        recorder_rows[STATISTIC_ID] = _row(NEWEST - timedelta(days=1))
+        hass.bus.async_fire(EVENT_RECORDER_HOURLY_STATISTICS_GENERATED)
+        await hass.async_block_till_done()
+        assert await watermarks.async_get(STATISTIC_ID, ValueType.QUARTER_HOUR) is None
+
+        # a watermark advanced before the recorder caught up is capped by the recorder's last row
+        await watermarks.async_advance(STATISTIC_ID, ValueType.QUARTER_HOUR, NEWEST)
+        assert await watermarks.async_get(STATISTIC_ID, ValueType.QUARTER_HOUR) == NEWEST - timedelta(days=1)
+
+        # the user cleared the statistic
+        del recorder_rows[STATISTIC_ID]
+        hass.bus.async_fire(EVENT_RECORDER_HOURLY_STATISTICS_GENERATED)
+        await hass.async_block_till_done()
+        assert not await watermarks.async_is_current(STATISTIC_ID, ValueType.QUARTER_HOUR, NEWEST - timedelta(days=2))
+
+    run_with_hass(tmp_path, test)
+
+
+def test_watermarks_are_reset_with_the_last_statistics(tmp_path, recorder_rows):
+    async def test(hass):
+        async_smartmeter = AsyncSmartmeter(hass)
+        watermarks = async_smartmeter.watermarks(ZAEHLPUNKT)
+        recorder_rows[STATISTIC_ID] = recorder_rows[OTHER_ID] = _row(NEWEST)
+        for statistic_id in (STATISTIC_ID, OTHER_ID):
+            await watermarks.async_advance(statistic_id, ValueType.DAY, NEWEST)
+
+        async_smartmeter.last_statistics.invalidate(STATISTIC_ID)
+        assert watermarks._data == {OTHER_ID: {"DAY": NEWEST.isoformat()}}
+
+        async_smartmeter.last_statistics.invalidate()
+        assert watermarks._data == {}
+
+    run_with_hass(tmp_path, test)